@@ -0,0 +1,42 @@
+"""Indices secundarios para las consultas de los routers
+
+Revision ID: 5b1d9e2c7a43
+Revises: 81227bd41692
+Create Date: 2026-10-19 10:12:41.208113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1d9e2c7a43'
+down_revision: Union[str, None] = '81227bd41692'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # crear_cliente / Local.clientes: búsqueda por local
+    op.create_index('ix_clientes_local_id', 'clientes', ['local_id'], unique=False)
+    # Zona.clientes y reportes por zona ordenados por fecha
+    op.create_index('ix_clientes_zona_id_fecha_registro', 'clientes', ['zona_id', 'fecha_registro'], unique=False)
+    # /grupos (join Zona -> Local) y Zona.locales, filtrando además por estado
+    op.create_index('ix_locales_zona_id_estado', 'locales', ['zona_id', 'estado'], unique=False)
+    # Local.subniveles y el CTE recursivo del árbol
+    op.create_index('ix_locales_subnivel_de_id', 'locales', ['subnivel_de_id'], unique=False)
+    # Locales disponibles por rango de precio
+    op.create_index('ix_locales_estado_precio_base', 'locales', ['estado', 'precio_base'], unique=False)
+    # Categoria.zonas
+    op.create_index('ix_zonas_categoria_id', 'zonas', ['categoria_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_zonas_categoria_id', table_name='zonas')
+    op.drop_index('ix_locales_estado_precio_base', table_name='locales')
+    op.drop_index('ix_locales_subnivel_de_id', table_name='locales')
+    op.drop_index('ix_locales_zona_id_estado', table_name='locales')
+    op.drop_index('ix_clientes_zona_id_fecha_registro', table_name='clientes')
+    op.drop_index('ix_clientes_local_id', table_name='clientes')
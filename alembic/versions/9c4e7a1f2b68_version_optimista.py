@@ -0,0 +1,30 @@
+"""Columna version para concurrencia optimista en locales y clientes
+
+Revision ID: 9c4e7a1f2b68
+Revises: 5b1d9e2c7a43
+Create Date: 2026-10-19 16:05:12.481920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c4e7a1f2b68'
+down_revision: Union[str, None] = '5b1d9e2c7a43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # NOT NULL con DEFAULT constante: en SQL Server es un cambio solo de
+    # metadatos, no reescribe las filas existentes
+    op.add_column('locales', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+    op.add_column('clientes', sa.Column('version', sa.Integer(), server_default=sa.text('1'), nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('clientes', 'version')
+    op.drop_column('locales', 'version')
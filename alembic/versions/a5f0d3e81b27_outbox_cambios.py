@@ -0,0 +1,41 @@
+"""Outbox de cambios de locales y clientes
+
+Revision ID: a5f0d3e81b27
+Revises: e7b3c9d14a20
+Create Date: 2026-10-19 20:31:07.215640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5f0d3e81b27'
+down_revision: Union[str, None] = 'e7b3c9d14a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('outbox_cambios',
+    sa.Column('id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), autoincrement=True, nullable=False),
+    sa.Column('entidad', sa.String(length=50), nullable=False),
+    sa.Column('entidad_id', sa.Integer(), nullable=False),
+    sa.Column('operacion', sa.String(length=10), nullable=False),
+    sa.Column('campos', sa.String(length=1000), nullable=True),
+    sa.Column('creado', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('outbox_checkpoints',
+    sa.Column('consumidor', sa.String(length=100), nullable=False),
+    sa.Column('ultimo_id', sa.BigInteger(), nullable=False),
+    sa.Column('actualizado', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('consumidor')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('outbox_checkpoints')
+    op.drop_table('outbox_cambios')
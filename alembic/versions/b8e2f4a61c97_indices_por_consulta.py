@@ -0,0 +1,40 @@
+"""Indices ajustados a las consultas de los routers
+
+Revision ID: b8e2f4a61c97
+Revises: a5f0d3e81b27
+Create Date: 2026-10-19 22:05:18.402913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2f4a61c97'
+down_revision: Union[str, None] = 'a5f0d3e81b27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Ninguna consulta filtra por apellidos en la base (lo cubre el índice en memoria)
+    op.drop_index('ix_clientes_apellidos_nombres', table_name='clientes')
+    # Las consultas solo usan la primera columna: la segunda solo encarecía las escrituras
+    op.drop_index('ix_clientes_zona_id_fecha_registro', table_name='clientes')
+    op.create_index('ix_clientes_zona_id', 'clientes', ['zona_id'], unique=False)
+    op.drop_index('ix_locales_zona_id_estado', table_name='locales')
+    op.create_index('ix_locales_zona_id', 'locales', ['zona_id'], unique=False)
+    op.drop_index('ix_locales_estado_precio_base', table_name='locales')
+    op.create_index('ix_locales_estado', 'locales', ['estado'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_locales_estado', table_name='locales')
+    op.create_index('ix_locales_estado_precio_base', 'locales', ['estado', 'precio_base'], unique=False)
+    op.drop_index('ix_locales_zona_id', table_name='locales')
+    op.create_index('ix_locales_zona_id_estado', 'locales', ['zona_id', 'estado'], unique=False)
+    op.drop_index('ix_clientes_zona_id', table_name='clientes')
+    op.create_index('ix_clientes_zona_id_fecha_registro', 'clientes', ['zona_id', 'fecha_registro'], unique=False)
+    op.create_index('ix_clientes_apellidos_nombres', 'clientes', ['apellidos_cliente', 'nombres_cliente'], unique=False)
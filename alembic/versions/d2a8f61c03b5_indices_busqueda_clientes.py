@@ -0,0 +1,34 @@
+"""Indices para /clientes/buscar
+
+Revision ID: d2a8f61c03b5
+Revises: 9c4e7a1f2b68
+Create Date: 2026-10-19 17:40:03.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a8f61c03b5'
+down_revision: Union[str, None] = '9c4e7a1f2b68'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Búsqueda exacta de recepción
+    op.create_index('ix_clientes_dni_cliente', 'clientes', ['dni_cliente'], unique=False)
+    op.create_index('ix_clientes_ruc_cliente', 'clientes', ['ruc_cliente'], unique=False)
+    op.create_index('ix_clientes_phone_cliente', 'clientes', ['phone_cliente'], unique=False)
+    # LIKE 'prefijo%' por apellidos (el índice en memoria cubre el caso sin tildes)
+    op.create_index('ix_clientes_apellidos_nombres', 'clientes', ['apellidos_cliente', 'nombres_cliente'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_clientes_apellidos_nombres', table_name='clientes')
+    op.drop_index('ix_clientes_phone_cliente', table_name='clientes')
+    op.drop_index('ix_clientes_ruc_cliente', table_name='clientes')
+    op.drop_index('ix_clientes_dni_cliente', table_name='clientes')
@@ -0,0 +1,27 @@
+"""Indice por fecha_registro para /reportes
+
+Revision ID: e7b3c9d14a20
+Revises: d2a8f61c03b5
+Create Date: 2026-10-19 19:12:44.530918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7b3c9d14a20'
+down_revision: Union[str, None] = 'd2a8f61c03b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Los reportes de arras recorren rangos de fecha_registro por tramos
+    op.create_index('ix_clientes_fecha_registro', 'clientes', ['fecha_registro'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_clientes_fecha_registro', table_name='clientes')
@@ -0,0 +1,220 @@
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.apps.locales.models import Cliente
+from app.core.cache import cache, VersionCopia
+from app.db.connection import es_primaria, sesion_primaria
+from app.db.outbox import como_pares, despachador
+
+# Columnas que devuelve /clientes/buscar (el índice guarda solo estas)
+CAMPOS_RESUMEN = (
+    "id", "nombres_cliente", "apellidos_cliente",
+    "dni_cliente", "ruc_cliente", "phone_cliente", "local_id",
+)
+
+
+def normalizar(texto: Optional[str]) -> str:
+    """Minúsculas y sin tildes: "Núñez" -> "nunez"."""
+    if not texto:
+        return ""
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+def coincide(palabras: List[str], terminos: List[str]) -> bool:
+    return all(any(palabra.startswith(termino) for palabra in palabras) for termino in terminos)
+
+
+def resumen_cliente(cliente) -> Dict[str, Any]:
+    return {campo: getattr(cliente, campo) for campo in CAMPOS_RESUMEN}
+
+
+def palabras_nombre(resumen: Dict[str, Any]) -> List[str]:
+    texto = f"{resumen['apellidos_cliente'] or ''} {resumen['nombres_cliente'] or ''}"
+    return sorted(set(normalizar(texto).split()))
+
+
+class IndiceNombresClientes:
+    """Índice ordenado de prefijos sobre nombres y apellidos de clientes.
+
+    Cada palabra (normalizada) de `apellidos_cliente` y `nombres_cliente` es
+    una entrada `(palabra, id)` en una lista ordenada; un prefijo es un rango
+    contiguo que se ubica con bisect. Las escrituras insertan/quitan solo las
+    entradas del cliente afectado, también en los demás workers (`publicar`
+    envía los ids; ante un mensaje perdido el índice se reconstruye).
+    """
+
+    NAMESPACE = "clientes"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cargado = False
+        self._version = VersionCopia()
+        self._limpiar()
+
+    def _limpiar(self):
+        self._entradas: List[Tuple[str, int]] = []
+        self._palabras_por_id: Dict[int, List[str]] = {}
+        self._resumenes: Dict[int, Dict[str, Any]] = {}
+
+    # ---------------------- CARGA ----------------------
+    def cargar(self, db: Session):
+        columnas = [getattr(Cliente, campo) for campo in CAMPOS_RESUMEN]
+        # Versión antes que las filas (ver LocalesSearchIndex.cargar)
+        version = cache.version(self.NAMESPACE)
+        # Core (db.connection()) en lugar de la capa ORM: filas planas, más rápido
+        filas = db.connection().execute(select(*columnas)).all()
+        with self._lock:
+            self._limpiar()
+            for fila in filas:
+                resumen = dict(zip(CAMPOS_RESUMEN, fila))
+                palabras = palabras_nombre(resumen)
+                self._resumenes[resumen["id"]] = resumen
+                self._palabras_por_id[resumen["id"]] = palabras
+                self._entradas.extend((palabra, resumen["id"]) for palabra in palabras)
+            # Un solo sort al cargar; las escrituras usan insort
+            self._entradas.sort()
+            self._version.reiniciar(version)
+            self.cargado = True
+
+    def asegurar_cargado(self, db: Session = None):
+        """Carga el índice si hace falta, siempre desde la primaria.
+
+        Con una sesión de la réplica se abre una propia: una réplica atrasada
+        dejaría fuera escrituras que ya se publicaron a los demás workers.
+        """
+        if self.cargado:
+            return
+        if db is not None and es_primaria(db):
+            self.cargar(db)
+            return
+        with sesion_primaria() as primaria:
+            self.cargar(primaria)
+
+    # ---------------------- ESCRITURA ----------------------
+    def upsert(self, cliente):
+        if not self.cargado:
+            return
+        resumen = resumen_cliente(cliente)
+        with self._lock:
+            self._quitar(resumen["id"])
+            palabras = palabras_nombre(resumen)
+            self._resumenes[resumen["id"]] = resumen
+            self._palabras_por_id[resumen["id"]] = palabras
+            for palabra in palabras:
+                insort(self._entradas, (palabra, resumen["id"]))
+
+    def remove(self, cliente_id: int):
+        if not self.cargado:
+            return
+        with self._lock:
+            self._quitar(cliente_id)
+
+    def _quitar(self, cliente_id: int):
+        for palabra in self._palabras_por_id.pop(cliente_id, ()):
+            posicion = bisect_left(self._entradas, (palabra, cliente_id))
+            if posicion < len(self._entradas) and self._entradas[posicion] == (palabra, cliente_id):
+                del self._entradas[posicion]
+        self._resumenes.pop(cliente_id, None)
+
+    def invalidar(self):
+        with self._lock:
+            self._limpiar()
+            self._version.reiniciar()
+            self.cargado = False
+
+    def publicar(self, cambios: Optional[Iterable[Tuple[str, int]]] = None):
+        """Avisa a los demás workers qué clientes cambiaron: pares ("upsert"/"remove", id).
+
+        Sin `cambios` los demás descartan el índice completo.
+        """
+        cambios = None if cambios is None else [[op, cliente_id] for op, cliente_id in cambios]
+        version = cache.publicar_cambios(self.NAMESPACE, cambios)
+        with self._lock:
+            self._version.propia(version)
+
+    def recibir(self, mensaje: dict):
+        """Mensaje de otro worker: aplica sus cambios o, si falta alguno, descarta el índice."""
+        with self._lock:
+            if not self.cargado:
+                return
+            if mensaje.get("cambios") is not None and self._version.siguiente(mensaje["version"]):
+                cambios = mensaje["cambios"]
+            else:
+                cambios = None
+        if cambios is None:
+            self.invalidar()
+        else:
+            self.aplicar(cambios)
+
+    def aplicar(self, cambios: Iterable[Tuple[str, int]]):
+        """Aplica pares (operación, id) leyendo de la primaria los clientes de los "upsert"."""
+        if not self.cargado:
+            return
+        cambios = list(cambios)
+        ids = {cliente_id for op, cliente_id in cambios if op == "upsert"}
+        filas = {}
+        if ids:
+            columnas = [getattr(Cliente, campo) for campo in CAMPOS_RESUMEN]
+            with sesion_primaria() as db:
+                consulta = select(*columnas).where(Cliente.id.in_(ids))
+                filas = {fila.id: fila for fila in db.connection().execute(consulta)}
+        for op, cliente_id in cambios:
+            fila = filas.get(cliente_id) if op == "upsert" else None
+            if fila is not None:
+                self.upsert(fila)
+            else:
+                self.remove(cliente_id)
+
+    # ---------------------- BÚSQUEDA ----------------------
+    def buscar(self, texto: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Clientes con una palabra que empieza por cada término de `texto`.
+
+        "garc ma" encuentra "García Pérez, María". El primer término recorre
+        su rango en el índice; los demás se verifican contra las palabras del
+        cliente. Se corta al llegar a `limit`.
+        """
+        terminos = normalizar(texto).split()
+        if not terminos:
+            return []
+        primero, resto = terminos[0], terminos[1:]
+
+        resultados = []
+        vistos = set()
+        with self._lock:
+            posicion = bisect_left(self._entradas, (primero,))
+            while posicion < len(self._entradas) and len(resultados) < limit:
+                palabra, cliente_id = self._entradas[posicion]
+                if not palabra.startswith(primero):
+                    break
+                posicion += 1
+                if cliente_id in vistos:
+                    continue
+                vistos.add(cliente_id)
+                if coincide(self._palabras_por_id[cliente_id], resto):
+                    resultados.append(dict(self._resumenes[cliente_id]))
+        return resultados
+
+    def __len__(self):
+        return len(self._resumenes)
+
+
+# Instancia compartida por el proceso
+indice_clientes = IndiceNombresClientes()
+cache.al_recibir(IndiceNombresClientes.NAMESPACE, indice_clientes.recibir)
+
+
+def _reconciliar_clientes(cambios):
+    # El outbox entrega también lo que el pub/sub no trajo (mensaje perdido,
+    # escrituras de scripts o de otros servicios); upsert/remove son idempotentes
+    indice_clientes.aplicar(como_pares(cambios))
+
+
+despachador.suscribir("clientes", _reconciliar_clientes)
@@ -0,0 +1,207 @@
+import atexit
+import hashlib
+import io
+import json
+import os
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from fastapi.staticfiles import StaticFiles
+
+from app.core.config import settings
+
+# Imágenes de metrajes subidas por la API: MEDIA_DIR/metrajes/<sha256>/...
+# La carpeta es el hash del archivo original, así que su contenido nunca
+# cambia y se puede servir con Cache-Control immutable
+CARPETA = "metrajes"
+MANIFIESTO = "manifest.json"
+FORMATOS = {"webp": {"quality": 80, "method": 4}, "avif": {"quality": 55, "speed": 6}}
+# Formatos aceptados al subir: Pillow no prueba ningún otro decodificador
+FORMATOS_ENTRADA = ["JPEG", "PNG", "WEBP", "GIF"]
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _pillow():
+    try:
+        from PIL import Image, features
+    except ImportError as exc:
+        raise RuntimeError("Las imágenes de metrajes necesitan el paquete `Pillow`") from exc
+    return Image, features
+
+
+class FormatoNoSoportado(ValueError):
+    """El archivo no es una imagen en alguno de FORMATOS_ENTRADA."""
+
+
+class ImagenDemasiadoGrande(ValueError):
+    """La imagen declara más de IMAGEN_MAX_PIXELES (posible bomba de descompresión)."""
+
+
+def anchos_configurados() -> List[int]:
+    return sorted(int(ancho) for ancho in settings.IMAGEN_ANCHOS.split(",") if ancho.strip())
+
+
+# ---------------------- PROCESAMIENTO (en el pool) ----------------------
+def generar_variantes(contenido: bytes, anchos: List[int], max_pixeles: int) -> Dict[str, Any]:
+    """Decodifica la imagen y la codifica en cada formato y ancho (sin ampliar).
+
+    Corre en otro proceso: recibe y devuelve solo bytes y tipos simples.
+    Lanza FormatoNoSoportado si no es JPEG/PNG/WebP/GIF, ImagenDemasiadoGrande
+    si declara más de `max_pixeles` y ValueError si la imagen está dañada.
+    """
+    Image, features = _pillow()
+    from PIL import UnidentifiedImageError
+
+    # Pillow solo avisa entre MAX_IMAGE_PIXELS y el doble; acá se rechaza desde el límite
+    Image.MAX_IMAGE_PIXELS = max_pixeles
+    demasiado_grande = f"La imagen supera el máximo de {max_pixeles} píxeles"
+    try:
+        # open() ya lee las dimensiones de la cabecera y lanza DecompressionBombError
+        imagen = Image.open(io.BytesIO(contenido), formats=FORMATOS_ENTRADA)
+    except UnidentifiedImageError as exc:
+        raise FormatoNoSoportado(f"Formato no soportado; se aceptan {', '.join(FORMATOS_ENTRADA)}") from exc
+    except Image.DecompressionBombError as exc:
+        raise ImagenDemasiadoGrande(demasiado_grande) from exc
+    except OSError as exc:
+        raise ValueError(f"Imagen no válida: {exc}") from exc
+    if imagen.width * imagen.height > max_pixeles:
+        raise ImagenDemasiadoGrande(demasiado_grande)
+    try:
+        imagen.load()
+    except Image.DecompressionBombError as exc:
+        raise ImagenDemasiadoGrande(demasiado_grande) from exc
+    except OSError as exc:
+        raise ValueError(f"Imagen no válida: {exc}") from exc
+
+    formato_original = (imagen.format or "png").lower()
+    if imagen.mode not in ("RGB", "RGBA"):
+        imagen = imagen.convert("RGBA" if "A" in imagen.getbands() or "transparency" in imagen.info else "RGB")
+    ancho, alto = imagen.size
+    # Sin ampliar: los anchos mayores que el original se reemplazan por el original
+    destinos = sorted({min(objetivo, ancho) for objetivo in anchos} or {ancho})
+
+    variantes = []
+    for formato, opciones in FORMATOS.items():
+        if not features.check(formato):
+            continue
+        for destino in destinos:
+            escalada = imagen if destino == ancho else imagen.resize(
+                (destino, max(1, round(alto * destino / ancho))), Image.LANCZOS
+            )
+            salida = io.BytesIO()
+            escalada.save(salida, format=formato.upper(), **opciones)
+            variantes.append({"formato": formato, "ancho": destino, "contenido": salida.getvalue()})
+
+    return {"formato": formato_original, "ancho": ancho, "alto": alto, "variantes": variantes}
+
+
+@lru_cache(maxsize=1)
+def get_imagen_pool() -> ProcessPoolExecutor:
+    pool = ProcessPoolExecutor(max_workers=settings.IMAGEN_WORKERS or os.cpu_count() or 1)
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
+
+
+# ---------------------- ALMACENAMIENTO ----------------------
+def _raiz() -> Path:
+    return Path(settings.MEDIA_DIR) / CARPETA
+
+
+def url_imagen(huella: str, archivo: str) -> str:
+    return f"{settings.MEDIA_URL}/{CARPETA}/{huella}/{archivo}"
+
+
+def guardar_imagen(contenido: bytes) -> str:
+    """Procesa y guarda la imagen; devuelve la URL del original (la que va en Metraje.image).
+
+    Si el mismo archivo ya se subió antes no se vuelve a procesar.
+    """
+    huella = hashlib.sha256(contenido).hexdigest()
+    destino = _raiz() / huella
+    manifiesto = _leer_manifiesto(huella)
+    if manifiesto is not None:
+        return url_imagen(huella, manifiesto["original"])
+
+    resultado = get_imagen_pool().submit(
+        generar_variantes, contenido, anchos_configurados(), settings.IMAGEN_MAX_PIXELES
+    ).result()
+
+    # Se arma en una carpeta temporal y se renombra: nunca se sirve una carpeta a medias
+    temporal = _raiz() / f".tmp-{uuid.uuid4().hex}"
+    temporal.mkdir(parents=True)
+    original = f"original.{resultado['formato']}"
+    (temporal / original).write_bytes(contenido)
+    formatos: Dict[str, List[int]] = {}
+    for variante in resultado["variantes"]:
+        (temporal / f"{variante['ancho']}.{variante['formato']}").write_bytes(variante["contenido"])
+        formatos.setdefault(variante["formato"], []).append(variante["ancho"])
+    (temporal / MANIFIESTO).write_text(json.dumps({
+        "original": original, "ancho": resultado["ancho"], "alto": resultado["alto"], "formatos": formatos,
+    }))
+    try:
+        os.rename(temporal, destino)
+    except OSError:
+        # Otra petición guardó el mismo archivo mientras tanto
+        shutil.rmtree(temporal, ignore_errors=True)
+    return url_imagen(huella, original)
+
+
+# huella -> manifiesto; son inmutables, se leen del disco una sola vez por proceso
+_manifiestos: Dict[str, Dict[str, Any]] = {}
+
+
+def _leer_manifiesto(huella: str) -> Optional[Dict[str, Any]]:
+    manifiesto = _manifiestos.get(huella)
+    if manifiesto is None:
+        ruta = _raiz() / huella / MANIFIESTO
+        if not ruta.is_file():
+            return None
+        manifiesto = _manifiestos[huella] = json.loads(ruta.read_text())
+    return manifiesto
+
+
+def variantes_imagen(image: Optional[str]) -> Optional[Dict[str, Any]]:
+    """URLs de las variantes de una imagen subida por la API (None para rutas antiguas).
+
+    `thumbnail` es la WebP más chica; `webp`/`avif` son atributos srcset.
+    """
+    prefijo = f"{settings.MEDIA_URL}/{CARPETA}/"
+    if not image or not image.startswith(prefijo):
+        return None
+    huella = image[len(prefijo):].split("/", 1)[0]
+    if len(huella) != 64 or not all(c in "0123456789abcdef" for c in huella):
+        return None
+    manifiesto = _leer_manifiesto(huella)
+    if manifiesto is None:
+        return None
+    variantes = {
+        formato: ", ".join(f"{url_imagen(huella, f'{ancho}.{formato}')} {ancho}w" for ancho in anchos)
+        for formato, anchos in manifiesto["formatos"].items()
+    }
+    webp = manifiesto["formatos"].get("webp")
+    variantes["thumbnail"] = url_imagen(huella, f"{webp[0]}.webp") if webp else image
+    return variantes
+
+
+# ---------------------- SERVIDO ----------------------
+class MediaInmutable(StaticFiles):
+    """StaticFiles con Cache-Control immutable: las rutas cambian si cambia el contenido."""
+
+    def file_response(self, *args, **kwargs):
+        respuesta = super().file_response(*args, **kwargs)
+        respuesta.headers["Cache-Control"] = CACHE_INMUTABLE
+        return respuesta
+
+
+def crear_carpeta_media():
+    """Crea MEDIA_DIR al arrancar el worker (StaticFiles la exige en el primer request)."""
+    _raiz().mkdir(parents=True, exist_ok=True)
+
+
+def setup_media(app):
+    # Sin tocar el disco al importar: la carpeta se crea en el lifespan
+    app.mount(settings.MEDIA_URL, MediaInmutable(directory=settings.MEDIA_DIR, check_dir=False), name="media")
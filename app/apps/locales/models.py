@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DECIMAL, Enum, DateTime, func, BigInteger
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, DECIMAL, Enum, DateTime, func, BigInteger, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from sqlalchemy.orm import relationship, backref
-from app.db.connection import Base
+from app.db.connection import Base, SessionLocal
+from app.db.outbox import capturar_cambios
 import enum
 
 # Enum para Linea Base
@@ -55,6 +56,9 @@ class Categoria(Base):
     
 class Zona(Base): 
     __tablename__ = "zonas"
+    __table_args__ = (
+        Index("ix_zonas_categoria_id", "categoria_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     categoria_id = Column(Integer, ForeignKey("categorias.id", ondelete="CASCADE"), nullable=False)  
@@ -80,6 +84,17 @@ class Metraje(Base):
 
 class Cliente(Base):
     __tablename__ = "clientes"
+    __table_args__ = (
+        # Local.clientes y Zona.clientes (al borrar un local o una zona)
+        Index("ix_clientes_local_id", "local_id"),
+        Index("ix_clientes_zona_id", "zona_id"),
+        # /clientes/buscar (los nombres los busca el índice en memoria)
+        Index("ix_clientes_dni_cliente", "dni_cliente"),
+        Index("ix_clientes_ruc_cliente", "ruc_cliente"),
+        Index("ix_clientes_phone_cliente", "phone_cliente"),
+        # /reportes: cada tramo filtra un rango de fecha_registro
+        Index("ix_clientes_fecha_registro", "fecha_registro"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     nombres_cliente = Column(String(100), nullable=False)
@@ -118,14 +133,29 @@ class Cliente(Base):
     zona_id = Column(Integer, ForeignKey("zonas.id"), nullable=False)
     local_id = Column(Integer, ForeignKey("locales.id", ondelete="SET NULL"), nullable=True)
 
+    # Control de concurrencia optimista: cada UPDATE filtra por la versión leída
+    # y la incrementa; si otro la cambió antes, SQLAlchemy lanza StaleDataError
+    version = Column(Integer, nullable=False, server_default=text("1"))
+
     categoria = relationship("Categoria", back_populates="clientes")
     metraje = relationship("Metraje", back_populates="clientes")
     zona = relationship("Zona", back_populates="clientes")
     local = relationship("Local", back_populates="clientes")
 
+    # eager_defaults: fecha_registro (func.now()) vuelve en el mismo INSERT ... OUTPUT
+    __mapper_args__ = {"version_id_col": version, "eager_defaults": True}
+
 
 class Local(Base):
     __tablename__ = "locales"
+    __table_args__ = (
+        # /grupos y Zona.locales
+        Index("ix_locales_zona_id", "zona_id"),
+        # Local.subniveles y el CTE recursivo del árbol
+        Index("ix_locales_subnivel_de_id", "subnivel_de_id"),
+        # /reportes/locales/tipo
+        Index("ix_locales_estado", "estado"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     estado = Column(Enum(EstadoLocalEnum), default=EstadoLocalEnum.disponible)
@@ -151,4 +181,10 @@ class Local(Base):
 
     clientes = relationship("Cliente", back_populates="local")
 
+    version = Column(Integer, nullable=False, server_default=text("1"))
+
+    __mapper_args__ = {"version_id_col": version}
+
 
+# Cada escritura de locales y clientes deja su registro en outbox_cambios (misma transacción)
+capturar_cambios(SessionLocal, Local, Cliente)
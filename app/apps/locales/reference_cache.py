@@ -0,0 +1,202 @@
+import logging
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from app.apps.locales.models import Categoria, Zona, Metraje
+from app.core.cache import cache
+from app.db.connection import es_primaria
+
+logger = logging.getLogger("uvicorn")
+
+
+# ---------------------- REGISTROS INMUTABLES ----------------------
+class _Registro:
+    __slots__ = ()
+    _campos = ()
+
+    def __init__(self, **valores):
+        for campo in self._campos:
+            object.__setattr__(self, campo, valores[campo])
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError(f"{type(self).__name__} es inmutable")
+
+    def __repr__(self):
+        campos = ", ".join(f"{c}={getattr(self, c)!r}" for c in self._campos)
+        return f"{type(self).__name__}({campos})"
+
+    @classmethod
+    def desde_orm(cls, obj):
+        return cls(**{campo: getattr(obj, campo) for campo in cls._campos})
+
+
+class CategoriaRef(_Registro):
+    __slots__ = _campos = ("id", "nombre")
+
+
+class ZonaRef(_Registro):
+    __slots__ = _campos = ("id", "categoria_id", "codigo", "linea_base")
+
+
+class MetrajeRef(_Registro):
+    __slots__ = _campos = ("id", "area", "perimetro", "image")
+
+
+# ---------------------- CACHE ----------------------
+_TIPOS = {
+    Categoria: ("categorias", CategoriaRef),
+    Zona: ("zonas", ZonaRef),
+    Metraje: ("metrajes", MetrajeRef),
+}
+
+
+class _Snapshot:
+    __slots__ = ("categorias", "zonas", "zonas_por_codigo", "metrajes")
+
+    def __init__(self, categorias=None, zonas=None, metrajes=None):
+        self.categorias: Dict[int, CategoriaRef] = categorias or {}
+        self.zonas: Dict[int, ZonaRef] = zonas or {}
+        self.zonas_por_codigo: Dict[str, ZonaRef] = {z.codigo: z for z in self.zonas.values()}
+        self.metrajes: Dict[int, MetrajeRef] = metrajes or {}
+
+
+class ReferenceCache:
+    """Categorías, zonas y metrajes en memoria como registros inmutables.
+
+    Las lecturas no toman lock: cada recarga o escritura arma un snapshot
+    nuevo y lo reemplaza de una vez (un snapshot publicado no se modifica).
+    Los handlers de escritura llaman a `recargar(db)` o `guardar(obj)`, que
+    además avisan a los demás workers por la cache compartida.
+    """
+
+    NAMESPACE = "referencias"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+
+    @property
+    def cargado(self) -> bool:
+        return self._snapshot is not None
+
+    def cargar(self, db: Session):
+        snapshot = _Snapshot(
+            categorias={c.id: CategoriaRef.desde_orm(c) for c in db.query(Categoria).all()},
+            zonas={z.id: ZonaRef.desde_orm(z) for z in db.query(Zona).all()},
+            metrajes={m.id: MetrajeRef.desde_orm(m) for m in db.query(Metraje).all()},
+        )
+        with self._lock:
+            self._snapshot = snapshot
+
+    def asegurar_cargado(self, db: Session):
+        if not self.cargado:
+            self.cargar(db)
+
+    def recargar(self, db: Session):
+        self.cargar(db)
+        cache.invalidar(self.NAMESPACE)
+
+    def invalidar(self):
+        with self._lock:
+            self._snapshot = None
+
+    # Copy-on-write: se copia solo el diccionario afectado y se reemplaza el
+    # snapshot de una vez; quien esté leyendo sigue con el anterior intacto
+    def _reemplazar(self, atributo: str, obj_id: int, registro=None):
+        with self._lock:
+            actual = self._snapshot
+            if actual is None:
+                return
+            tablas = {"categorias": actual.categorias, "zonas": actual.zonas, "metrajes": actual.metrajes}
+            tabla = dict(tablas[atributo])
+            if registro is None:
+                tabla.pop(obj_id, None)
+            else:
+                tabla[obj_id] = registro
+            tablas[atributo] = tabla
+            self._snapshot = _Snapshot(**tablas)
+
+    # Tras una escritura puntual se actualiza el snapshot con el objeto ya
+    # conocido (sin releer las tablas) y se avisa a los demás workers
+    def guardar(self, obj):
+        atributo, registro_cls = _TIPOS[type(obj)]
+        registro = registro_cls.desde_orm(obj)
+        self._reemplazar(atributo, registro.id, registro)
+        cache.invalidar(self.NAMESPACE)
+
+    def quitar(self, modelo, obj_id: int):
+        atributo, _ = _TIPOS[modelo]
+        self._reemplazar(atributo, obj_id)
+        cache.invalidar(self.NAMESPACE)
+
+    # Sin `db` solo se consulta la memoria; con `db`, un fallo lee la fila
+    # (read-through) y la agrega al snapshot vigente
+    def categoria(self, categoria_id: Optional[int], db: Session = None) -> Optional[CategoriaRef]:
+        return self._buscar("categorias", Categoria, CategoriaRef, categoria_id, db)
+
+    def zona(self, zona_id: Optional[int], db: Session = None) -> Optional[ZonaRef]:
+        return self._buscar("zonas", Zona, ZonaRef, zona_id, db)
+
+    def metraje(self, metraje_id: Optional[int], db: Session = None) -> Optional[MetrajeRef]:
+        return self._buscar("metrajes", Metraje, MetrajeRef, metraje_id, db)
+
+    def zona_por_codigo(self, codigo: str) -> Optional[ZonaRef]:
+        snapshot = self._snapshot
+        return snapshot.zonas_por_codigo.get(codigo) if snapshot else None
+
+    def _buscar(self, atributo, modelo, registro_cls, obj_id, db):
+        if obj_id is None:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None:
+            registro = getattr(snapshot, atributo).get(obj_id)
+            if registro is not None:
+                return registro
+        if db is None:
+            return None
+        obj = db.query(modelo).filter(modelo.id == obj_id).first()
+        if obj is None:
+            return None
+        registro = registro_cls.desde_orm(obj)
+        # Solo lo leído en la primaria entra al snapshot (la réplica puede ir atrasada)
+        if es_primaria(db):
+            self._reemplazar(atributo, obj_id, registro)
+        return registro
+
+
+referencias = ReferenceCache()
+
+
+def cargar_referencias_al_iniciar(db_factory):
+    db = db_factory()
+    try:
+        referencias.cargar(db)
+    except Exception:
+        # Sin cache los serializadores usan las relaciones ORM
+        logger.warning("No se pudo precargar la cache de referencia", exc_info=True)
+    finally:
+        db.close()
+
+
+def _recargar_por_invalidacion():
+    # Otro worker modificó categorías/zonas/metrajes: se recarga con sesión propia
+    from app.db.connection import get_engine, SessionLocal
+    get_engine()
+    cargar_referencias_al_iniciar(SessionLocal)
+
+
+cache.al_invalidar(ReferenceCache.NAMESPACE, _recargar_por_invalidacion)
+
+
+# Los serializadores usan estos helpers en lugar de `local.zona` / `local.metraje`:
+# sin cache (o con un id desconocido) se cae a la relación ORM
+def zona_de(obj):
+    zona = referencias.zona(obj.zona_id)
+    return zona if zona is not None else obj.zona
+
+
+def metraje_de(obj):
+    metraje = referencias.metraje(obj.metraje_id)
+    return metraje if metraje is not None else obj.metraje
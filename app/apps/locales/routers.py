@@ -1,28 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile
 from datetime import datetime
-from sqlalchemy.orm import Session, joinedload, subqueryload
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload, subqueryload, contains_eager
 from fastapi.encoders import jsonable_encoder
-from typing import List
-from app.db.connection import get_db
+from typing import List, Optional
+from app.db.connection import get_db, get_read_db
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.idempotency import ejecutar_idempotente
+from app.core.http_cache import (
+    versiones_tablas, respuesta_no_modificada, aplicar_cabeceras_cache,
+    etag_version, exigir_if_match, commit_optimista
+)
 from app.apps.locales.schemas import (
     CategoriaCreate, CategoriaResponse,
     ZonaCreate, ZonaResponse, ZonaUpdate,
     MetrajeCreate, MetrajeResponse,
     ClienteCreate, ClienteResponse, ClienteUpdate,
     LocalCreate, LocalResponse, LocalUpdate,
-    ResponseGrupoLocales, GrupoLocalesSchema, LocalSchema
+    ResponseGrupoLocales, GrupoLocalesSchema, LocalSchema,
+    EstadoLocalEnum, TipoLocalEnum, LineaBaseEnum,
+    LocalDetalleResponse, ClienteDetalleResponse, ClienteResumenResponse,
+    LOCAL_DETALLE_ADAPTER, LOCALES_DETALLE_ADAPTER, CLIENTE_DETALLE_ADAPTER, CLIENTES_DETALLE_ADAPTER
 )
 from app.apps.locales.models import Categoria, Zona, Metraje, Cliente, Local
 from app.apps.locales.utils import (
     procesar_local_recursivo,
-    combinar_grupos_con_bd
+    combinar_grupos_con_bd,
+    cargar_grupos_estaticos,
+    serialize_local_with_subniveles,
+    serialize_local_detalle,
+    serialize_cliente,
+    respuesta_json
+)
+from app.apps.locales.services import ArbolLocalesInvalido, get_local_tree, ids_arbol
+from app.apps.locales.search_index import indice_locales
+from app.apps.locales.clientes_index import (
+    indice_clientes, CAMPOS_RESUMEN, coincide, normalizar, palabras_nombre
 )
+from app.apps.locales.reference_cache import referencias, zona_de
+from app.apps.locales.imagenes import FormatoNoSoportado, ImagenDemasiadoGrande, guardar_imagen
 
 router = APIRouter()
 
 # ---------------------- CATEGORIA ----------------------
+# Los catálogos con ETag leen de la primaria: la versión de la tabla avanza con el
+# commit en la primaria, y una réplica atrasada serviría filas viejas bajo el ETag nuevo
+# (con 304 hasta la siguiente escritura). Son tablas chicas y los 304 no tocan la base
 @router.get("/categorias", response_model=List[CategoriaResponse])
-def listar_categorias(db: Session = Depends(get_db)):
+def listar_categorias(request: Request, response: Response, db: Session = Depends(get_db)):
+    no_modificado = respuesta_no_modificada(request, "categorias")
+    if no_modificado:
+        return no_modificado
+    aplicar_cabeceras_cache(response, "categorias")
     return db.query(Categoria).all()
 
 @router.post("/categorias", response_model=CategoriaResponse)
@@ -30,7 +60,8 @@ def crear_categoria(categoria: CategoriaCreate, db: Session = Depends(get_db)):
     nueva_categoria = Categoria(**categoria.dict())
     db.add(nueva_categoria)
     db.commit()
-    db.refresh(nueva_categoria)
+    versiones_tablas.bump("categorias")
+    referencias.guardar(nueva_categoria)
     return nueva_categoria
 
 @router.delete("/categorias/{categoria_id}")
@@ -40,12 +71,22 @@ def eliminar_categoria(categoria_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Categoría no encontrada")
     db.delete(categoria)
     db.commit()
+    # Las zonas de la categoría se borran en cascada
+    versiones_tablas.bump("categorias", "zonas")
+    referencias.recargar(db)
     return {"message": "Categoría eliminada"}
 
 # ---------------------- ZONA ----------------------
 @router.get("/zonas", response_model=List[ZonaResponse])
-def listar_zonas(db: Session = Depends(get_db)):
-    zonas = db.query(Zona).join(Categoria).all()
+def listar_zonas(request: Request, response: Response, db: Session = Depends(get_db)):
+    # La respuesta incluye el nombre de la categoría: depende de ambas tablas
+    no_modificado = respuesta_no_modificada(request, "zonas", "categorias")
+    if no_modificado:
+        return no_modificado
+    aplicar_cabeceras_cache(response, "zonas", "categorias")
+
+    # contains_eager: la categoría sale del mismo JOIN, sin un SELECT por zona
+    zonas = db.query(Zona).join(Categoria).options(contains_eager(Zona.categoria)).all()
 
     return [
         {
@@ -61,14 +102,19 @@ def listar_zonas(db: Session = Depends(get_db)):
 # ✅ 📌 POST - Crear una zona
 @router.post("/zonas", response_model=ZonaResponse)
 def crear_zona(zona: ZonaCreate, db: Session = Depends(get_db)):
+    categoria = referencias.categoria(zona.categoria_id, db)
+    if not categoria:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+
     nueva_zona = Zona(**zona.dict())
     db.add(nueva_zona)
     db.commit()
-    db.refresh(nueva_zona)
+    versiones_tablas.bump("zonas")
+    referencias.guardar(nueva_zona)
 
     return {
         "id": nueva_zona.id,
-        "categoria": {"nombre": nueva_zona.categoria.nombre},  # 🔥 Devuelve el nombre en lugar del ID
+        "categoria": {"nombre": categoria.nombre},  # 🔥 Devuelve el nombre en lugar del ID
         "codigo": nueva_zona.codigo,
         "linea_base": nueva_zona.linea_base.value
     }
@@ -84,10 +130,24 @@ def actualizar_zona(zona_id: int, zona_data: ZonaUpdate, db: Session = Depends(g
 
     for key, value in zona_data.dict(exclude_unset=True).items():
         setattr(zona, key, value)
+    categoria = referencias.categoria(zona.categoria_id, db)
+    if not categoria:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
 
     db.commit()
-    db.refresh(zona)
-    return zona
+    versiones_tablas.bump("zonas")
+    referencias.guardar(zona)
+
+    # La linea_base vive en la zona: reindexar sus locales
+    for local in zona.locales:
+        indice_locales.upsert(local)
+    indice_locales.publicar([("upsert", local.id) for local in zona.locales])
+    return {
+        "id": zona.id,
+        "categoria": {"nombre": categoria.nombre},
+        "codigo": zona.codigo,
+        "linea_base": zona.linea_base.value
+    }
 
 # ✅ 📌 DELETE - Eliminar una zona
 @router.delete("/zonas/{zona_id}")
@@ -97,11 +157,19 @@ def eliminar_zona(zona_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Zona no encontrada")
     db.delete(zona)
     db.commit()
+    versiones_tablas.bump("zonas")
+    referencias.quitar(Zona, zona_id)
+    indice_locales.invalidar()
+    indice_locales.publicar()
     return {"message": "Zona eliminada"}
 
 # ---------------------- METRAJE ----------------------
 @router.get("/metrajes", response_model=List[MetrajeResponse])
-def listar_metrajes(db: Session = Depends(get_db)):
+def listar_metrajes(request: Request, response: Response, db: Session = Depends(get_db)):
+    no_modificado = respuesta_no_modificada(request, "metrajes")
+    if no_modificado:
+        return no_modificado
+    aplicar_cabeceras_cache(response, "metrajes")
     return db.query(Metraje).all()
 
 @router.post("/metrajes", response_model=MetrajeResponse)
@@ -109,9 +177,39 @@ def crear_metraje(metraje: MetrajeCreate, db: Session = Depends(get_db)):
     nuevo_metraje = Metraje(**metraje.dict())
     db.add(nuevo_metraje)
     db.commit()
-    db.refresh(nuevo_metraje)
+    versiones_tablas.bump("metrajes")
+    referencias.guardar(nuevo_metraje)
     return nuevo_metraje
 
+# ✅ 📌 POST - Subir la imagen de un metraje: se guardan el original y sus variantes
+# WebP/AVIF por ancho (procesadas en un pool de procesos) bajo /media, inmutables
+@router.post("/metrajes/{metraje_id}/imagen", response_model=MetrajeResponse)
+def subir_imagen_metraje(metraje_id: int, archivo: UploadFile = File(...), db: Session = Depends(get_db)):
+    metraje = db.query(Metraje).filter(Metraje.id == metraje_id).first()
+    if not metraje:
+        raise HTTPException(status_code=404, detail="Metraje no encontrado")
+
+    contenido = archivo.file.read(settings.IMAGEN_MAX_BYTES + 1)
+    if len(contenido) > settings.IMAGEN_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="La imagen supera el tamaño máximo")
+    try:
+        metraje.image = guardar_imagen(contenido)
+    except ImagenDemasiadoGrande as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    except FormatoNoSoportado as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    except RuntimeError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
+
+    db.commit()
+    versiones_tablas.bump("metrajes")
+    # El índice de locales no guarda la imagen: /grupos la toma en cuenta por la
+    # versión de metrajes en su clave
+    referencias.guardar(metraje)
+    return metraje
+
 @router.delete("/metrajes/{metraje_id}")
 def eliminar_metraje(metraje_id: int, db: Session = Depends(get_db)):
     metraje = db.query(Metraje).filter(Metraje.id == metraje_id).first()
@@ -119,146 +217,124 @@ def eliminar_metraje(metraje_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Metraje no encontrado")
     db.delete(metraje)
     db.commit()
+    versiones_tablas.bump("metrajes")
+    referencias.quitar(Metraje, metraje_id)
+    indice_locales.invalidar()
+    indice_locales.publicar()
     return {"message": "Metraje eliminado"}
 
 # ---------------------- CLIENTE ----------------------
 
-@router.get("/clientes/", response_model=list)
-def listar_clientes(db: Session = Depends(get_db)):
-    clientes = db.query(Cliente).all()
-
-    response_data = []
-    for cliente in clientes:
-        cliente_data = {
-            "id": cliente.id,
-            "nombres_cliente": cliente.nombres_cliente,
-            "apellidos_cliente": cliente.apellidos_cliente,
-            "dni_cliente": cliente.dni_cliente,
-            "ruc_cliente": cliente.ruc_cliente,
-            "ocupacion_cliente": cliente.ocupacion_cliente,
-            "phone_cliente": cliente.phone_cliente,
-            "direccion_cliente": cliente.direccion_cliente,
-            "mail_cliente": cliente.mail_cliente,
-            "nombres_conyuge": cliente.nombres_conyuge,
-            "dni_conyuge": cliente.dni_conyuge,
-            "metodo_separacion": cliente.metodo_separacion.value,
-            "moneda": cliente.moneda.value,
-            "numero_operacion": cliente.numero_operacion,
-            "fecha_plazo": cliente.fecha_plazo,
-            "monto_arras": cliente.monto_arras,
-            "fecha_registro": cliente.fecha_registro,
-        }
+@router.get("/clientes/", response_model=List[ClienteDetalleResponse])
+def listar_clientes(db: Session = Depends(get_read_db)):
+    # El local de cada cliente sale en el mismo SELECT
+    clientes = db.query(Cliente).options(joinedload(Cliente.local)).all()
+
+    return respuesta_json(CLIENTES_DETALLE_ADAPTER, [serialize_cliente(cliente) for cliente in clientes])
+
+
+# ✅ 📌 GET - Buscar clientes: DNI/RUC/teléfono van a la base (columnas indexadas);
+# el texto `q` busca por prefijo en nombres y apellidos sin tildes (índice en memoria)
+@router.get("/clientes/buscar", response_model=List[ClienteResumenResponse])
+def buscar_clientes(
+    dni: Optional[int] = None,
+    ruc: Optional[int] = None,
+    telefono: Optional[int] = None,
+    q: Optional[str] = Query(None, min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_read_db)
+):
+    filtros = [
+        columna == valor
+        for columna, valor in (
+            (Cliente.dni_cliente, dni),
+            (Cliente.ruc_cliente, ruc),
+            (Cliente.phone_cliente, telefono),
+        )
+        if valor is not None
+    ]
+    if not filtros and not q:
+        raise HTTPException(status_code=400, detail="Indique dni, ruc, telefono o q")
 
-        if cliente.local:
-            cliente_data["local"] = {
-                "zona_codigo": cliente.local.zona.codigo if cliente.local.zona else None,
-                "estado": cliente.local.estado.value,
-                "precio_base": cliente.local.precio_base,
-                "tipo": cliente.local.tipo.value,
-                "metraje": {
-                    "area": cliente.local.metraje.area if cliente.local.metraje else None,
-                    "perimetro": cliente.local.metraje.perimetro if cliente.local.metraje else None,
-                    "image": cliente.local.metraje.image if cliente.local.metraje else None
-                } if cliente.local.metraje else None
-            }
-
-            if cliente.local.subnivel_de:
-                cliente_data["local"]["subnivel_de"] = {
-                    "categoria_id": cliente.local.zona.categoria_id if cliente.local.zona else None,
-                    "codigo": cliente.local.zona.codigo if cliente.local.zona else None,
-                    "linea_base": cliente.local.zona.linea_base.value if cliente.local.zona else None
-                }
-
-        response_data.append(cliente_data)
-
-    return response_data
-
-
-@router.get("/clientes/{cliente_id}", response_model=dict)
-def obtener_cliente(cliente_id: int, db: Session = Depends(get_db)):
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+    if not filtros:
+        indice_clientes.asegurar_cargado(db)
+        return indice_clientes.buscar(q, limit)
+
+    columnas = [getattr(Cliente, campo) for campo in CAMPOS_RESUMEN]
+    filas = db.execute(select(*columnas).where(*filtros).order_by(Cliente.id).limit(limit if not q else None)).all()
+    resultados = [dict(zip(CAMPOS_RESUMEN, fila)) for fila in filas]
+    if q:
+        terminos = normalizar(q).split()
+        resultados = [r for r in resultados if coincide(palabras_nombre(r), terminos)][:limit]
+    return resultados
+
+
+@router.get("/clientes/{cliente_id}", response_model=ClienteDetalleResponse)
+def obtener_cliente(cliente_id: int, db: Session = Depends(get_read_db)):
+    cliente = db.query(Cliente).options(joinedload(Cliente.local)).filter(Cliente.id == cliente_id).first()
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
 
-    cliente_data = {
-        "id": cliente.id,
-        "nombres_cliente": cliente.nombres_cliente,
-        "apellidos_cliente": cliente.apellidos_cliente,
-        "dni_cliente": cliente.dni_cliente,
-        "ruc_cliente": cliente.ruc_cliente,
-        "ocupacion_cliente": cliente.ocupacion_cliente,
-        "phone_cliente": cliente.phone_cliente,
-        "direccion_cliente": cliente.direccion_cliente,
-        "mail_cliente": cliente.mail_cliente,
-        "nombres_conyuge": cliente.nombres_conyuge,
-        "dni_conyuge": cliente.dni_conyuge,
-        "metodo_separacion": cliente.metodo_separacion.value,
-        "moneda": cliente.moneda.value,
-        "numero_operacion": cliente.numero_operacion,
-        "fecha_plazo": cliente.fecha_plazo,
-        "monto_arras": cliente.monto_arras,
-        "fecha_registro": cliente.fecha_registro,
-    }
-
-    if cliente.local:
-        cliente_data["local"] = {
-            "zona_codigo": cliente.local.zona.codigo if cliente.local.zona else None,
-            "estado": cliente.local.estado.value,
-            "precio_base": cliente.local.precio_base,
-            "tipo": cliente.local.tipo.value,
-            "metraje": {
-                "area": cliente.local.metraje.area if cliente.local.metraje else None,
-                "perimetro": cliente.local.metraje.perimetro if cliente.local.metraje else None,
-                "image": cliente.local.metraje.image if cliente.local.metraje else None
-            } if cliente.local.metraje else None
-        }
+    # El PUT debe enviar este ETag en If-Match
+    return respuesta_json(CLIENTE_DETALLE_ADAPTER, serialize_cliente(cliente), {"ETag": etag_version(cliente)})
 
-        if cliente.local.subnivel_de:
-            cliente_data["local"]["subnivel_de"] = {
-                "categoria_id": cliente.local.zona.categoria_id if cliente.local.zona else None,
-                "codigo": cliente.local.zona.codigo if cliente.local.zona else None,
-                "linea_base": cliente.local.zona.linea_base.value if cliente.local.zona else None
-            }
 
-    return cliente_data
+@router.post("/clientes/", response_model=ClienteDetalleResponse)
+def crear_cliente(cliente_data: ClienteCreate, request: Request, db: Session = Depends(get_db)):
+    # Un reintento con el mismo Idempotency-Key devuelve la respuesta guardada sin tocar la base
+    return ejecutar_idempotente(
+        request, cliente_data, lambda: _crear_cliente(cliente_data, db), CLIENTE_DETALLE_ADAPTER
+    )
 
 
-@router.post("/clientes/", response_model=dict)
-def crear_cliente(cliente_data: ClienteCreate, db: Session = Depends(get_db)):
+def _crear_cliente(cliente_data: ClienteCreate, db: Session):
     local = db.query(Local).filter(Local.id == cliente_data.local_id).first()
     if not local:
         raise HTTPException(status_code=404, detail="Local no encontrado")
 
+    zona = zona_de(local)
     nuevo_cliente = Cliente(
         **cliente_data.dict(exclude={"local_id"}),
-        categoria_id=local.zona.categoria_id if local.zona else None,
+        categoria_id=zona.categoria_id if zona else None,
         metraje_id=local.metraje_id,
         zona_id=local.zona_id,
         local_id=cliente_data.local_id,
         fecha_registro=datetime.utcnow()
     )
+    # El local ya está cargado: la respuesta no lo vuelve a consultar
+    nuevo_cliente.local = local
 
     db.add(nuevo_cliente)
     db.commit()
-    db.refresh(nuevo_cliente)
+    indice_clientes.upsert(nuevo_cliente)
+    indice_clientes.publicar([("upsert", nuevo_cliente.id)])
 
-    return obtener_cliente(nuevo_cliente.id, db)
+    return serialize_cliente(nuevo_cliente)
 
 
-@router.put("/clientes/{cliente_id}", response_model=dict)
-def actualizar_cliente(cliente_id: int, cliente_data: ClienteUpdate, db: Session = Depends(get_db)):
-    cliente = db.query(Cliente).filter(Cliente.id == cliente_id).first()
+@router.put("/clientes/{cliente_id}", response_model=ClienteDetalleResponse)
+def actualizar_cliente(
+    cliente_id: int, cliente_data: ClienteUpdate, request: Request, response: Response,
+    db: Session = Depends(get_db)
+):
+    # El local sale en el mismo SELECT: la respuesta no lo consulta aparte
+    cliente = db.query(Cliente).options(joinedload(Cliente.local)).filter(Cliente.id == cliente_id).first()
     if not cliente:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
+    # Sin locks: si otra petición actualiza entre la lectura y el commit, el
+    # UPDATE ... WHERE version = :leida no afecta filas y se responde 412
+    exigir_if_match(request, cliente)
 
     update_data = cliente_data.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(cliente, key, value)
 
-    db.commit()
-    db.refresh(cliente)
+    commit_optimista(db)
+    indice_clientes.upsert(cliente)
+    indice_clientes.publicar([("upsert", cliente.id)])
 
-    return obtener_cliente(cliente.id, db)
+    response.headers["ETag"] = etag_version(cliente)
+    return serialize_cliente(cliente)
 
 
 # ✅ 📌 DELETE - Eliminar un cliente
@@ -270,6 +346,8 @@ def eliminar_cliente(cliente_id: int, db: Session = Depends(get_db)):
 
     db.delete(cliente)
     db.commit()
+    indice_clientes.remove(cliente_id)
+    indice_clientes.publicar([("remove", cliente_id)])
 
     return {"message": "Cliente eliminado correctamente"}
 
@@ -278,75 +356,74 @@ def eliminar_cliente(cliente_id: int, db: Session = Depends(get_db)):
 # ---------------------- LOCAL ----------------------
 
 # ✅ 📌 GET - Listar locales
-@router.get("/locales/", response_model=list)
-def get_locales(db: Session = Depends(get_db)):
+@router.get("/locales/", response_model=List[LocalDetalleResponse])
+def get_locales(db: Session = Depends(get_read_db)):
     locales = db.query(Local).all()
 
-    response_data = []
-    for local in locales:
-        local_data = {
-            "zona_codigo": local.zona.codigo if local.zona else None,
-            "estado": local.estado.value,
-            "precio_base": local.precio_base,
-            "tipo": local.tipo.value,
-            "metraje": {
-                "area": local.metraje.area if local.metraje else None,
-                "perimetro": local.metraje.perimetro if local.metraje else None,
-                "image": local.metraje.image if local.metraje else None
-            } if local.metraje else None
-        }
-
-        # ✅ Solo incluir `subnivel_de` si tiene datos
-        if local.subnivel_de:
-            local_data["subnivel_de"] = {
-                "categoria_id": local.zona.categoria_id if local.zona else None,
-                "codigo": local.zona.codigo if local.zona else None,
-                "linea_base": local.zona.linea_base.value if local.zona else None
-            }
-
-        response_data.append(local_data)
-
-    return response_data
+    return respuesta_json(LOCALES_DETALLE_ADAPTER, [serialize_local_detalle(local) for local in locales])
+
+
+# ✅ 📌 GET - Buscar locales por rango de precio/área y facetas (índice en memoria)
+@router.get("/locales/buscar", response_model=list)
+def buscar_locales(
+    precio_min: Optional[float] = Query(None, ge=0),
+    precio_max: Optional[float] = Query(None, ge=0),
+    area_min: Optional[float] = Query(None, ge=0),
+    area_max: Optional[float] = Query(None, ge=0),
+    estado: Optional[EstadoLocalEnum] = None,
+    tipo: Optional[TipoLocalEnum] = None,
+    linea_base: Optional[LineaBaseEnum] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db)
+):
+    indice_locales.asegurar_cargado(db)
+    return indice_locales.buscar(
+        precio_min=precio_min,
+        precio_max=precio_max,
+        area_min=area_min,
+        area_max=area_max,
+        estado=estado,
+        tipo=tipo,
+        linea_base=linea_base,
+        limit=limit,
+    )
 
 
 # ✅ 📌 GET - Obtener un local por ID
-@router.get("/locales/{local_id}", response_model=dict)
-def get_local(local_id: int, db: Session = Depends(get_db)):
+@router.get("/locales/{local_id}", response_model=LocalDetalleResponse)
+def get_local(local_id: int, db: Session = Depends(get_read_db)):
     local = db.query(Local).filter(Local.id == local_id).first()
     if not local:
         raise HTTPException(status_code=404, detail="Local no encontrado")
 
-    local_data = {
-        "zona_codigo": local.zona.codigo if local.zona else None,
-        "estado": local.estado.value,
-        "precio_base": local.precio_base,
-        "tipo": local.tipo.value,
-        "metraje": {
-            "area": local.metraje.area if local.metraje else None,
-            "perimetro": local.metraje.perimetro if local.metraje else None,
-            "image": local.metraje.image if local.metraje else None
-        } if local.metraje else None
-    }
+    return respuesta_json(LOCAL_DETALLE_ADAPTER, serialize_local_detalle(local), {"ETag": etag_version(local)})
 
-    # ✅ Solo incluir `subnivel_de` si tiene datos
-    if local.subnivel_de:
-        local_data["subnivel_de"] = {
-            "categoria_id": local.zona.categoria_id if local.zona else None,
-            "codigo": local.zona.codigo if local.zona else None,
-            "linea_base": local.zona.linea_base.value if local.zona else None
-        }
 
-    return local_data
+# ✅ 📌 GET - Obtener un local con todo su árbol de subniveles (un solo query)
+@router.get("/locales/{local_id}/arbol", response_model=dict)
+def get_local_arbol(local_id: int, db: Session = Depends(get_read_db)):
+    try:
+        local = get_local_tree(db, local_id)
+    except ArbolLocalesInvalido as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    if not local:
+        raise HTTPException(status_code=404, detail="Local no encontrado")
+
+    return serialize_local_with_subniveles(local)
 
 
 # ✅ 📌 POST - Crear un local
-@router.post("/locales/", response_model=dict)
-def create_local(local: LocalCreate, db: Session = Depends(get_db)):
-    zona = db.query(Zona).filter(Zona.id == local.zona_id).first() if local.zona_id else None
+@router.post("/locales/", response_model=LocalDetalleResponse)
+def create_local(local: LocalCreate, request: Request, db: Session = Depends(get_db)):
+    return ejecutar_idempotente(request, local, lambda: _create_local(local, db), LOCAL_DETALLE_ADAPTER)
+
+
+def _create_local(local: LocalCreate, db: Session):
+    zona = referencias.zona(local.zona_id, db)
     if local.zona_id and not zona:
         raise HTTPException(status_code=404, detail="Zona no encontrada")
 
-    metraje = db.query(Metraje).filter(Metraje.id == local.metraje_id).first() if local.metraje_id else None
+    metraje = referencias.metraje(local.metraje_id, db)
     if local.metraje_id and not metraje:
         raise HTTPException(status_code=404, detail="Metraje no encontrado")
 
@@ -361,66 +438,33 @@ def create_local(local: LocalCreate, db: Session = Depends(get_db)):
 
     db.add(new_local)
     db.commit()
-    db.refresh(new_local)
-
-    response_data = {
-        "zona_codigo": new_local.zona.codigo if new_local.zona else None,
-        "estado": new_local.estado.value,
-        "precio_base": new_local.precio_base,
-        "tipo": new_local.tipo.value,
-        "metraje": {
-            "area": new_local.metraje.area if new_local.metraje else None,
-            "perimetro": new_local.metraje.perimetro if new_local.metraje else None,
-            "image": new_local.metraje.image if new_local.metraje else None
-        } if new_local.metraje else None
-    }
-
-    # ✅ Solo incluir `subnivel_de` si tiene datos
-    if new_local.subnivel_de:
-        response_data["subnivel_de"] = {
-            "categoria_id": new_local.zona.categoria_id if new_local.zona else None,
-            "codigo": new_local.zona.codigo if new_local.zona else None,
-            "linea_base": new_local.zona.linea_base.value if new_local.zona else None
-        }
+    indice_locales.upsert(new_local)
+    indice_locales.publicar([("upsert", new_local.id)])
 
-    return response_data
+    return serialize_local_detalle(new_local)
 
 
 # ✅ 📌 PUT - Actualizar un local
-@router.put("/locales/{local_id}", response_model=dict)
-def actualizar_local(local_id: int, local_data: LocalCreate, db: Session = Depends(get_db)):
+@router.put("/locales/{local_id}", response_model=LocalDetalleResponse)
+def actualizar_local(
+    local_id: int, local_data: LocalCreate, request: Request, response: Response,
+    db: Session = Depends(get_db)
+):
     local = db.query(Local).filter(Local.id == local_id).first()
     if not local:
         raise HTTPException(status_code=404, detail="Local no encontrado")
+    exigir_if_match(request, local)
 
-    update_data = jsonable_encoder(local_data)
-    for key, value in update_data.items():
+    # .dict() conserva los tipos (enums, Decimal): la respuesta no necesita releer la fila
+    for key, value in local_data.dict().items():
         setattr(local, key, value)
 
-    db.commit()
-    db.refresh(local)
-
-    response_data = {
-        "zona_codigo": local.zona.codigo if local.zona else None,
-        "estado": local.estado.value,
-        "precio_base": local.precio_base,
-        "tipo": local.tipo.value,
-        "metraje": {
-            "area": local.metraje.area if local.metraje else None,
-            "perimetro": local.metraje.perimetro if local.metraje else None,
-            "image": local.metraje.image if local.metraje else None
-        } if local.metraje else None
-    }
-
-    # ✅ Solo incluir `subnivel_de` si tiene datos
-    if local.subnivel_de:
-        response_data["subnivel_de"] = {
-            "categoria_id": local.zona.categoria_id if local.zona else None,
-            "codigo": local.zona.codigo if local.zona else None,
-            "linea_base": local.zona.linea_base.value if local.zona else None
-        }
+    commit_optimista(db)
+    indice_locales.upsert(local)
+    indice_locales.publicar([("upsert", local.id)])
 
-    return response_data
+    response.headers["ETag"] = etag_version(local)
+    return serialize_local_detalle(local)
 
 
 # ✅ 📌 DELETE - Eliminar un local
@@ -430,1264 +474,44 @@ def eliminar_local(local_id: int, db: Session = Depends(get_db)):
     if not local:
         raise HTTPException(status_code=404, detail="Local no encontrado")
 
+    # Los subniveles se borran en cascada y los clientes de todo el árbol quedan
+    # con local_id NULL: se anotan antes para actualizar solo esas entradas
+    # Con un ciclo o un árbol cortado el borrado en cascada no coincidiría con los índices
+    try:
+        ids_locales = ids_arbol(db, local_id)
+    except ArbolLocalesInvalido as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    ids_clientes = db.execute(select(Cliente.id).where(Cliente.local_id.in_(ids_locales))).scalars().all()
     db.delete(local)
     db.commit()
+    cambios_locales = [("remove", id_local) for id_local in ids_locales]
+    indice_locales.aplicar(cambios_locales)
+    indice_locales.publicar(cambios_locales)
+    cambios_clientes = [("upsert", id_cliente) for id_cliente in ids_clientes]
+    indice_clientes.aplicar(cambios_clientes)
+    indice_clientes.publicar(cambios_clientes)
 
     return {"message": "Local eliminado correctamente"}
 
 
 
+# Primaria: el resultado se guarda en la cache compartida (la sesión no abre
+# conexión si la respuesta sale de la cache)
 @router.get("/grupos", response_model=dict)
 def get_grupos(db: Session = Depends(get_db)):
+    return grupos_cacheados(db)
 
-    # Aquí copias tal cual tu estructura estática
-    grupos_estaticos = [
-        {
-            "tipo": "entrada segundaria grupo 1 izquierda",
-            "locales": [
-                {
-                    "zona_codigo": "PT 1",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 2",
-                    "precio": "$51,990",
-                    "estado": "Reservado",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 3",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 4",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 9",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 10",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 10",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 11",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 12",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 12",
-                            "precio": "$28,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 13",
-                            "precio": "$28,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 14",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 1 derecha",
-            "locales": [
-                {
-                    "zona_codigo": "PT 5",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 6",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 7",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 8",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 15",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 16",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 16",
-                            "precio": "$51,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 17",
-                            "precio": "$46,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 18",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 18",
-                            "precio": "$46,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 19",
-                            "precio": "$56,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 20",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 2 izquierda",
-            "locales": [
-                {
-                    "zona_codigo": "PT 21",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 22",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 22",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 23",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 24",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 24",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 25",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 26",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 33",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 34",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 35",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 360",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 2 derecha",
-            "locales": [
-                {
-                    "zona_codigo": "PT 27",
-                    "precio": "$56,990",
-                    "estado": "Reservado",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 28",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 28",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 29",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 30",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 30",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 31",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 32",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 37",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 38",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 39",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 40",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 3 izquierda",
-            "locales": [
-                {
-                    "zona_codigo": "PT 41",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 42",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 43",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 44",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 49",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 50",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 50",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 51",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 52",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 52",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 53",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 54",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 3 derecha",
-            "locales": [
-                {
-                    "zona_codigo": "PT 45",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 46",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 47",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 48",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 55",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 56",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 56",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 57",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 58",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 58",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 59",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 60",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 4 izquierda",
-            "locales": [
-                {
-                    "zona_codigo": "PT 61",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 62-63",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 62",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 63",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 64-65",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 64",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 65",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 66",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 73",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 74-75",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 74",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 75",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 76-77",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 76",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 77",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 78",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 4 derecha",
-            "locales": [
-                {
-                    "zona_codigo": "PT 67",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 68-69",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 68",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 69",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 70-71",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 70",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 71",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 72",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 79",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 80-81",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 80",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 81",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 82-83",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 82",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 83",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 84",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 5 izquierda",
-            "locales": [
-                {
-                    "zona_codigo": "PT 85",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 86-87",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 86",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 87",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "primera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 88-89",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 88",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 89",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 90",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 97",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 98",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "primera_linea"
-                },
-                {
-                    "zona_codigo": "PT 99",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 100",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada segundaria grupo 5 derecha",
-            "locales": [
-                {
-                    "zona_codigo": "PT 91",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 92-93",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 92",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 93",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "segunda_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 94-95",
-                    "subniveles": [
-                        {
-                            "zona_codigo": "PT 94",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        },
-                        {
-                            "zona_codigo": "PT 95",
-                            "precio": "$29,990",
-                            "estado": "Disponible",
-                            "area": "25 m²",
-                            "perimetro": "5x5",
-                            "image": "../assets/tipos_locales/mediano.png",
-                            "linea_base": "tercera_linea"
-                        }
-                    ]
-                },
-                {
-                    "zona_codigo": "PT 96",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 101",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 102",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "segunda_linea"
-                },
-                {
-                    "zona_codigo": "PT 103",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 104",
-                    "precio": "$28,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada grupo 1 larga",
-            "locales": [
-                {
-                    "zona_codigo": "PT 105",
-                    "altura":"h-[80px]",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 106",
-                    "altura":"h-[80px]",
-                    "precio": "$56,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 107",
-                    "altura":"h-[38px]",
-                    "precio": "$27,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 108",
-                    "altura":"h-[80px]",
-                    "precio": "$27,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 109",
-                    "altura":"h-[80px]",
-                    "precio": "$27,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                }
-            ]
-        },
-        {
-            "tipo": "entrada grupo 2 larga",
-            "locales": [
-                {
-                    "zona_codigo": "PT 110",
-                    "altura":"h-[80px]",
-                    "precio": "$51,990",
-                    "estado": "Vendido",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 111",
-                    "altura":"h-[80px]",
-                    "precio": "$46,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 112",
-                    "altura":"h-[38px]",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 113",
-                    "altura":"h-[80px]",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 114",
-                    "altura":"h-[80px]",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 115",
-                    "altura":"h-[38px]",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 116",
-                    "altura":"h-[80px]",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                },
-                {
-                    "zona_codigo": "PT 117",
-                    "altura":"h-[80px]",
-                    "precio": "$51,990",
-                    "estado": "Disponible",
-                    "area": "25 m²",
-                    "perimetro": "5x5",
-                    "image": "../assets/tipos_locales/mediano.png",
-                    "linea_base": "tercera_linea"
-                }
-            ]
-        }
-        
-    ]
 
-    grupos_final = combinar_grupos_con_bd(db, grupos_estaticos)
-    return {"grupos": grupos_final} 
+def grupos_cacheados(db: Session) -> dict:
+    # La estructura estática del plano vive en grupos_layout.json (se carga una vez)
+    # El resultado se cachea en el namespace del inventario: cualquier escritura
+    # de locales/zonas lo invalida en todos los workers. Muestra la imagen del
+    # metraje, por eso la clave lleva también la versión de metrajes
+    def calcular():
+        return jsonable_encoder({"grupos": combinar_grupos_con_bd(db, cargar_grupos_estaticos())})
+
+    clave = f"grupos:m{versiones_tablas.version('metrajes')}"
+    return cache.obtener_o_calcular(indice_locales.NAMESPACE, clave, calcular)
 
 
 
@@ -1,8 +1,10 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, TypeAdapter
 from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 from decimal import Decimal
+# pydantic exige el TypedDict de typing_extensions en Python < 3.12
+from typing_extensions import NotRequired, TypedDict
 from app.apps.locales.models import (
     MetodoSeparacionEnum, MonedaEnum, EstadoLocalEnum, TipoLocalEnum, LineaBaseEnum, EstadoLocalEnum, TipoLocalEnum
 )
@@ -254,4 +256,62 @@ class GrupoLocalesSchema(BaseModel):
 
 # ✅ Modelo de respuesta que contiene los grupos
 class ResponseGrupoLocales(BaseModel):
-    grupos: List[GrupoLocalesSchema]
\ No newline at end of file
+    grupos: List[GrupoLocalesSchema]
+
+# ---------------------- RESPUESTAS TIPADAS ----------------------
+# Forma exacta de lo que devuelven serialize_local_detalle / serialize_cliente.
+# Son TypedDict: los serializadores arman dicts (sin validar, los datos vienen
+# del ORM) y los TypeAdapter de abajo, creados una sola vez, los pasan a bytes
+# con pydantic-core. Las claves NotRequired solo se emiten si están presentes.
+class MetrajeDetalle(TypedDict):
+    area: Optional[str]
+    perimetro: Optional[str]
+    image: Optional[str]
+
+class SubnivelDetalle(TypedDict):
+    categoria_id: Optional[int]
+    codigo: Optional[str]
+    linea_base: Optional[str]
+
+class LocalDetalleResponse(TypedDict):
+    zona_codigo: Optional[str]
+    estado: str
+    precio_base: Decimal
+    tipo: str
+    metraje: Optional[MetrajeDetalle]
+    subnivel_de: NotRequired[SubnivelDetalle]
+
+class ClienteDetalleResponse(TypedDict):
+    id: int
+    nombres_cliente: str
+    apellidos_cliente: str
+    dni_cliente: int
+    ruc_cliente: Optional[int]
+    ocupacion_cliente: Optional[str]
+    phone_cliente: int
+    direccion_cliente: str
+    mail_cliente: str
+    nombres_conyuge: str
+    dni_conyuge: int
+    metodo_separacion: str
+    moneda: str
+    numero_operacion: Optional[str]
+    fecha_plazo: Optional[datetime]
+    monto_arras: Optional[Decimal]
+    fecha_registro: Optional[datetime]
+    local: NotRequired[LocalDetalleResponse]
+
+class ClienteResumenResponse(TypedDict):
+    id: int
+    nombres_cliente: str
+    apellidos_cliente: str
+    dni_cliente: int
+    ruc_cliente: Optional[int]
+    phone_cliente: int
+    local_id: Optional[int]
+
+
+LOCAL_DETALLE_ADAPTER = TypeAdapter(LocalDetalleResponse)
+LOCALES_DETALLE_ADAPTER = TypeAdapter(List[LocalDetalleResponse])
+CLIENTE_DETALLE_ADAPTER = TypeAdapter(ClienteDetalleResponse)
+CLIENTES_DETALLE_ADAPTER = TypeAdapter(List[ClienteDetalleResponse])
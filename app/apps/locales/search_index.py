@@ -0,0 +1,324 @@
+import re
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.apps.locales.models import Local
+from app.apps.locales.reference_cache import zona_de, metraje_de
+from app.core.cache import cache, VersionCopia
+from app.db.connection import es_primaria, sesion_primaria
+from app.db.outbox import como_pares, despachador
+
+# Extrae el primer número de textos como "25", "25 m²" o "12,5"
+_NUMERO_RE = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+def _valor_enum(valor):
+    return valor.value if hasattr(valor, "value") else valor
+
+
+def parsear_area(area) -> Optional[float]:
+    if area is None:
+        return None
+    match = _NUMERO_RE.search(str(area))
+    if not match:
+        return None
+    return float(match.group(0).replace(",", "."))
+
+
+def _en_rango(valor, minimo, maximo) -> bool:
+    if valor is None:
+        return False
+    if minimo is not None and valor < minimo:
+        return False
+    if maximo is not None and valor > maximo:
+        return False
+    return True
+
+
+class LocalesSearchIndex:
+    """Índice en memoria del inventario de locales.
+
+    Cada local ocupa un slot; los filtros por estado/tipo/linea_base son
+    bitsets (enteros de Python) sobre esos slots y los rangos de precio y
+    área se resuelven con bisect sobre arreglos ordenados.
+
+    Entre workers viajan los ids cambiados (`publicar`): cada worker
+    actualiza solo esas entradas. Si se pierde un mensaje (salto de versión)
+    o el cambio no se puede describir por ids, el índice se descarta y se
+    reconstruye en la siguiente búsqueda.
+    """
+
+    NAMESPACE = "locales"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.cargado = False
+        self._version = VersionCopia()
+        self._limpiar()
+
+    def _limpiar(self):
+        self._registros: List[Optional[Dict[str, Any]]] = []
+        self._slot_por_id: Dict[int, int] = {}
+        self._slots_libres: List[int] = []
+        self._vivos = 0
+        self._facetas: Dict[str, Dict[Any, int]] = {"estado": {}, "tipo": {}, "linea_base": {}}
+        # Arreglos paralelos ordenados: (precio, slot) y (area, slot)
+        self._precios: List[float] = []
+        self._slots_precio: List[int] = []
+        self._areas: List[float] = []
+        self._slots_area: List[int] = []
+
+    # ---------------------- CARGA ----------------------
+    def cargar(self, db: Session):
+        # La versión se lee antes que las filas: un cambio publicado durante la
+        # carga llega como la versión siguiente y se vuelve a aplicar encima
+        version = cache.version(self.NAMESPACE)
+        locales = (
+            db.query(Local)
+            .options(joinedload(Local.zona), joinedload(Local.metraje))
+            .all()
+        )
+        with self._lock:
+            self._limpiar()
+            precios, areas = [], []
+            for local in locales:
+                registro = self._registro_desde_local(local)
+                slot = self._insertar(registro, ordenados=False)
+                if registro["precio_base"] is not None:
+                    precios.append((registro["precio_base"], slot))
+                if registro["area"] is not None:
+                    areas.append((registro["area"], slot))
+            # Un solo sort por arreglo: insertar fila a fila con bisect es O(n²)
+            precios.sort()
+            areas.sort()
+            self._precios = [valor for valor, _ in precios]
+            self._slots_precio = [slot for _, slot in precios]
+            self._areas = [valor for valor, _ in areas]
+            self._slots_area = [slot for _, slot in areas]
+            self._version.reiniciar(version)
+            self.cargado = True
+
+    def asegurar_cargado(self, db: Session = None):
+        """Carga el índice si hace falta, siempre desde la primaria.
+
+        Con una sesión de la réplica se abre una propia: una réplica atrasada
+        dejaría fuera escrituras que ya se publicaron a los demás workers.
+        """
+        if self.cargado:
+            return
+        if db is not None and es_primaria(db):
+            self.cargar(db)
+            return
+        with sesion_primaria() as primaria:
+            self.cargar(primaria)
+
+    @staticmethod
+    def _registro_desde_local(local: Local) -> Dict[str, Any]:
+        zona = zona_de(local)
+        metraje = metraje_de(local)
+        return {
+            "id": local.id,
+            "zona_codigo": zona.codigo if zona else None,
+            "precio_base": float(local.precio_base) if local.precio_base is not None else None,
+            "area": parsear_area(metraje.area) if metraje else None,
+            "estado": _valor_enum(local.estado),
+            "tipo": _valor_enum(local.tipo),
+            "linea_base": _valor_enum(zona.linea_base) if zona else None,
+        }
+
+    # ---------------------- ESCRITURA ----------------------
+    def upsert(self, local: Local):
+        if not self.cargado:
+            return
+        registro = self._registro_desde_local(local)
+        with self._lock:
+            self._quitar(registro["id"])
+            self._insertar(registro)
+
+    def remove(self, local_id: int):
+        if not self.cargado:
+            return
+        with self._lock:
+            self._quitar(local_id)
+
+    def invalidar(self):
+        with self._lock:
+            self._limpiar()
+            self._version.reiniciar()
+            self.cargado = False
+
+    def publicar(self, cambios: Optional[Iterable[Tuple[str, int]]] = None):
+        """Avisa a los demás workers que el inventario cambió.
+
+        `cambios` son pares (operación, id) con operación "upsert" o "remove",
+        ya aplicados en este worker; los demás actualizan solo esas entradas.
+        Sin `cambios` descartan el índice completo.
+        """
+        cambios = None if cambios is None else [[op, local_id] for op, local_id in cambios]
+        version = cache.publicar_cambios(self.NAMESPACE, cambios)
+        with self._lock:
+            self._version.propia(version)
+
+    def recibir(self, mensaje: dict):
+        """Mensaje de otro worker: aplica sus cambios o, si falta alguno, descarta el índice."""
+        with self._lock:
+            if not self.cargado:
+                return
+            if mensaje.get("cambios") is not None and self._version.siguiente(mensaje["version"]):
+                cambios = mensaje["cambios"]
+            else:
+                cambios = None
+        if cambios is None:
+            self.invalidar()
+        else:
+            self.aplicar(cambios)
+
+    def aplicar(self, cambios: Iterable[Tuple[str, int]]):
+        """Aplica pares (operación, id) leyendo de la primaria los locales de los "upsert"."""
+        if not self.cargado:
+            return
+        cambios = list(cambios)
+        ids = {local_id for op, local_id in cambios if op == "upsert"}
+        locales = {}
+        if ids:
+            with sesion_primaria() as db:
+                locales = {
+                    local.id: local
+                    for local in db.query(Local)
+                    .options(joinedload(Local.zona), joinedload(Local.metraje))
+                    .filter(Local.id.in_(ids))
+                }
+        for op, local_id in cambios:
+            local = locales.get(local_id) if op == "upsert" else None
+            # Un "upsert" de un local que ya no existe es un borrado
+            if local is not None:
+                self.upsert(local)
+            else:
+                self.remove(local_id)
+
+    def _insertar(self, registro: Dict[str, Any], ordenados: bool = True) -> int:
+        if self._slots_libres:
+            slot = self._slots_libres.pop()
+            self._registros[slot] = registro
+        else:
+            slot = len(self._registros)
+            self._registros.append(registro)
+        self._slot_por_id[registro["id"]] = slot
+
+        bit = 1 << slot
+        self._vivos |= bit
+        for faceta, bitsets in self._facetas.items():
+            valor = registro[faceta]
+            if valor is not None:
+                bitsets[valor] = bitsets.get(valor, 0) | bit
+
+        if ordenados:
+            if registro["precio_base"] is not None:
+                self._insertar_ordenado(self._precios, self._slots_precio, registro["precio_base"], slot)
+            if registro["area"] is not None:
+                self._insertar_ordenado(self._areas, self._slots_area, registro["area"], slot)
+        return slot
+
+    def _quitar(self, local_id: int):
+        slot = self._slot_por_id.pop(local_id, None)
+        if slot is None:
+            return
+        registro = self._registros[slot]
+        bit = 1 << slot
+        self._vivos &= ~bit
+        for faceta, bitsets in self._facetas.items():
+            valor = registro[faceta]
+            if valor is not None:
+                bitsets[valor] &= ~bit
+
+        if registro["precio_base"] is not None:
+            self._quitar_ordenado(self._precios, self._slots_precio, registro["precio_base"], slot)
+        if registro["area"] is not None:
+            self._quitar_ordenado(self._areas, self._slots_area, registro["area"], slot)
+
+        self._registros[slot] = None
+        self._slots_libres.append(slot)
+
+    @staticmethod
+    def _insertar_ordenado(valores: List[float], slots: List[int], valor: float, slot: int):
+        pos = bisect_right(valores, valor)
+        valores.insert(pos, valor)
+        slots.insert(pos, slot)
+
+    @staticmethod
+    def _quitar_ordenado(valores: List[float], slots: List[int], valor: float, slot: int):
+        pos = bisect_left(valores, valor)
+        while slots[pos] != slot:
+            pos += 1
+        del valores[pos]
+        del slots[pos]
+
+    # ---------------------- CONSULTA ----------------------
+    def buscar(
+        self,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        area_min: Optional[float] = None,
+        area_max: Optional[float] = None,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None,
+        linea_base: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            mascara = self._vivos
+            for faceta, valor in (("estado", estado), ("tipo", tipo), ("linea_base", linea_base)):
+                if valor is not None:
+                    mascara &= self._facetas[faceta].get(_valor_enum(valor), 0)
+            if not mascara:
+                return []
+
+            hay_precio = precio_min is not None or precio_max is not None
+            hay_area = area_min is not None or area_max is not None
+            resultados = []
+            if not hay_precio and not hay_area:
+                # Sin rangos: recorrer los bits activos de la máscara
+                while mascara and (limit is None or len(resultados) < limit):
+                    bajo = mascara & -mascara
+                    resultados.append(self._registros[bajo.bit_length() - 1])
+                    mascara ^= bajo
+                return resultados
+
+            # Se recorre el rango ordenado (precio si se pidió, si no área);
+            # el otro rango se comprueba sobre el registro
+            if hay_precio:
+                valores, slots, minimo, maximo = self._precios, self._slots_precio, precio_min, precio_max
+            else:
+                valores, slots, minimo, maximo = self._areas, self._slots_area, area_min, area_max
+            inicio = 0 if minimo is None else bisect_left(valores, minimo)
+            fin = len(valores) if maximo is None else bisect_right(valores, maximo)
+            for slot in slots[inicio:fin]:
+                if not (mascara >> slot) & 1:
+                    continue
+                registro = self._registros[slot]
+                if hay_precio and hay_area and not _en_rango(registro["area"], area_min, area_max):
+                    continue
+                resultados.append(registro)
+                if limit is not None and len(resultados) >= limit:
+                    break
+            return resultados
+
+    def __len__(self):
+        return len(self._slot_por_id)
+
+
+# Instancia compartida por el proceso
+indice_locales = LocalesSearchIndex()
+cache.al_recibir(LocalesSearchIndex.NAMESPACE, indice_locales.recibir)
+
+
+def _reconciliar_locales(cambios):
+    # El outbox entrega también lo que el pub/sub no trajo (mensaje perdido,
+    # escrituras de scripts o de otros servicios); upsert/remove son idempotentes
+    indice_locales.aplicar(como_pares(cambios))
+
+
+despachador.suscribir("locales", _reconciliar_locales)
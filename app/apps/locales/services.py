@@ -1,7 +1,13 @@
-from sqlalchemy.orm import Session
+import logging
+from typing import List, Optional
+from sqlalchemy import select, literal_column
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
 from app.apps.locales.models import Local
 from app.apps.locales.schemas import LocalCreate, LocalUpdate
 
+logger = logging.getLogger("uvicorn")
+
 
 def get_locales(db: Session):
     return db.query(Local).all()
@@ -9,6 +15,86 @@ def get_locales(db: Session):
 def get_local_by_id(db: Session, local_id: int):
     return db.query(Local).filter(Local.id == local_id).first()
 
+# Límite de profundidad del CTE recursivo (protege contra ciclos en subnivel_de_id)
+MAX_PROFUNDIDAD_SUBNIVELES = 32
+
+
+class ArbolLocalesInvalido(ValueError):
+    """El árbol tiene un ciclo en subnivel_de_id o supera MAX_PROFUNDIDAD_SUBNIVELES."""
+
+
+def local_tree_cte(local_id: int):
+    """CTE (id, nivel) del local y sus subniveles.
+
+    Baja un nivel más que MAX_PROFUNDIDAD_SUBNIVELES: una fila con ese nivel
+    significa que el árbol quedó cortado (ver verificar_arbol).
+    """
+    # Literales en línea: SQL Server exige que ancla y parte recursiva tengan el mismo tipo
+    arbol = (
+        select(Local.id, literal_column("0").label("nivel"))
+        .where(Local.id == local_id)
+        .cte("arbol_locales", recursive=True)
+    )
+    arbol = arbol.union_all(
+        select(Local.id, (arbol.c.nivel + literal_column("1")).label("nivel"))
+        .join(arbol, Local.subnivel_de_id == arbol.c.id)
+        .where(arbol.c.nivel <= MAX_PROFUNDIDAD_SUBNIVELES)
+    )
+    return arbol
+
+def verificar_arbol(local_id: int, filas) -> None:
+    """Lanza ArbolLocalesInvalido si las filas (id, nivel) del CTE no son un árbol completo."""
+    ids = [id_local for id_local, _ in filas]
+    if len(ids) != len(set(ids)):
+        # Un ciclo repite sus ids en cada vuelta hasta llegar al límite
+        motivo = "tiene un ciclo en subnivel_de_id"
+    elif any(nivel > MAX_PROFUNDIDAD_SUBNIVELES for _, nivel in filas):
+        motivo = f"supera {MAX_PROFUNDIDAD_SUBNIVELES} niveles de subniveles"
+    else:
+        return
+    logger.error("Árbol del local %s inválido: %s", local_id, motivo)
+    raise ArbolLocalesInvalido(f"El árbol del local {local_id} {motivo}")
+
+def ids_arbol(db: Session, local_id: int) -> List[int]:
+    """Ids del local y de todos sus subniveles (ArbolLocalesInvalido si hay ciclo o es muy profundo)."""
+    arbol = local_tree_cte(local_id)
+    filas = db.execute(select(arbol.c.id, arbol.c.nivel)).all()
+    verificar_arbol(local_id, filas)
+    return [id_local for id_local, _ in filas]
+
+def get_local_tree(db: Session, local_id: int) -> Optional[Local]:
+    """Carga un local y todo su árbol de subniveles con un único CTE recursivo.
+
+    Las colecciones `subniveles` quedan pobladas en memoria, así que recorrer
+    el árbol después no dispara lazy loads. Con un ciclo o más niveles que
+    MAX_PROFUNDIDAD_SUBNIVELES lanza ArbolLocalesInvalido en vez de cortarlo.
+    """
+    arbol = local_tree_cte(local_id)
+
+    filas = (
+        db.query(Local, arbol.c.nivel)
+        .join(arbol, Local.id == arbol.c.id)
+        .options(joinedload(Local.zona), joinedload(Local.metraje))
+        .order_by(arbol.c.nivel, Local.id)
+        .all()
+    )
+    if not filas:
+        return None
+    verificar_arbol(local_id, [(local.id, nivel) for local, nivel in filas])
+    locales = [local for local, _ in filas]
+
+    # Armado del árbol en O(n): cada nodo se cuelga de su padre ya cargado
+    hijos = {local.id: [] for local in locales}
+    raiz = None
+    for local in locales:
+        if local.id == local_id:
+            raiz = local
+        elif local.subnivel_de_id in hijos:
+            hijos[local.subnivel_de_id].append(local)
+    for local in locales:
+        set_committed_value(local, "subniveles", hijos[local.id])
+    return raiz
+
 def create_local(db: Session, local: LocalCreate):
     nuevo_local = Local(**local.dict())
     db.add(nuevo_local)
@@ -1,9 +1,16 @@
 from typing import List, Dict, Any
+from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
 import copy
-from fastapi import APIRouter, Depends
+import json
+from fastapi import Response
+from pydantic import TypeAdapter
 from sqlalchemy.orm import Session
-from app.db.connection import get_db
 from app.apps.locales.models import Local, Zona
+from app.apps.locales.reference_cache import zona_de, metraje_de
+from app.apps.locales.imagenes import variantes_imagen
+from app.apps.locales.schemas import LocalDetalleResponse, ClienteDetalleResponse
 
 def _get_image_url(metraje):
     if metraje and metraje.image:
@@ -14,20 +21,24 @@ def _get_image_url(metraje):
     return None
 
 def serialize_local(local):
+    zona = zona_de(local)
+    metraje = metraje_de(local)
     precio = f"${local.precio_base:,.2f}" if local.precio_base is not None else None
     estado = local.estado.capitalize() if local.estado else None
-    area = f"{local.metraje.area} m²" if local.metraje and local.metraje.area else None
-    perimetro = local.metraje.perimetro if local.metraje and local.metraje.perimetro else None
-    image = _get_image_url(local.metraje)
-    linea_base = local.zona.linea_base.value if local.zona and hasattr(local.zona.linea_base, "value") else None
+    area = f"{metraje.area} m²" if metraje and metraje.area else None
+    perimetro = metraje.perimetro if metraje and metraje.perimetro else None
+    image = _get_image_url(metraje)
+    linea_base = zona.linea_base.value if zona and hasattr(zona.linea_base, "value") else None
 
     data = {
-        "zona_codigo": local.zona.codigo if local.zona else None,
+        "zona_codigo": zona.codigo if zona else None,
         "precio": precio,
         "estado": estado,
         "area": area,
         "perimetro": perimetro,
         "image": image,
+        # thumbnail + srcset WebP/AVIF si la imagen se subió por /metrajes/{id}/imagen
+        "image_variantes": variantes_imagen(image),
         "linea_base": linea_base,
         "altura": getattr(local, "altura", None)
     }
@@ -36,9 +47,90 @@ def serialize_local(local):
 def serialize_local_with_subniveles(local):
     data = serialize_local(local)
     if local.subniveles:
-        data["subniveles"] = [serialize_local(sub) for sub in local.subniveles]
+        data["subniveles"] = [serialize_local_with_subniveles(sub) for sub in local.subniveles]
     return data
-# Ajusta según tu modelo
+
+
+# Detalle de un local como lo devuelven los endpoints /locales y /clientes
+# Las columnas DECIMAL(10, 2) vuelven de la base con dos decimales; un objeto
+# recién escrito (sin refresh) tiene el valor tal como llegó en el request
+def _decimal_columna(valor):
+    if valor is None:
+        return None
+    if isinstance(valor, Decimal) and valor.as_tuple().exponent == -2:
+        return valor
+    return Decimal(str(valor)).quantize(Decimal("0.01"))
+
+
+def serialize_local_detalle(local) -> LocalDetalleResponse:
+    zona = zona_de(local)
+    metraje = metraje_de(local)
+    data = {
+        "zona_codigo": zona.codigo if zona else None,
+        "estado": local.estado.value,
+        "precio_base": _decimal_columna(local.precio_base),
+        "tipo": local.tipo.value,
+        "metraje": {
+            "area": metraje.area,
+            "perimetro": metraje.perimetro,
+            "image": metraje.image
+        } if metraje else None
+    }
+
+    # ✅ Solo incluir `subnivel_de` si tiene datos
+    if local.subnivel_de:
+        data["subnivel_de"] = {
+            "categoria_id": zona.categoria_id if zona else None,
+            "codigo": zona.codigo if zona else None,
+            "linea_base": zona.linea_base.value if zona else None
+        }
+    return data
+
+
+def serialize_cliente(cliente) -> ClienteDetalleResponse:
+    data = {
+        "id": cliente.id,
+        "nombres_cliente": cliente.nombres_cliente,
+        "apellidos_cliente": cliente.apellidos_cliente,
+        "dni_cliente": cliente.dni_cliente,
+        "ruc_cliente": cliente.ruc_cliente,
+        "ocupacion_cliente": cliente.ocupacion_cliente,
+        "phone_cliente": cliente.phone_cliente,
+        "direccion_cliente": cliente.direccion_cliente,
+        "mail_cliente": cliente.mail_cliente,
+        "nombres_conyuge": cliente.nombres_conyuge,
+        "dni_conyuge": cliente.dni_conyuge,
+        "metodo_separacion": cliente.metodo_separacion.value,
+        "moneda": cliente.moneda.value,
+        "numero_operacion": cliente.numero_operacion,
+        "fecha_plazo": cliente.fecha_plazo,
+        "monto_arras": _decimal_columna(cliente.monto_arras),
+        "fecha_registro": cliente.fecha_registro,
+    }
+
+    if cliente.local:
+        data["local"] = serialize_local_detalle(cliente.local)
+    return data
+
+
+def respuesta_json(adapter: TypeAdapter, valor, headers: Dict[str, str] = None) -> Response:
+    """Serializa con pydantic-core directo a bytes; FastAPI no revalida un Response."""
+    return Response(
+        adapter.dump_json(valor),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+GRUPOS_LAYOUT_PATH = Path(__file__).with_name("grupos_layout.json")
+
+
+# Estructura estática del plano (/grupos); se lee una sola vez por proceso.
+# Es compartida: no mutarla, combinar_grupos_con_bd trabaja sobre una copia.
+@lru_cache(maxsize=1)
+def cargar_grupos_estaticos() -> List[Dict[str, Any]]:
+    with open(GRUPOS_LAYOUT_PATH, encoding="utf-8") as f:
+        return json.load(f)
 
 
 # Función recursiva para recolectar todos los zona_codigos de la estructura
@@ -72,8 +164,9 @@ def armar_diccionario_locales(db: Session, codigos_set: set) -> Dict[str, Local]
     )
     dict_locales = {}
     for loc in locales_db:
-        if loc.zona:
-            dict_locales[loc.zona.codigo] = loc
+        zona = zona_de(loc)
+        if zona:
+            dict_locales[zona.codigo] = loc
     return dict_locales
 
 
@@ -93,18 +186,23 @@ def actualizar_local_desde_dict(local_item: Dict[str, Any], dict_locales: Dict[s
     if local_db.estado:
         local_item["estado"] = local_db.estado.value.capitalize()
     # Actualiza área, perímetro e imagen si existe metraje
-    if local_db.metraje:
-        if local_db.metraje.area:
-            local_item["area"] = f"{local_db.metraje.area} m²"
-        if local_db.metraje.perimetro:
-            local_item["perimetro"] = local_db.metraje.perimetro
-        if local_db.metraje.image:
-            local_item["image"] = local_db.metraje.image
+    metraje = metraje_de(local_db)
+    if metraje:
+        if metraje.area:
+            local_item["area"] = f"{metraje.area} m²"
+        if metraje.perimetro:
+            local_item["perimetro"] = metraje.perimetro
+        if metraje.image:
+            local_item["image"] = metraje.image
+            variantes = variantes_imagen(metraje.image)
+            if variantes:
+                local_item["image_variantes"] = variantes
     # Actualiza linea_base
-    if local_db.zona and hasattr(local_db.zona.linea_base, "value"):
-        local_item["linea_base"] = local_db.zona.linea_base.value
-    elif local_db.zona and local_db.zona.linea_base:
-        local_item["linea_base"] = local_db.zona.linea_base
+    zona = zona_de(local_db)
+    if zona and hasattr(zona.linea_base, "value"):
+        local_item["linea_base"] = zona.linea_base.value
+    elif zona and zona.linea_base:
+        local_item["linea_base"] = zona.linea_base
 
 
 # Función recursiva para procesar locales y subniveles usando el dict_locales
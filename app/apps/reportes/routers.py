@@ -0,0 +1,60 @@
+from datetime import datetime, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from app.db.connection import get_db
+from app.apps.reportes.services import (
+    AGRUPACIONES_ARRAS, arras_por, locales_por_tipo, reporte_cacheado
+)
+
+router = APIRouter(
+    prefix="/reportes",
+    tags=["Reportes"]
+)
+
+
+# Los reportes se calculan en la primaria: se guardan en la cache compartida bajo
+# la versión vigente de clientes/locales, y una réplica atrasada dejaría ahí
+# totales de antes de la última escritura. Con la cache caliente no hay consulta
+
+def _a_utc_naive(fecha: datetime) -> datetime:
+    if fecha.tzinfo is None:
+        return fecha
+    return fecha.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _rango(desde: Optional[datetime], hasta: Optional[datetime]):
+    # fecha_registro se guarda en UTC sin zona horaria: un offset se pasa a UTC
+    # antes de quitarlo (las fechas sin offset ya se toman como UTC)
+    desde = _a_utc_naive(desde) if desde else None
+    hasta = _a_utc_naive(hasta) if hasta else None
+    if desde and hasta and desde >= hasta:
+        raise HTTPException(status_code=400, detail="'desde' debe ser anterior a 'hasta'")
+    return desde, hasta
+
+
+# ✅ 📌 GET - Total de arras por moneda, método de separación, mes o línea base.
+# desde (inclusive) / hasta (exclusivo) filtran por fecha_registro
+@router.get("/arras/{agrupacion}", response_model=dict)
+def reporte_arras(
+    agrupacion: str,
+    desde: Optional[datetime] = None,
+    hasta: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    if agrupacion not in AGRUPACIONES_ARRAS:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Agrupación no válida, opciones: {', '.join(AGRUPACIONES_ARRAS)}"
+        )
+    desde, hasta = _rango(desde, hasta)
+    filas = reporte_cacheado(
+        f"arras_{agrupacion}", (desde, hasta), lambda: arras_por(db, agrupacion, desde, hasta)
+    )
+    return {"agrupacion": agrupacion, "desde": desde, "hasta": hasta, "filas": filas}
+
+
+# ✅ 📌 GET - Locales reservados y vendidos por tipo
+@router.get("/locales/tipo", response_model=dict)
+def reporte_locales_por_tipo(db: Session = Depends(get_db)):
+    return {"filas": reporte_cacheado("locales_tipo", (), lambda: locales_por_tipo(db))}
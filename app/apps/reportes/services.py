@@ -0,0 +1,134 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import extract, func, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.apps.locales.models import Cliente, Local, Zona, EstadoLocalEnum
+from app.apps.locales.clientes_index import IndiceNombresClientes
+from app.apps.locales.search_index import LocalesSearchIndex
+
+CACHE_NS = "reportes"
+
+# Agrupaciones de monto_arras. Siempre se separa por moneda: sumar PEN con USD no tiene sentido
+AGRUPACIONES_ARRAS = {
+    "moneda": lambda: [Cliente.moneda.label("moneda")],
+    "metodo_separacion": lambda: [
+        Cliente.metodo_separacion.label("metodo_separacion"), Cliente.moneda.label("moneda"),
+    ],
+    "mes": lambda: [
+        extract("year", Cliente.fecha_registro).label("anio"),
+        extract("month", Cliente.fecha_registro).label("mes"),
+        Cliente.moneda.label("moneda"),
+    ],
+    "linea_base": lambda: [Zona.linea_base.label("linea_base"), Cliente.moneda.label("moneda")],
+}
+
+
+def _valor(valor):
+    return getattr(valor, "value", valor)
+
+
+def _inicio_mes(fecha: datetime, meses: int = 0) -> datetime:
+    total = fecha.year * 12 + fecha.month - 1 + meses
+    return datetime(total // 12, total % 12 + 1, 1)
+
+
+def tramos(desde: datetime, hasta: datetime, meses: int) -> List[Tuple[datetime, datetime]]:
+    """Parte [desde, hasta) en tramos alineados a inicio de mes de `meses` meses cada uno."""
+    resultado = []
+    inicio = desde
+    while inicio < hasta:
+        fin = min(_inicio_mes(inicio, meses), hasta)
+        resultado.append((inicio, fin))
+        inicio = fin
+    return resultado
+
+
+def _extremos(db: Session) -> Tuple[Optional[datetime], Optional[datetime]]:
+    # Dos consultas separadas: MIN y MAX solos se resuelven con una lectura del índice
+    primera = db.execute(select(func.min(Cliente.fecha_registro))).scalar()
+    ultima = db.execute(select(func.max(Cliente.fecha_registro))).scalar()
+    return primera, ultima
+
+
+def consulta_arras(agrupacion: str, desde: datetime, hasta: datetime):
+    columnas = AGRUPACIONES_ARRAS[agrupacion]()
+    consulta = (
+        select(*columnas, func.sum(Cliente.monto_arras), func.count(Cliente.id))
+        .where(Cliente.fecha_registro >= desde, Cliente.fecha_registro < hasta)
+        .group_by(*columnas)
+    )
+    if agrupacion == "linea_base":
+        consulta = consulta.join(Zona, Cliente.zona_id == Zona.id)
+    return consulta
+
+
+def arras_por(db: Session, agrupacion: str, desde: Optional[datetime], hasta: Optional[datetime]) -> List[Dict[str, Any]]:
+    """Suma de monto_arras y cantidad de clientes por `agrupacion` en [desde, hasta).
+
+    El rango se recorre en tramos de REPORTES_MESES_POR_TRAMO meses: cada
+    tramo es un GROUP BY corto sobre ix_clientes_fecha_registro y los
+    parciales se suman aquí, así nunca se barre la tabla en una sola consulta.
+    """
+    if desde is None or hasta is None:
+        primera, ultima = _extremos(db)
+        if primera is None:
+            return []
+        desde = desde or primera
+        # hasta es exclusivo: un segundo después del último registro
+        hasta = hasta or ultima + timedelta(seconds=1)
+
+    nombres = [columna.name for columna in AGRUPACIONES_ARRAS[agrupacion]()]
+    acumulado: Dict[tuple, list] = defaultdict(lambda: [Decimal("0"), 0])
+    for inicio, fin in tramos(desde, hasta, settings.REPORTES_MESES_POR_TRAMO):
+        for *grupo, total, cantidad in db.execute(consulta_arras(agrupacion, inicio, fin)):
+            parcial = acumulado[tuple(_valor(valor) for valor in grupo)]
+            parcial[0] += Decimal(str(total or 0))
+            parcial[1] += cantidad
+
+    return [
+        {
+            **dict(zip(nombres, grupo)),
+            # Como texto, igual que monto_arras en /clientes/ (y sin perder precisión en la cache)
+            "total_arras": str(total.quantize(Decimal("0.01"))),
+            "clientes": cantidad,
+        }
+        for grupo, (total, cantidad) in sorted(acumulado.items())
+    ]
+
+
+def consulta_locales_por_tipo():
+    estados = [EstadoLocalEnum.reservado, EstadoLocalEnum.vendido]
+    return (
+        select(Local.tipo, Local.estado, func.count(Local.id))
+        .where(Local.estado.in_(estados))
+        .group_by(Local.tipo, Local.estado)
+    )
+
+
+def locales_por_tipo(db: Session) -> List[Dict[str, Any]]:
+    conteos: Dict[str, Dict[str, int]] = defaultdict(lambda: {"reservados": 0, "vendidos": 0})
+    for tipo, estado, cantidad in db.execute(consulta_locales_por_tipo()):
+        clave = "reservados" if estado == EstadoLocalEnum.reservado else "vendidos"
+        conteos[_valor(tipo)][clave] = cantidad
+    return [{"tipo": tipo, **conteo} for tipo, conteo in sorted(conteos.items())]
+
+
+def reporte_cacheado(nombre: str, parametros: Sequence, calcular):
+    """Resultado de `calcular()` cacheado por (reporte, parámetros) con REPORTES_TTL.
+
+    La clave lleva la versión de los namespaces de clientes y locales, que
+    cada escritura de cliente, local o zona ya incrementa: un alta invalida
+    los reportes en todos los workers sin llamadas extra desde los routers.
+    """
+    versiones = (
+        cache.version(IndiceNombresClientes.NAMESPACE),
+        cache.version(LocalesSearchIndex.NAMESPACE),
+    )
+    clave = ":".join([nombre, *("" if p is None else str(p) for p in parametros), *(f"v{v}" for v in versiones)])
+    return cache.obtener_o_calcular(CACHE_NS, clave, calcular, ttl=settings.REPORTES_TTL)
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy import insert, or_
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import timedelta
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from app.db.connection import get_db
 from app.apps.users.models import User, RoleEnum
-from app.apps.users.schemas import RegisterRequest, LoginRequest, UserResponse, TokenResponse, UpdateUserRequest
-from app.apps.users.security import create_access_token, hash_password, verify_password
+from app.apps.users.schemas import (
+    RegisterRequest, LoginRequest, UserResponse, TokenResponse, UpdateUserRequest,
+    BulkRegisterRequest, BulkRegisterResult
+)
+from app.apps.users.security import create_access_token, hash_password, hash_passwords, verify_password
+from app.apps.users.throttling import verificar_limite_login
 from app.core.config import settings
+from app.core.cache import cache
 from typing import List
 
 
@@ -17,6 +24,14 @@ router = APIRouter(
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="users/login")
 
+# Namespace de la cache compartida para las lecturas de usuarios; cualquier
+# escritura lo invalida en todos los workers
+CACHE_NS = "users"
+
+
+def _user_dict(user: User) -> dict:
+    return UserResponse.model_validate(user, from_attributes=True).model_dump(mode="json")
+
 
 # ✅ CREAR USUARIO (Registro)
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -39,14 +54,78 @@ def register(data: RegisterRequest, db: Session = Depends(get_db)):
 
     db.add(new_user)
     db.commit()
-    db.refresh(new_user)
+    cache.invalidar(CACHE_NS)
 
     return new_user
 
 
+# ✅ REGISTRO MASIVO (alta de un equipo completo)
+@router.post("/register/bulk", response_model=List[BulkRegisterResult])
+def register_bulk(data: BulkRegisterRequest, db: Session = Depends(get_db)):
+    # Una sola consulta para los duplicados de todo el lote
+    usernames = {item.username for item in data.users}
+    emails = {item.email for item in data.users}
+    existentes = db.query(User.username, User.email).filter(
+        or_(User.username.in_(usernames), User.email.in_(emails))
+    ).all()
+    usernames_tomados = {username for username, _ in existentes}
+    emails_tomados = {email for _, email in existentes}
+
+    resultados = []
+    pendientes = []
+    for item in data.users:
+        if item.username in usernames_tomados or item.email in emails_tomados:
+            resultados.append(BulkRegisterResult(
+                username=item.username, status="duplicado", detail="El usuario o el email ya existe"
+            ))
+            continue
+        try:
+            role = RoleEnum(item.role).value
+        except ValueError:
+            resultados.append(BulkRegisterResult(
+                username=item.username, status="rol_invalido", detail=f"Rol desconocido: {item.role}"
+            ))
+            continue
+        # También cuenta como duplicado si se repite dentro del mismo lote
+        usernames_tomados.add(item.username)
+        emails_tomados.add(item.email)
+        resultado = BulkRegisterResult(username=item.username, status="creado")
+        resultados.append(resultado)
+        pendientes.append((item, role, resultado))
+
+    if not pendientes:
+        return resultados
+
+    # bcrypt en paralelo (pool de procesos); luego un solo executemany y un commit
+    hashes = hash_passwords([item.password for item, _, _ in pendientes])
+    filas = [
+        {"username": item.username, "email": item.email, "password": hashed, "role": role}
+        for (item, role, _), hashed in zip(pendientes, hashes)
+    ]
+    try:
+        db.execute(insert(User), filas)
+        # Los ids en una consulta (el executemany no los devuelve)
+        ids = dict(db.query(User.username, User.id).filter(User.username.in_([f["username"] for f in filas])))
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Otro registro creó alguno de estos usuarios mientras tanto; reintente el lote"
+        )
+
+    for _, _, resultado in pendientes:
+        resultado.id = ids.get(resultado.username)
+    cache.invalidar(CACHE_NS)
+    return resultados
+
+
 # ✅ LOGIN (Genera Token JWT)
 @router.post("/login", response_model=TokenResponse)
-def login(data: LoginRequest, db: Session = Depends(get_db)):
+def login(data: LoginRequest, request: Request, db: Session = Depends(get_db)):
+    # Antes de tocar la base o bcrypt
+    verificar_limite_login(request, data.username)
+
     user = db.query(User).filter(User.username == data.username).first()
     if not user or not verify_password(data.password, user.password):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Credenciales inválidas")
@@ -69,19 +148,28 @@ def login(data: LoginRequest, db: Session = Depends(get_db)):
     }
 
 
+# Las lecturas de usuarios se guardan en la cache compartida: se calculan en la
+# primaria (una réplica atrasada dejaría datos viejos bajo la versión nueva).
+# La sesión no abre conexión si la respuesta sale de la cache
+
 # ✅ Obtener todos los usuarios
 @router.get("/", response_model=List[UserResponse])  # ✅ List ahora está definido
 def get_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return users
+    return cache.obtener_o_calcular(CACHE_NS, "todos", lambda: [_user_dict(u) for u in db.query(User).all()])
 
 # ✅ OBTENER USUARIO POR ID
 @router.get("/{user_id}", response_model=UserResponse)
 def get_user(user_id: int, db: Session = Depends(get_db)):
+    cacheado = cache.get(CACHE_NS, str(user_id))
+    if cacheado is not None:
+        return cacheado
+
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
-    return user
+    respuesta = _user_dict(user)
+    cache.set(CACHE_NS, str(user_id), respuesta)
+    return respuesta
 
 
 # ✅ ACTUALIZAR USUARIO
@@ -98,7 +186,7 @@ def update_user(user_id: int, data: UpdateUserRequest, db: Session = Depends(get
     user.role = RoleEnum(data.role).value
 
     db.commit()
-    db.refresh(user)
+    cache.invalidar(CACHE_NS)
     return user
 
 
@@ -111,4 +199,5 @@ def delete_user(user_id: int, db: Session = Depends(get_db)):
     
     db.delete(user)
     db.commit()
+    cache.invalidar(CACHE_NS)
     return {"message": "Usuario eliminado correctamente"}
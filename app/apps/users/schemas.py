@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from app.apps.users.models import RoleEnum
 
 class RegisterRequest(BaseModel):
@@ -8,6 +8,15 @@ class RegisterRequest(BaseModel):
     password: str = Field(..., min_length=6)
     role: str = Field(default=RoleEnum.cliente.value)
 
+class BulkRegisterRequest(BaseModel):
+    users: List[RegisterRequest] = Field(..., min_length=1, max_length=500)
+
+class BulkRegisterResult(BaseModel):
+    username: str
+    status: str  # "creado" | "duplicado" | "rol_invalido"
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
 class LoginRequest(BaseModel):
     username: str
     password: str
@@ -1,17 +1,41 @@
+import atexit
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
-from jose import jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import List
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# passlib/bcrypt y python-jose se importan en el primer uso para no pagar
+# su costo al arrancar la app
+@lru_cache(maxsize=1)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+# bcrypt es CPU puro y libera poco el GIL: para lotes se reparte entre procesos
+@lru_cache(maxsize=1)
+def get_hash_pool() -> ProcessPoolExecutor:
+    pool = ProcessPoolExecutor(max_workers=settings.HASH_WORKERS or os.cpu_count() or 1)
+    atexit.register(pool.shutdown, wait=False, cancel_futures=True)
+    return pool
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hashea en paralelo (un proceso por core); con una sola contraseña, en línea."""
+    if len(passwords) < 2:
+        return [hash_password(password) for password in passwords]
+    return list(get_hash_pool().map(hash_password, passwords))
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: timedelta = None):
+    from jose import jwt
+
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta if expires_delta else timedelta(minutes=15))
     to_encode.update({"exp": expire})
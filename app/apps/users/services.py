@@ -7,5 +7,4 @@ def create_user(db: Session, username: str, email: str, password: str, role: str
     new_user = User(username=username, email=email, password=hashed_password, role=role)
     db.add(new_user)
     db.commit()
-    db.refresh(new_user)
     return new_user
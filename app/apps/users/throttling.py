@@ -0,0 +1,44 @@
+import math
+from functools import lru_cache
+from fastapi import HTTPException, Request, status
+from app.core.config import settings
+from app.core.rate_limit import TokenBucket, SharedTokenBucket
+
+# Longitud máxima de usuario que se usa como clave (evita claves enormes en memoria)
+_MAX_CLAVE = 64
+
+
+def _crear_cubeta(nombre: str, burst: int, por_minuto: float):
+    if settings.LOGIN_THROTTLE_COMPARTIDO:
+        return SharedTokenBucket(f"login:{nombre}", burst, por_minuto / 60)
+    return TokenBucket(burst, por_minuto / 60)
+
+
+@lru_cache(maxsize=1)
+def get_limitadores_login():
+    return (
+        _crear_cubeta("ip", settings.LOGIN_BURST_IP, settings.LOGIN_POR_MINUTO_IP),
+        _crear_cubeta("usuario", settings.LOGIN_BURST_USUARIO, settings.LOGIN_POR_MINUTO_USUARIO),
+    )
+
+
+def verificar_limite_login(request: Request, username: str):
+    """Lanza 429 con Retry-After si la IP o el usuario agotaron sus intentos.
+
+    Se llama antes de consultar la base o verificar el hash: un ataque de
+    credential stuffing no llega a consumir CPU en bcrypt.
+    """
+    por_ip, por_usuario = get_limitadores_login()
+    # Detrás del proxy, request.client ya es el cliente de X-Forwarded-For: el
+    # servidor solo lo acepta de SERVER_FORWARDED_ALLOW_IPS (ver app.server)
+    ip = request.client.host if request.client else ""
+
+    espera = por_ip.consumir(ip)
+    if not espera:
+        espera = por_usuario.consumir(username.strip().lower()[:_MAX_CLAVE])
+    if espera:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos de inicio de sesión, intente más tarde",
+            headers={"Retry-After": str(math.ceil(espera))},
+        )
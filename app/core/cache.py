@@ -0,0 +1,400 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn")
+
+
+# ---------------------- BACKENDS ----------------------
+class MemoryBackend:
+    """Backend en proceso: sirve con un solo worker (o para pruebas locales).
+
+    Nada sale del proceso: con varios workers cada uno tendría sus propias
+    versiones de tablas, reservas de Idempotency-Key, cache e índices, y las
+    invalidaciones de uno nunca llegarían a los otros. `python -m app.server`
+    baja a un worker si CACHE_URL es de este tipo.
+
+    Los valores expiran con su TTL; la limpieza es perezosa al leer y, al
+    pasar `max_entradas`, se recorre el diccionario una vez.
+    """
+
+    def __init__(self, max_entradas: int = 10000):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._datos: Dict[str, Tuple[Optional[float], Any]] = {}
+        self._suscriptores = defaultdict(list)
+
+    def _vigente(self, clave: str):
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            return None
+        expira, valor = entrada
+        if expira is not None and expira <= time.monotonic():
+            self._datos.pop(clave, None)
+            return None
+        return entrada
+
+    def _purgar(self):
+        ahora = time.monotonic()
+        for clave in [c for c, (expira, _) in self._datos.items() if expira is not None and expira <= ahora]:
+            del self._datos[clave]
+        # Si aún no hay espacio, se descartan las más antiguas (orden de inserción)
+        while len(self._datos) >= self.max_entradas:
+            del self._datos[next(iter(self._datos))]
+
+    def _guardar(self, clave: str, valor, ttl: Optional[float]):
+        if clave not in self._datos and len(self._datos) >= self.max_entradas:
+            self._purgar()
+        self._datos[clave] = (time.monotonic() + ttl if ttl else None, valor)
+
+    def get(self, clave: str):
+        with self._lock:
+            entrada = self._vigente(clave)
+            return entrada[1] if entrada else None
+
+    def set(self, clave: str, valor, ttl: Optional[float] = None):
+        with self._lock:
+            self._guardar(clave, valor, ttl)
+
+    def add(self, clave: str, valor, ttl: Optional[float] = None) -> bool:
+        with self._lock:
+            if self._vigente(clave):
+                return False
+            self._guardar(clave, valor, ttl)
+            return True
+
+    def delete(self, clave: str):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def incr(self, clave: str) -> int:
+        with self._lock:
+            entrada = self._vigente(clave)
+            expira, valor = entrada if entrada else (None, 0)
+            self._datos[clave] = (expira, int(valor) + 1)
+            return int(valor) + 1
+
+    def token_bucket(self, clave: str, capacidad: float, por_segundo: float) -> float:
+        with self._lock:
+            ahora = time.monotonic()
+            entrada = self._vigente(clave)
+            tokens, ultimo = entrada[1] if entrada else (capacidad, ahora)
+            tokens = min(capacidad, tokens + (ahora - ultimo) * por_segundo)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) / por_segundo
+            self._guardar(clave, (tokens, ahora), capacidad / por_segundo)
+            return espera
+
+    def publish(self, canal: str, mensaje: dict):
+        for callback in list(self._suscriptores[canal]):
+            callback(mensaje)
+
+    def subscribe(self, canal: str, callback: Callable[[dict], None]):
+        self._suscriptores[canal].append(callback)
+
+    def close(self):
+        self._suscriptores.clear()
+
+
+# Token bucket atómico en el servidor (la hora la pone Redis, no cada worker).
+# Devuelve como texto los segundos de espera (0 = permitido).
+_TOKEN_BUCKET_LUA = """
+local capacidad = tonumber(ARGV[1])
+local por_segundo = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local cubeta = redis.call('HMGET', KEYS[1], 'tokens', 'ultimo')
+local tokens = tonumber(cubeta[1]) or capacidad
+local ultimo = tonumber(cubeta[2]) or ahora
+tokens = math.min(capacidad, tokens + (ahora - ultimo) * por_segundo)
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    espera = (1 - tokens) / por_segundo
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ultimo', tostring(ahora))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / por_segundo * 1000))
+return tostring(espera)
+"""
+
+
+class RedisBackend:
+    """Backend compartido sobre el protocolo Redis (redis-server, KeyDB, fakeredis...).
+
+    Los valores se guardan como JSON; las invalidaciones llegan por pub/sub a
+    un hilo del propio cliente `redis`, que es una dependencia opcional.
+    """
+
+    def __init__(self, url: str = None, cliente=None):
+        if cliente is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise RuntimeError("CACHE_URL usa Redis pero el paquete `redis` no está instalado") from exc
+            cliente = redis.Redis.from_url(url)
+        self._redis = cliente
+        self._hilos = []
+        self._token_bucket = cliente.register_script(_TOKEN_BUCKET_LUA)
+
+    def get(self, clave: str):
+        valor = self._redis.get(clave)
+        return None if valor is None else json.loads(valor)
+
+    def set(self, clave: str, valor, ttl: Optional[float] = None):
+        self._redis.set(clave, json.dumps(valor), px=int(ttl * 1000) if ttl else None)
+
+    def add(self, clave: str, valor, ttl: Optional[float] = None) -> bool:
+        return bool(self._redis.set(clave, json.dumps(valor), px=int(ttl * 1000) if ttl else None, nx=True))
+
+    def delete(self, clave: str):
+        self._redis.delete(clave)
+
+    def incr(self, clave: str) -> int:
+        return int(self._redis.incr(clave))
+
+    def token_bucket(self, clave: str, capacidad: float, por_segundo: float) -> float:
+        return float(self._token_bucket(keys=[clave], args=[capacidad, por_segundo]))
+
+    def publish(self, canal: str, mensaje: dict):
+        self._redis.publish(canal, json.dumps(mensaje))
+
+    def subscribe(self, canal: str, callback: Callable[[dict], None]):
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{canal: lambda mensaje: callback(json.loads(mensaje["data"]))})
+        # get_message(timeout=...) retorna apenas llega un mensaje: el sleep_time
+        # solo acota cuánto tarda el hilo en notar que debe detenerse
+        self._hilos.append(pubsub.run_in_thread(sleep_time=1.0, daemon=True))
+
+    def close(self):
+        for hilo in self._hilos:
+            hilo.stop()
+        self._hilos.clear()
+
+
+def es_por_proceso(url: str) -> bool:
+    """True si `url` (CACHE_URL) usa MemoryBackend, que no se comparte entre workers."""
+    return not url or url.startswith("memory://")
+
+
+def crear_backend(url: str):
+    if es_por_proceso(url):
+        return MemoryBackend()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBackend(url)
+    raise ValueError(f"CACHE_URL no soportada: {url!r}")
+
+
+# ---------------------- CACHE COMPARTIDA ----------------------
+class SharedCache:
+    """Cache con namespaces versionados e invalidación por pub/sub.
+
+    Las claves de un namespace llevan su versión (`prefijo:ns:v3:clave`);
+    `invalidar(ns)` incrementa la versión en el backend y publica el cambio,
+    así las entradas viejas quedan huérfanas (expiran por TTL) y los demás
+    workers actualizan su copia local de la versión y ejecutan los callbacks
+    registrados con `al_invalidar(ns, callback)`.
+
+    `publicar_cambios(ns, cambios)` hace lo mismo y además envía qué cambió
+    (p. ej. `[["upsert", 7], ["remove", 9]]`); los callbacks de
+    `al_recibir(ns, callback)` reciben el mensaje con la versión y los
+    cambios, para actualizar solo esas entradas de una copia en memoria.
+
+    "Compartida" solo con un backend compartido (Redis): con MemoryBackend
+    (CACHE_URL vacía, el valor por defecto) todo vive en el proceso y sirve
+    únicamente con un worker.
+    """
+
+    def __init__(self, url: str = None, prefijo: str = "fastapi_gemma", backend=None):
+        self._url = url
+        self.prefijo = prefijo
+        self.origen = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._backend = backend
+        self._suscrito = False
+        self._epoca: Optional[int] = None
+        # ns -> (versión, instante de la última invalidación)
+        self._estados: Dict[str, Tuple[int, float]] = {}
+        self._callbacks = defaultdict(list)
+        self._receptores = defaultdict(list)
+
+    def _clave(self, *partes) -> str:
+        return ":".join((self.prefijo,) + tuple(str(parte) for parte in partes))
+
+    @property
+    def backend(self):
+        # Se crea (y se suscribe al canal) en el primer uso, no al importar
+        if self._backend is None or not self._suscrito:
+            with self._lock:
+                if self._backend is None:
+                    url = self._url if self._url is not None else settings.CACHE_URL
+                    self._backend = crear_backend(url)
+                if not self._suscrito:
+                    self._backend.subscribe(self._clave("invalidaciones"), self._recibir)
+                    self._suscrito = True
+        return self._backend
+
+    def iniciar(self):
+        """Conecta y se suscribe a las invalidaciones (llamar al arrancar cada worker)."""
+        backend = self.backend
+        if isinstance(backend, MemoryBackend):
+            logger.warning(
+                "Cache en memoria del proceso (CACHE_URL vacía o memory://): solo es "
+                "correcta con un worker; con varios use redis://"
+            )
+        return backend
+
+    def cerrar(self):
+        with self._lock:
+            if self._backend is not None:
+                self._backend.close()
+            self._backend = None
+            self._suscrito = False
+            self._estados.clear()
+            self._epoca = None
+
+    def epoca(self) -> int:
+        """Instante compartido por todos los workers en que se creó la cache."""
+        if self._epoca is None:
+            clave = self._clave("epoca")
+            self.backend.add(clave, int(time.time()))
+            self._epoca = int(self.backend.get(clave))
+        return self._epoca
+
+    # ---------------------- NAMESPACES ----------------------
+    def _estado(self, ns: str) -> Tuple[int, float]:
+        estado = self._estados.get(ns)
+        if estado is None:
+            version = self.backend.get(self._clave("ns", ns, "version")) or 0
+            modificado = self.backend.get(self._clave("ns", ns, "modificado")) or self.epoca()
+            estado = self._estados[ns] = (int(version), float(modificado))
+        return estado
+
+    def version(self, ns: str) -> int:
+        return self._estado(ns)[0]
+
+    def modificado(self, ns: str) -> float:
+        return self._estado(ns)[1]
+
+    def invalidar(self, *namespaces: str):
+        for ns in namespaces:
+            self.publicar_cambios(ns)
+
+    def publicar_cambios(self, ns: str, cambios: Optional[List[list]] = None) -> int:
+        """Invalida `ns` enviando `cambios` (None = cambió todo); devuelve la versión nueva."""
+        version = self.backend.incr(self._clave("ns", ns, "version"))
+        ahora = time.time()
+        self.backend.set(self._clave("ns", ns, "modificado"), ahora)
+        self._estados[ns] = (version, ahora)
+        self.backend.publish(self._clave("invalidaciones"), {
+            "ns": ns, "version": version, "modificado": ahora, "origen": self.origen, "cambios": cambios,
+        })
+        return version
+
+    def al_invalidar(self, ns: str, callback: Callable[[], None]):
+        """Registra `callback` para cuando otro worker invalide `ns`."""
+        self._callbacks[ns].append(callback)
+
+    def al_recibir(self, ns: str, callback: Callable[[dict], None]):
+        """Como `al_invalidar`, pero `callback(mensaje)` recibe `version` y `cambios`."""
+        self._receptores[ns].append(callback)
+
+    def _recibir(self, mensaje: dict):
+        # El worker que invalida ya actualizó su estado local
+        if mensaje.get("origen") == self.origen:
+            return
+        ns = mensaje["ns"]
+        actual = self._estados.get(ns)
+        if actual is None or mensaje["version"] > actual[0]:
+            self._estados[ns] = (mensaje["version"], mensaje["modificado"])
+        llamadas = [(callback, ()) for callback in self._callbacks[ns]]
+        llamadas += [(callback, (mensaje,)) for callback in self._receptores[ns]]
+        for callback, argumentos in llamadas:
+            try:
+                callback(*argumentos)
+            except Exception:
+                logger.exception("Falló el callback de invalidación de %s", ns)
+
+    def token_bucket(self, clave: str, capacidad: float, por_segundo: float) -> float:
+        """Consume un token de la cubeta compartida; devuelve los segundos de espera (0 = permitido)."""
+        return self.backend.token_bucket(self._clave("rl", clave), capacidad, por_segundo)
+
+    # ---------------------- VALORES ----------------------
+    def _clave_valor(self, ns: str, clave: str) -> str:
+        return self._clave(ns, f"v{self.version(ns)}", clave)
+
+    def get(self, ns: str, clave: str):
+        return self.backend.get(self._clave_valor(ns, clave))
+
+    def set(self, ns: str, clave: str, valor, ttl: Optional[float] = None):
+        ttl = settings.CACHE_TTL if ttl is None else ttl
+        self.backend.set(self._clave_valor(ns, clave), valor, ttl=ttl)
+
+    def add(self, ns: str, clave: str, valor, ttl: Optional[float] = None) -> bool:
+        """Guarda solo si la clave no existe; True si se guardó (sirve como reserva)."""
+        ttl = settings.CACHE_TTL if ttl is None else ttl
+        return self.backend.add(self._clave_valor(ns, clave), valor, ttl=ttl)
+
+    def delete(self, ns: str, clave: str):
+        self.backend.delete(self._clave_valor(ns, clave))
+
+    def obtener_o_calcular(self, ns: str, clave: str, calcular: Callable[[], Any], ttl: Optional[float] = None):
+        """`calcular()` debe devolver un valor serializable a JSON y leer de la primaria."""
+        # La clave se fija antes de calcular: si otro worker invalida mientras
+        # tanto, el resultado queda bajo la versión vieja y no se sirve
+        clave_valor = self._clave_valor(ns, clave)
+        valor = self.backend.get(clave_valor)
+        if valor is None:
+            valor = calcular()
+            self.backend.set(clave_valor, valor, ttl=settings.CACHE_TTL if ttl is None else ttl)
+        return valor
+
+
+class VersionCopia:
+    """Versión de un namespace que refleja una copia en memoria (p. ej. un índice).
+
+    Las versiones deben aplicarse sin saltos: si llega una que no es la
+    siguiente, se perdió un mensaje y la copia ya no es confiable. Las que
+    publica el propio worker (ya aplicadas) pueden adelantarse a mensajes de
+    otros todavía en camino; se anotan y se absorben al llegar a ellas.
+    """
+
+    def __init__(self):
+        self.actual: Optional[int] = None
+        self._propias: Set[int] = set()
+
+    def reiniciar(self, version: Optional[int] = None):
+        self.actual = version
+        self._propias.clear()
+
+    def propia(self, version: int):
+        if self.actual is not None:
+            self._propias.add(version)
+            self._absorber()
+
+    def siguiente(self, version: int) -> bool:
+        """True (y la marca aplicada) si `version` es la siguiente a la actual."""
+        if self.actual is None:
+            return False
+        self._absorber()
+        if version != self.actual + 1:
+            return False
+        self.actual = version
+        self._absorber()
+        return True
+
+    def _absorber(self):
+        while self.actual + 1 in self._propias:
+            self._propias.discard(self.actual + 1)
+            self.actual += 1
+
+
+cache = SharedCache()
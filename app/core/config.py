@@ -1,20 +1,133 @@
+from functools import cached_property
 from decouple import config
 
+
+class _Config:
+    """Lee la variable con `decouple.config` en el primer acceso (no al importar)."""
+
+    def __init__(self, nombre: str, **kwargs):
+        self.nombre = nombre
+        self.kwargs = kwargs
+
+    def __set_name__(self, owner, attr):
+        self.attr = attr
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        valor = config(self.nombre, **self.kwargs)
+        # Se cachea en la instancia: los siguientes accesos no pasan por aquí
+        obj.__dict__[self.attr] = valor
+        return valor
+
+
 class Settings:
     # Configuración de Base de Datos
-    DB_USER: str = config("DB_USER")
-    DB_PASSWORD: str = config("DB_PASSWORD")
-    DB_SERVER: str = config("DB_SERVER")
-    DB_NAME: str = config("DB_NAME")
-    DB_DRIVER: str = config("DB_DRIVER", default="ODBC Driver 17 for SQL Server")
+    DB_USER: str = _Config("DB_USER")
+    DB_PASSWORD: str = _Config("DB_PASSWORD")
+    DB_SERVER: str = _Config("DB_SERVER")
+    DB_NAME: str = _Config("DB_NAME")
+    DB_DRIVER: str = _Config("DB_DRIVER", default="ODBC Driver 17 for SQL Server")
+
+    @cached_property
+    def DATABASE_URL(self) -> str:
+        # DATABASE_URL explícita (p. ej. sqlite:///bench.db para benchmarks) tiene prioridad
+        url = config("DATABASE_URL", default="")
+        if url:
+            return url
+        return (
+            f"mssql+pyodbc://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_SERVER}/{self.DB_NAME}?driver={self.DB_DRIVER}"
+        )
+
+    # Réplica de lectura opcional (vacía = todo va a la primaria) y ventana
+    # en segundos durante la cual un cliente que escribió lee de la primaria
+    READ_DATABASE_URL: str = _Config("READ_DATABASE_URL", default="")
+    READ_YOUR_WRITES_SECONDS: float = _Config("READ_YOUR_WRITES_SECONDS", default=5, cast=float)
+
+    # Cache-Control max-age (segundos) de /categorias, /zonas y /metrajes
+    CATALOGOS_MAX_AGE: int = _Config("CATALOGOS_MAX_AGE", default=60, cast=int)
+
+    # Cache compartida entre workers: vacía = en memoria del proceso, solo válida
+    # con un worker (nada se comparte); redis://host:6379/0 para varios workers.
+    # TTL por defecto en segundos
+    CACHE_URL: str = _Config("CACHE_URL", default="")
+    CACHE_TTL: int = _Config("CACHE_TTL", default=300, cast=int)
+
+    # Idempotency-Key en POST /clientes/ y /locales/: cuánto se guarda la respuesta
+    # y cuánto espera un duplicado concurrente a que termine la primera petición
+    IDEMPOTENCY_TTL: int = _Config("IDEMPOTENCY_TTL", default=86400, cast=int)
+    IDEMPOTENCY_ESPERA: float = _Config("IDEMPOTENCY_ESPERA", default=10, cast=float)
+
+    # Límite de intentos de /users/login (token bucket): ráfaga y recarga por minuto,
+    # por usuario y por IP. Con LOGIN_THROTTLE_COMPARTIDO las cubetas viven en la
+    # cache compartida (CACHE_URL) en lugar de en cada worker
+    LOGIN_BURST_USUARIO: int = _Config("LOGIN_BURST_USUARIO", default=5, cast=int)
+    LOGIN_POR_MINUTO_USUARIO: float = _Config("LOGIN_POR_MINUTO_USUARIO", default=5, cast=float)
+    LOGIN_BURST_IP: int = _Config("LOGIN_BURST_IP", default=20, cast=int)
+    LOGIN_POR_MINUTO_IP: float = _Config("LOGIN_POR_MINUTO_IP", default=30, cast=float)
+    LOGIN_THROTTLE_COMPARTIDO: bool = _Config("LOGIN_THROTTLE_COMPARTIDO", default=False, cast=bool)
+
+    # Procesos para hashear contraseñas en /users/register/bulk (0 = un proceso por core)
+    HASH_WORKERS: int = _Config("HASH_WORKERS", default=0, cast=int)
+
+    # /reportes: TTL (segundos) de los resultados en la cache compartida y meses
+    # de fecha_registro que cubre cada consulta GROUP BY de un rango largo
+    REPORTES_TTL: int = _Config("REPORTES_TTL", default=600, cast=int)
+    REPORTES_MESES_POR_TRAMO: int = _Config("REPORTES_MESES_POR_TRAMO", default=1, cast=int)
+
+    # Copia columnar para análisis (python -m app.db.columnar): carpeta de los
+    # Parquet, filas por lote leído de la base y antigüedad mínima (segundos)
+    # de un cliente para exportarlo
+    ANALYTICS_DIR: str = _Config("ANALYTICS_DIR", default="analytics")
+    ANALYTICS_LOTE: int = _Config("ANALYTICS_LOTE", default=50000, cast=int)
+    ANALYTICS_MARGEN: int = _Config("ANALYTICS_MARGEN", default=300, cast=int)
+
+    # Outbox de cambios de locales/clientes: nombre del consumidor (su checkpoint),
+    # segundos entre lecturas, filas por lote, segundos que se espera un hueco
+    # en la secuencia antes de saltarlo y que se lo sigue buscando después, y
+    # antigüedad (segundos) de las filas ya entregadas que se podan y cada cuánto
+    OUTBOX_CONSUMIDOR: str = _Config("OUTBOX_CONSUMIDOR", default="api")
+    OUTBOX_INTERVALO: float = _Config("OUTBOX_INTERVALO", default=1, cast=float)
+    OUTBOX_LOTE: int = _Config("OUTBOX_LOTE", default=500, cast=int)
+    OUTBOX_ESPERA_HUECO: float = _Config("OUTBOX_ESPERA_HUECO", default=5, cast=float)
+    OUTBOX_HUECO_MAXIMO: float = _Config("OUTBOX_HUECO_MAXIMO", default=600, cast=float)
+    OUTBOX_RETENCION: int = _Config("OUTBOX_RETENCION", default=86400, cast=int)
+    OUTBOX_INTERVALO_PODA: float = _Config("OUTBOX_INTERVALO_PODA", default=300, cast=float)
+
+    # Imágenes de metrajes (POST /metrajes/{id}/imagen): carpeta y URL desde donde
+    # se sirven, anchos de las variantes, tamaño máximo de subida, píxeles máximos
+    # (un plano escaneado grande entra; una bomba de descompresión de pocos KB no)
+    # y procesos que las generan (0 = uno por core)
+    MEDIA_DIR: str = _Config("MEDIA_DIR", default="media")
+    MEDIA_URL: str = _Config("MEDIA_URL", default="/media")
+    IMAGEN_ANCHOS: str = _Config("IMAGEN_ANCHOS", default="160,320,640,1280")
+    IMAGEN_MAX_BYTES: int = _Config("IMAGEN_MAX_BYTES", default=10 * 1024 * 1024, cast=int)
+    IMAGEN_MAX_PIXELES: int = _Config("IMAGEN_MAX_PIXELES", default=50_000_000, cast=int)
+    IMAGEN_WORKERS: int = _Config("IMAGEN_WORKERS", default=0, cast=int)
+
+    # Servidor de producción (python -m app.server). SERVER_WORKERS 0 = uno por core
+    # (siempre 1 si CACHE_URL es en memoria);
+    # loop/http: "auto" usa uvloop/httptools si están instalados
+    SERVER_HOST: str = _Config("SERVER_HOST", default="0.0.0.0")
+    SERVER_PORT: int = _Config("SERVER_PORT", default=8000, cast=int)
+    SERVER_WORKERS: int = _Config("SERVER_WORKERS", default=0, cast=int)
+    SERVER_BACKLOG: int = _Config("SERVER_BACKLOG", default=2048, cast=int)
+    SERVER_KEEPALIVE: int = _Config("SERVER_KEEPALIVE", default=5, cast=int)
+    SERVER_LOOP: str = _Config("SERVER_LOOP", default="auto")
+    SERVER_HTTP: str = _Config("SERVER_HTTP", default="auto")
+    SERVER_GRACEFUL_TIMEOUT: int = _Config("SERVER_GRACEFUL_TIMEOUT", default=30, cast=int)
+    SERVER_TIMEOUT: int = _Config("SERVER_TIMEOUT", default=60, cast=int)
+    SERVER_MAX_REQUESTS: int = _Config("SERVER_MAX_REQUESTS", default=0, cast=int)
+    # IPs (separadas por coma, o "*") de los proxies inversos de confianza: de ellos se
+    # toma la IP del cliente de X-Forwarded-For (request.client), no la del socket
+    SERVER_FORWARDED_ALLOW_IPS: str = _Config("SERVER_FORWARDED_ALLOW_IPS", default="127.0.0.1")
 
-    DATABASE_URL: str = (
-        f"mssql+pyodbc://{DB_USER}:{DB_PASSWORD}@{DB_SERVER}/{DB_NAME}?driver={DB_DRIVER}"
-    )
+    # Conexiones que cada worker abre al arrancar (0 = el tamaño del pool)
+    WARMUP_CONEXIONES: int = _Config("WARMUP_CONEXIONES", default=0, cast=int)
 
     # 🔐 Configuración de Seguridad (Agregada)
-    SECRET_KEY: str = config("SECRET_KEY", default="tu_clave_super_segura")
-    ALGORITHM: str = config("ALGORITHM", default="HS256")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30, cast=int)
+    SECRET_KEY: str = _Config("SECRET_KEY", default="tu_clave_super_segura")
+    ALGORITHM: str = _Config("ALGORITHM", default="HS256")
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = _Config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30, cast=int)
 
 settings = Settings()
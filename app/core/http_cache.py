@@ -0,0 +1,105 @@
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Iterable, Optional
+from fastapi import HTTPException, Request, Response
+from app.core.config import settings
+from app.core.cache import cache
+
+
+class VersionesTablas:
+    """Versión por tabla para ETag/Last-Modified de los catálogos.
+
+    Los handlers de escritura llaman a `bump(tabla)`; los GET comparan la
+    versión con `If-None-Match` sin consultar la base. Las versiones viven en
+    la cache compartida (namespace `tabla:<nombre>`), así todos los workers
+    emiten el mismo ETag; la época de la cache evita reutilizar ETags si el
+    backend se reinicia.
+
+    La versión avanza con el commit en la primaria: los GET que emiten estos
+    validadores deben leer de la primaria (`get_db`), no de la réplica.
+    """
+
+    @staticmethod
+    def _ns(tabla: str) -> str:
+        return f"tabla:{tabla}"
+
+    def version(self, tabla: str) -> int:
+        return cache.version(self._ns(tabla))
+
+    def modificado(self, tabla: str) -> float:
+        return cache.modificado(self._ns(tabla))
+
+    def bump(self, *tablas: str):
+        cache.invalidar(*(self._ns(tabla) for tabla in tablas))
+
+    def etag(self, tablas: Iterable[str]) -> str:
+        partes = ".".join(f"{tabla}-{self.version(tabla)}" for tabla in tablas)
+        return f'W/"{cache.epoca():x}.{partes}"'
+
+    def last_modified(self, tablas: Iterable[str]) -> str:
+        return formatdate(max(self.modificado(tabla) for tabla in tablas), usegmt=True)
+
+
+versiones_tablas = VersionesTablas()
+
+
+def _cabeceras(tablas) -> dict:
+    return {
+        "ETag": versiones_tablas.etag(tablas),
+        "Last-Modified": versiones_tablas.last_modified(tablas),
+        "Cache-Control": f"public, max-age={settings.CATALOGOS_MAX_AGE}, must-revalidate",
+    }
+
+
+def _no_modificado(request: Request, tablas) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        etag = versiones_tablas.etag(tablas)
+        return any(valor.strip() in (etag, "*") for valor in if_none_match.split(","))
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            desde = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        # Last-Modified tiene resolución de segundos: ante la duda, no es 304
+        return max(versiones_tablas.modificado(tabla) for tabla in tablas) <= desde
+    return False
+
+
+def respuesta_no_modificada(request: Request, *tablas: str) -> Optional[Response]:
+    """304 si el cliente ya tiene la versión vigente de `tablas`; si no, None."""
+    if _no_modificado(request, tablas):
+        return Response(status_code=304, headers=_cabeceras(tablas))
+    return None
+
+
+def aplicar_cabeceras_cache(response: Response, *tablas: str):
+    response.headers.update(_cabeceras(tablas))
+
+
+# ---------------------- CONCURRENCIA OPTIMISTA ----------------------
+def etag_version(obj) -> str:
+    """ETag fuerte de una fila con columna `version` (Local, Cliente)."""
+    return f'"{obj.__tablename__}-{obj.id}-{obj.version}"'
+
+
+def exigir_if_match(request: Request, obj):
+    """428 sin If-Match; 412 si no coincide con la versión actual de la fila."""
+    if_match = request.headers.get("if-match")
+    if if_match is None:
+        raise HTTPException(status_code=428, detail="Se requiere la cabecera If-Match con el ETag del recurso")
+    etag = etag_version(obj)
+    if not any(valor.strip() in (etag, "*") for valor in if_match.split(",")):
+        raise HTTPException(status_code=412, detail="El recurso fue modificado por otra petición")
+
+
+def commit_optimista(db):
+    """Commit que traduce el conflicto de versión (UPDATE sin filas) en 412."""
+    from sqlalchemy.orm.exc import StaleDataError
+
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise HTTPException(status_code=412, detail="El recurso fue modificado por otra petición")
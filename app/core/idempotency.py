@@ -0,0 +1,113 @@
+import hashlib
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable
+from fastapi import HTTPException, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.core.config import settings
+from app.core.cache import cache
+
+HEADER = "Idempotency-Key"
+CACHE_NS = "idempotencia"
+# Mientras la primera petición corre, la reserva se renueva cada tercio de este
+# tiempo; si el worker muere deja de renovarse y otra petición puede tomarla
+_RESERVA_TTL = 30
+_INTERVALO_ESPERA = 0.05
+_MAX_LARGO_CLAVE = 255
+
+
+def _huella(payload: Any) -> str:
+    contenido = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(contenido.encode()).hexdigest()
+
+
+def _respuesta(cuerpo: bytes, status_code: int, headers: dict = None) -> Response:
+    return Response(cuerpo, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def _repetir(registro: dict) -> Response:
+    return _respuesta(registro["body"].encode(), registro["status"], {"Idempotent-Replayed": "true"})
+
+
+@contextmanager
+def _reserva_renovada(clave: str, reserva: dict):
+    """Renueva la reserva mientras corre el bloque (un handler lento no la pierde)."""
+    detener = threading.Event()
+
+    def renovar():
+        while not detener.wait(_RESERVA_TTL / 3):
+            cache.set(CACHE_NS, clave, reserva, ttl=_RESERVA_TTL)
+
+    hilo = threading.Thread(target=renovar, name="idempotencia-reserva", daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        # Antes de guardar la respuesta o liberar la clave: una renovación tardía
+        # no debe pisar ninguna de las dos
+        detener.set()
+        hilo.join()
+
+
+def ejecutar_idempotente(
+    request: Request, payload: Any, crear: Callable[[], Any], adapter: TypeAdapter, status_code: int = 200
+) -> Response:
+    """Ejecuta `crear()` una sola vez por `Idempotency-Key`.
+
+    El resultado se serializa con `adapter` (el mismo de la ruta) y se
+    devuelven esos bytes: con o sin cabecera, y en cada repetición, el
+    cuerpo es idéntico.
+
+    Sin cabecera se ejecuta siempre. Con cabecera:
+    - si ya hay respuesta guardada se devuelven los mismos bytes, sin tocar la base;
+    - si otra petición con la misma clave está en curso, se espera a que termine;
+    - si la clave se reutiliza con otro cuerpo, 422.
+    Los errores (HTTPException u otros) liberan la clave para permitir reintentos.
+    """
+    clave_idempotencia = request.headers.get(HEADER)
+    if not clave_idempotencia:
+        return _respuesta(adapter.dump_json(crear()), status_code)
+    if len(clave_idempotencia) > _MAX_LARGO_CLAVE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{HEADER} demasiado largo")
+
+    clave = f"{request.method}:{request.url.path}:{clave_idempotencia}"
+    huella = _huella(payload)
+    limite = time.monotonic() + settings.IDEMPOTENCY_ESPERA
+
+    reserva = {"estado": "en_curso", "huella": huella}
+    while not cache.add(CACHE_NS, clave, reserva, ttl=_RESERVA_TTL):
+        registro = cache.get(CACHE_NS, clave)
+        if registro is None:
+            continue  # expiró o se liberó entre add y get: reintentar la reserva
+        if registro["huella"] != huella:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"{HEADER} ya se usó con otro contenido",
+            )
+        if registro["estado"] == "completo":
+            return _repetir(registro)
+        if time.monotonic() >= limite:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Una petición con el mismo Idempotency-Key sigue en curso",
+            )
+        time.sleep(_INTERVALO_ESPERA)
+
+    try:
+        with _reserva_renovada(clave, reserva):
+            cuerpo = adapter.dump_json(crear())
+    except BaseException:
+        cache.delete(CACHE_NS, clave)
+        raise
+
+    # Como texto: el backend guarda JSON (los bytes de dump_json son UTF-8)
+    cache.set(
+        CACHE_NS,
+        clave,
+        {"estado": "completo", "huella": huella, "status": status_code, "body": cuerpo.decode()},
+        ttl=settings.IDEMPOTENCY_TTL,
+    )
+    return _respuesta(cuerpo, status_code)
@@ -0,0 +1,116 @@
+"""Reporte del tiempo de importación de la app a partir de `python -X importtime`.
+
+Uso:
+
+    python -m app.core.importtime                 # top 25 módulos de app.main
+    python -m app.core.importtime --top 40 --budget 1.5
+
+Con `--budget` (segundos) el comando termina con código 1 si la importación
+supera el presupuesto, para usarlo en CI. También falla si `app.main` importa
+alguno de PEREZOSOS: esos paquetes se importan en el primer uso
+(tests/test_importtime.py lo verifica).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+# Formato de cada línea en stderr:
+# "import time:       512 |       1234 |   app.core.config"
+_PREFIJO = "import time:"
+
+# Paquetes pesados que la app importa recién al usarlos (login, JWT, imágenes, Parquet)
+PEREZOSOS = ("passlib", "jose", "PIL", "pyarrow")
+
+
+def parsear_importtime(salida: str) -> List[Dict]:
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith(_PREFIJO):
+            continue
+        partes = linea[len(_PREFIJO):].split("|")
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            # Encabezado "self [us] | cumulative | imported package"
+            continue
+        nombre = partes[2].rstrip()
+        modulos.append({
+            "modulo": nombre.strip(),
+            "nivel": (len(nombre) - len(nombre.lstrip())) // 2,
+            "self_us": int(partes[0]),
+            "acumulado_us": int(partes[1]),
+        })
+    return modulos
+
+
+def medir_importacion(modulo: str = "app.main") -> Dict:
+    """Importa `modulo` en un intérprete nuevo y devuelve el reporte."""
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        capture_output=True,
+        text=True,
+        cwd=os.getcwd(),
+    )
+    total_s = time.perf_counter() - inicio
+    if proceso.returncode != 0:
+        errores = [l for l in proceso.stderr.splitlines() if not l.startswith(_PREFIJO)]
+        raise RuntimeError(f"No se pudo importar {modulo}:\n" + "\n".join(errores[-20:]))
+
+    modulos = parsear_importtime(proceso.stderr)
+    raiz = next((m for m in modulos if m["modulo"] == modulo), None)
+    return {
+        "modulo": modulo,
+        "proceso_s": round(total_s, 4),
+        "importacion_s": round(raiz["acumulado_us"] / 1e6, 4) if raiz else None,
+        "modulos": modulos,
+    }
+
+
+def perezosos_importados(reporte: Dict) -> List[str]:
+    """Paquetes de PEREZOSOS que aparecen en el reporte (debería ser una lista vacía)."""
+    paquetes = {m["modulo"].split(".")[0] for m in reporte["modulos"]}
+    return [paquete for paquete in PEREZOSOS if paquete in paquetes]
+
+
+def top_modulos(reporte: Dict, top: int = 25, clave: str = "self_us") -> List[Dict]:
+    return sorted(reporte["modulos"], key=lambda m: m[clave], reverse=True)[:top]
+
+
+def imprimir_reporte(reporte: Dict, top: int = 25):
+    print(f"Importación de {reporte['modulo']}: {reporte['importacion_s']}s "
+          f"(proceso completo {reporte['proceso_s']}s)")
+    print(f"{'self ms':>9} {'acum. ms':>9}  módulo")
+    for m in top_modulos(reporte, top):
+        print(f"{m['self_us'] / 1000:9.1f} {m['acumulado_us'] / 1000:9.1f}  {m['modulo']}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modulo", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--budget", type=float, default=None, help="presupuesto en segundos")
+    parser.add_argument("--json", action="store_true", help="imprime el reporte completo en JSON")
+    args = parser.parse_args(argv)
+
+    reporte = medir_importacion(args.modulo)
+    if args.json:
+        print(json.dumps(reporte, indent=2))
+    else:
+        imprimir_reporte(reporte, args.top)
+
+    perezosos = perezosos_importados(reporte)
+    if perezosos:
+        print(f"❌ {args.modulo} importa al arrancar {', '.join(perezosos)}", file=sys.stderr)
+        return 1
+    if args.budget is not None and reporte["importacion_s"] > args.budget:
+        print(f"❌ {args.modulo} tarda {reporte['importacion_s']}s en importar "
+              f"(presupuesto {args.budget}s)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
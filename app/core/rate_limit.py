@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TokenBucket:
+    """Token bucket en memoria del proceso, una cubeta por clave.
+
+    Cada clave guarda solo `[tokens, último acceso]` en un OrderedDict ordenado
+    por último acceso: consumir es O(1) y el barrido periódico saca desde el
+    frente las cubetas que ya se habrían rellenado (equivalen a no tenerlas).
+    Con más de `max_claves` se descartan las más antiguas.
+    """
+
+    def __init__(self, capacidad: float, por_segundo: float, max_claves: int = 100000, barrido_cada: float = 30.0):
+        self.capacidad = float(capacidad)
+        self.por_segundo = float(por_segundo)
+        self.max_claves = max_claves
+        self.barrido_cada = barrido_cada
+        # Tiempo sin uso tras el cual una cubeta vuelve a estar llena
+        self._llena_en = self.capacidad / self.por_segundo
+        self._cubetas: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._proximo_barrido = time.monotonic() + barrido_cada
+
+    def consumir(self, clave: str, ahora: Optional[float] = None) -> float:
+        """Consume un token; devuelve 0 si se permite o los segundos hasta el próximo token."""
+        ahora = time.monotonic() if ahora is None else ahora
+        with self._lock:
+            if ahora >= self._proximo_barrido:
+                self._barrer(ahora)
+            cubeta = self._cubetas.pop(clave, None)
+            if cubeta is None:
+                cubeta = [self.capacidad, ahora]
+            else:
+                cubeta[0] = min(self.capacidad, cubeta[0] + (ahora - cubeta[1]) * self.por_segundo)
+                cubeta[1] = ahora
+            self._cubetas[clave] = cubeta
+            if len(self._cubetas) > self.max_claves:
+                self._cubetas.popitem(last=False)
+
+            if cubeta[0] >= 1:
+                cubeta[0] -= 1
+                return 0.0
+            return (1 - cubeta[0]) / self.por_segundo
+
+    def _barrer(self, ahora: float):
+        # Ordenadas por último acceso: basta con avanzar hasta la primera reciente
+        while self._cubetas:
+            clave, (_, ultimo) = next(iter(self._cubetas.items()))
+            if ahora - ultimo < self._llena_en:
+                break
+            del self._cubetas[clave]
+        self._proximo_barrido = ahora + self.barrido_cada
+
+    def __len__(self):
+        return len(self._cubetas)
+
+
+class SharedTokenBucket:
+    """Mismo algoritmo sobre la cache compartida (todos los workers ven la misma cubeta)."""
+
+    def __init__(self, nombre: str, capacidad: float, por_segundo: float, cache=None):
+        if cache is None:
+            from app.core.cache import cache
+        self.nombre = nombre
+        self.capacidad = float(capacidad)
+        self.por_segundo = float(por_segundo)
+        self._cache = cache
+
+    def consumir(self, clave: str) -> float:
+        return self._cache.token_bucket(f"{self.nombre}:{clave}", self.capacidad, self.por_segundo)
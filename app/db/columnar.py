@@ -0,0 +1,288 @@
+"""Copia columnar (Parquet) de clientes y locales para análisis ad hoc.
+
+Las consultas pesadas corren con DuckDB sobre los archivos, nunca contra
+la base transaccional. Uso:
+
+    python -m app.db.columnar exportar [--directorio analytics] [--completo]
+    python -m app.db.columnar consultar "SELECT moneda, sum(monto_arras) FROM clientes GROUP BY 1"
+
+`exportar` es incremental: agrega un archivo `clientes/parte-NNNNNN.parquet`
+con los clientes registrados después de la marca de agua guardada
+(`fecha_registro`, `id`) y reescribe `locales.parquet` completo (el estado
+de un local cambia; la tabla es chica). Cada cliente va desnormalizado con
+su local, zona, metraje y categoría. Los datos de contacto (DNI, teléfono,
+correo, dirección) no se copian.
+
+Las correcciones a clientes ya exportados no mueven la marca de agua:
+`--completo` reconstruye la copia desde cero.
+
+pyarrow y duckdb son dependencias opcionales, solo para este módulo.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import DateTime, Integer, Numeric, and_, literal_column, or_, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+from app.db.connection import get_read_engine
+from app.apps.locales.models import Categoria, Zona, Metraje, Cliente, Local
+
+ARCHIVO_MARCA = "marca_agua.json"
+DIRECTORIO_CLIENTES = "clientes"
+ARCHIVO_LOCALES = "locales.parquet"
+
+# Hora actual de la base en UTC sin zona horaria, como se guarda fecha_registro
+# (now()/GETDATE() devuelven la hora local del servidor)
+AHORA_UTC = {
+    "mssql": "SYSUTCDATETIME()",
+    "postgresql": "(CURRENT_TIMESTAMP AT TIME ZONE 'UTC')",
+    "sqlite": "CURRENT_TIMESTAMP",
+    "mysql": "UTC_TIMESTAMP()",
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise RuntimeError("La exportación columnar necesita el paquete `pyarrow`") from exc
+    return pyarrow
+
+
+def _duckdb():
+    try:
+        import duckdb
+    except ImportError as exc:
+        raise RuntimeError("Las consultas sobre la copia columnar necesitan el paquete `duckdb`") from exc
+    return duckdb
+
+
+# ---------------------- ESQUEMAS ----------------------
+COLUMNAS_CLIENTES = {
+    "cliente_id": Cliente.id,
+    "fecha_registro": Cliente.fecha_registro,
+    "nombres_cliente": Cliente.nombres_cliente,
+    "apellidos_cliente": Cliente.apellidos_cliente,
+    "ocupacion_cliente": Cliente.ocupacion_cliente,
+    "metodo_separacion": Cliente.metodo_separacion,
+    "moneda": Cliente.moneda,
+    "monto_arras": Cliente.monto_arras,
+    "fecha_plazo": Cliente.fecha_plazo,
+    "local_id": Cliente.local_id,
+    "local_estado": Local.estado,
+    "local_tipo": Local.tipo,
+    "local_precio_base": Local.precio_base,
+    "zona_id": Cliente.zona_id,
+    "zona_codigo": Zona.codigo,
+    "linea_base": Zona.linea_base,
+    "metraje_area": Metraje.area,
+    "metraje_perimetro": Metraje.perimetro,
+    "categoria": Categoria.nombre,
+}
+
+COLUMNAS_LOCALES = {
+    "local_id": Local.id,
+    "estado": Local.estado,
+    "tipo": Local.tipo,
+    "precio_base": Local.precio_base,
+    "subnivel_de": Local.subnivel_de,
+    "subnivel_de_id": Local.subnivel_de_id,
+    "zona_codigo": Zona.codigo,
+    "linea_base": Zona.linea_base,
+    "categoria": Categoria.nombre,
+    "metraje_area": Metraje.area,
+}
+
+
+def _esquema(pa, columnas: Dict[str, Any]):
+    # Tipos fijos: todas las partes deben tener el mismo esquema aunque un lote venga sin nulos
+    campos = []
+    for nombre, columna in columnas.items():
+        if isinstance(columna.type, Numeric):
+            tipo = pa.decimal128(columna.type.precision, columna.type.scale)
+        elif isinstance(columna.type, DateTime):
+            tipo = pa.timestamp("us")
+        elif isinstance(columna.type, Integer):
+            tipo = pa.int64()
+        else:
+            tipo = pa.string()  # String y Enum (se exporta el valor)
+        campos.append(pa.field(nombre, tipo))
+    return pa.schema(campos)
+
+
+def _filas(resultado, nombres: List[str]) -> List[Dict[str, Any]]:
+    return [
+        {nombre: getattr(valor, "value", valor) for nombre, valor in zip(nombres, fila)}
+        for fila in resultado
+    ]
+
+
+# ---------------------- MARCA DE AGUA ----------------------
+def ahora_bd(conn: Connection) -> datetime:
+    """Reloj de la base (no el de la app) en UTC: el corte de la marca de agua no depende del host."""
+    expresion = AHORA_UTC.get(conn.dialect.name)
+    if expresion is None:
+        raise RuntimeError(f"La exportación columnar no sabe leer la hora UTC de {conn.dialect.name}")
+    return conn.execute(select(literal_column(expresion, type_=DateTime))).scalar()
+
+
+def leer_marca(directorio: Path) -> Dict[str, Any]:
+    ruta = directorio / ARCHIVO_MARCA
+    if not ruta.exists():
+        return {"fecha_registro": None, "id": 0, "partes": 0}
+    return json.loads(ruta.read_text())
+
+
+def _guardar_marca(directorio: Path, marca: Dict[str, Any]):
+    temporal = directorio / f"{ARCHIVO_MARCA}.tmp"
+    temporal.write_text(json.dumps(marca))
+    os.replace(temporal, directorio / ARCHIVO_MARCA)
+
+
+def consulta_clientes(fecha: Optional[datetime], ultimo_id: int, hasta: datetime):
+    consulta = (
+        select(*COLUMNAS_CLIENTES.values())
+        .select_from(Cliente)
+        .outerjoin(Local, Cliente.local_id == Local.id)
+        .join(Zona, Cliente.zona_id == Zona.id)
+        .join(Metraje, Cliente.metraje_id == Metraje.id)
+        .join(Categoria, Cliente.categoria_id == Categoria.id)
+        .where(Cliente.fecha_registro < hasta)
+        .order_by(Cliente.fecha_registro, Cliente.id)
+    )
+    if fecha is not None:
+        # Keyset (fecha_registro, id) sobre ix_clientes_fecha_registro
+        consulta = consulta.where(or_(
+            Cliente.fecha_registro > fecha,
+            and_(Cliente.fecha_registro == fecha, Cliente.id > ultimo_id),
+        ))
+    return consulta
+
+
+def consulta_locales():
+    return (
+        select(*COLUMNAS_LOCALES.values())
+        .select_from(Local)
+        .outerjoin(Zona, Local.zona_id == Zona.id)
+        .outerjoin(Categoria, Zona.categoria_id == Categoria.id)
+        .outerjoin(Metraje, Local.metraje_id == Metraje.id)
+        .order_by(Local.id)
+    )
+
+
+# ---------------------- EXPORTACIÓN ----------------------
+def _escribir_parquet(pa, ruta: Path, esquema, lotes: Iterable[List[Dict[str, Any]]]) -> int:
+    """Escribe un row group por lote en un temporal y lo renombra al final (nunca queda a medias)."""
+    temporal = ruta.with_name(ruta.name + ".tmp")
+    filas = 0
+    with pa.parquet.ParquetWriter(temporal, esquema, compression="zstd") as writer:
+        for lote in lotes:
+            writer.write_batch(pa.RecordBatch.from_pylist(lote, schema=esquema))
+            filas += len(lote)
+    if filas:
+        os.replace(temporal, ruta)
+    else:
+        temporal.unlink()
+    return filas
+
+
+def exportar(directorio: Optional[str] = None, completo: bool = False, engine: Engine = None) -> Dict[str, Any]:
+    """Agrega a la copia los clientes nuevos y reescribe los locales; devuelve un resumen."""
+    pa = _pyarrow()
+    directorio = Path(directorio or settings.ANALYTICS_DIR)
+    engine = engine or get_read_engine()
+    (directorio / DIRECTORIO_CLIENTES).mkdir(parents=True, exist_ok=True)
+    if completo:
+        # Solo los archivos propios: la carpeta puede tener otras cosas
+        for parte in (directorio / DIRECTORIO_CLIENTES).glob("parte-*.parquet"):
+            parte.unlink()
+        (directorio / ARCHIVO_MARCA).unlink(missing_ok=True)
+
+    marca = leer_marca(directorio)
+    fecha = datetime.fromisoformat(marca["fecha_registro"]) if marca["fecha_registro"] else None
+    nombres_clientes = list(COLUMNAS_CLIENTES)
+    resumen = {"clientes": 0, "locales": 0}
+
+    with engine.connect() as conn:
+        # Solo filas con cierta antigüedad (reloj de la base): una transacción aún
+        # abierta con fecha_registro anterior no queda detrás de la marca de agua
+        hasta = ahora_bd(conn) - timedelta(seconds=settings.ANALYTICS_MARGEN)
+        resultado = conn.execution_options(stream_results=True).execute(
+            consulta_clientes(fecha, marca["id"], hasta)
+        )
+        ultima = {}
+
+        def lotes_clientes():
+            while True:
+                lote = _filas(resultado.fetchmany(settings.ANALYTICS_LOTE), nombres_clientes)
+                if not lote:
+                    return
+                ultima.update(lote[-1])
+                yield lote
+
+        parte = directorio / DIRECTORIO_CLIENTES / f"parte-{marca['partes'] + 1:06d}.parquet"
+        resumen["clientes"] = _escribir_parquet(
+            pa, parte, _esquema(pa, COLUMNAS_CLIENTES), lotes_clientes()
+        )
+
+        filas_locales = _filas(conn.execute(consulta_locales()), list(COLUMNAS_LOCALES))
+        resumen["locales"] = _escribir_parquet(
+            pa, directorio / ARCHIVO_LOCALES, _esquema(pa, COLUMNAS_LOCALES), [filas_locales]
+        )
+
+    # La marca se mueve después de que la parte quedó escrita: si el proceso muere
+    # antes, la siguiente corrida reescribe la misma parte
+    if resumen["clientes"]:
+        _guardar_marca(directorio, {
+            "fecha_registro": ultima["fecha_registro"].isoformat(),
+            "id": ultima["cliente_id"],
+            "partes": marca["partes"] + 1,
+        })
+    return resumen
+
+
+# ---------------------- CONSULTAS ----------------------
+def conectar(directorio: Optional[str] = None):
+    """Conexión DuckDB en memoria con las vistas `clientes` y `locales` sobre los Parquet."""
+    duckdb = _duckdb()
+    directorio = Path(directorio or settings.ANALYTICS_DIR)
+    conexion = duckdb.connect()
+    patron = (directorio / DIRECTORIO_CLIENTES / "*.parquet").as_posix()
+    conexion.execute(f"CREATE VIEW clientes AS SELECT * FROM read_parquet('{patron}')")
+    conexion.execute(
+        f"CREATE VIEW locales AS SELECT * FROM read_parquet('{(directorio / ARCHIVO_LOCALES).as_posix()}')"
+    )
+    return conexion
+
+
+def consultar(sql: str, directorio: Optional[str] = None):
+    return conectar(directorio).sql(sql)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.db.columnar", description=__doc__.splitlines()[0])
+    parser.add_argument("--directorio", default=None, help="Carpeta de la copia (por defecto ANALYTICS_DIR)")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    exportar_parser = subparsers.add_parser("exportar", help="Agrega los clientes nuevos a la copia Parquet")
+    exportar_parser.add_argument("--completo", action="store_true", help="Reconstruye la copia desde cero")
+    consultar_parser = subparsers.add_parser("consultar", help="Ejecuta SQL de DuckDB sobre la copia")
+    consultar_parser.add_argument("sql")
+    args = parser.parse_args(argv)
+
+    if args.comando == "exportar":
+        resumen = exportar(args.directorio, completo=args.completo)
+        print(f"✅ {resumen['clientes']} clientes nuevos, {resumen['locales']} locales")
+    else:
+        consultar(args.sql, args.directorio).show()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
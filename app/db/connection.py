@@ -1,3 +1,8 @@
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from fastapi import Request
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -6,14 +11,122 @@ from app.core.config import settings
 # ✅ Definimos `Base` directamente sin importar `models.py`
 Base = declarative_base()
 
-# Configurar la conexión con la base de datos
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Las sesiones se enlazan al engine en get_engine()/get_read_engine(); quien
+# use SessionLocal() directamente debe llamar antes a get_engine().
+# expire_on_commit=False: tras el commit los handlers arman la respuesta con
+# los valores que ya tienen (el id vuelve en el mismo INSERT ... OUTPUT/RETURNING)
+# en lugar de volver a leer la fila
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+def _crear_engine(url: str):
+    # SQLite (benchmarks / desarrollo local): la sesión se usa desde el threadpool
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return create_engine(url, connect_args=connect_args)
+
+
+# Configurar la conexión con la base de datos (perezosa: el driver ODBC se
+# importa en el primer uso, no al importar la app)
+@lru_cache(maxsize=1)
+def get_engine():
+    engine = _crear_engine(settings.DATABASE_URL)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+
+# Réplica de lectura; sin READ_DATABASE_URL es la misma primaria
+@lru_cache(maxsize=1)
+def get_read_engine():
+    engine = _crear_engine(settings.READ_DATABASE_URL) if settings.READ_DATABASE_URL else get_engine()
+    ReadSessionLocal.configure(bind=engine)
+    return engine
+
+
+def __getattr__(name):
+    # Compatibilidad con `from app.db.connection import engine`
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# ---------------------- READ-YOUR-WRITES ----------------------
+# Cookie que marca hasta cuándo (epoch) el cliente debe leer de la primaria;
+# viaja con el cliente, así funciona aunque la siguiente petición caiga en otro worker
+COOKIE_LEER_PRIMARIA = "leer_primaria_hasta"
+_MAX_CLIENTES = 10000
+
+_escrituras_recientes = {}
+_escrituras_lock = threading.Lock()
+
+
+def clave_cliente(request: Request) -> str:
+    # Mismo token = mismo cliente; si no hay token, la IP
+    autorizacion = request.headers.get("authorization")
+    if autorizacion:
+        return autorizacion
+    return request.client.host if request.client else ""
+
+
+def marcar_escritura(request: Request) -> float:
+    """Registra que el cliente escribió; devuelve hasta cuándo debe leer de la primaria."""
+    hasta = time.time() + settings.READ_YOUR_WRITES_SECONDS
+    with _escrituras_lock:
+        if len(_escrituras_recientes) >= _MAX_CLIENTES:
+            ahora = time.time()
+            for clave in [c for c, h in _escrituras_recientes.items() if h <= ahora]:
+                del _escrituras_recientes[clave]
+        _escrituras_recientes[clave_cliente(request)] = hasta
+    return hasta
+
+
+def escribio_recientemente(request: Request) -> bool:
+    ahora = time.time()
+    try:
+        if float(request.cookies.get(COOKIE_LEER_PRIMARIA, 0)) > ahora:
+            return True
+    except ValueError:
+        pass
+    return _escrituras_recientes.get(clave_cliente(request), 0) > ahora
+
 
 # Dependencia para obtener la sesión de la base de datos
 def get_db():
+    get_engine()
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Las caches compartidas y los índices en memoria se llenan desde la primaria:
+# tras `cache.invalidar`, una réplica atrasada guardaría bajo la versión nueva
+# filas de antes de la escritura (y quedarían así hasta el TTL en todos los workers)
+@contextmanager
+def sesion_primaria():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+def es_primaria(db) -> bool:
+    # Sin READ_DATABASE_URL el engine de lectura es el mismo de la primaria
+    return db.get_bind() is get_engine()
+
+
+# Dependencia para endpoints de solo lectura: réplica, salvo que el cliente
+# haya escrito hace menos de READ_YOUR_WRITES_SECONDS
+def get_read_db(request: Request):
+    if not settings.READ_DATABASE_URL or escribio_recientemente(request):
+        yield from get_db()
+        return
+    get_read_engine()
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
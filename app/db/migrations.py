@@ -0,0 +1,313 @@
+"""Utilidades para migraciones de datos grandes en Alembic.
+
+Los backfills se hacen en lotes ordenados por clave primaria (keyset), cada
+lote en su propia transacción, para no bloquear la tabla durante minutos.
+El avance se guarda en la tabla `backfill_checkpoints`, así una migración
+interrumpida continúa desde el último lote confirmado.
+
+Cambio de tipo de una columna (patrón expand/contract) en DOS revisiones.
+La primera agrega la columna nueva con un trigger que la mantiene igual a la
+vieja en cada INSERT/UPDATE (doble escritura) y la llena en lotes:
+
+    from app.db.migrations import copiar_columna_en_lotes, expand_column
+
+    def upgrade() -> None:
+        expand_column("clientes", "dni_cliente", sa.BigInteger())
+        copiar_columna_en_lotes("clientes", "dni_cliente", sa.BigInteger(), batch_size=5000, pausa=0.05)
+
+La segunda, en un despliegue posterior (con la copia terminada), quita el
+trigger, reemplaza la columna y recrea sus índices (p. ej.
+ix_clientes_dni_cliente; SQL Server no deja borrar una columna indexada):
+
+    from app.db.migrations import contract_column
+
+    def upgrade() -> None:
+        contract_column("clientes", "dni_cliente", sa.BigInteger(), nullable=False)
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import sqlalchemy as sa
+from alembic import op
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+TABLA_CHECKPOINTS = "backfill_checkpoints"
+
+_checkpoints = sa.table(
+    TABLA_CHECKPOINTS,
+    sa.column("nombre", sa.String),
+    sa.column("ultimo_id", sa.BigInteger),
+    sa.column("filas", sa.BigInteger),
+    sa.column("actualizado", sa.DateTime),
+)
+
+
+def _log_progreso(progreso: Dict[str, Any]):
+    total = progreso["total"]
+    porcentaje = f" ({progreso['filas'] * 100 / total:.1f}%)" if total else ""
+    logger.info(
+        "Backfill %s: %s/%s filas%s, último id %s, %.0f filas/s",
+        progreso["nombre"], progreso["filas"], total or "?", porcentaje,
+        progreso["ultimo_id"], progreso["filas_por_segundo"],
+    )
+
+
+def _asegurar_tabla_checkpoints(bind):
+    if sa.inspect(bind).has_table(TABLA_CHECKPOINTS):
+        return
+    tabla = sa.Table(
+        TABLA_CHECKPOINTS, sa.MetaData(),
+        sa.Column("nombre", sa.String(200), primary_key=True),
+        sa.Column("ultimo_id", sa.BigInteger, nullable=True),
+        sa.Column("filas", sa.BigInteger, nullable=False, default=0),
+        sa.Column("actualizado", sa.DateTime, nullable=False),
+    )
+    tabla.create(bind)
+
+
+def _leer_checkpoint(bind, nombre: str):
+    fila = bind.execute(
+        sa.select(_checkpoints.c.ultimo_id, _checkpoints.c.filas)
+        .where(_checkpoints.c.nombre == nombre)
+    ).first()
+    return (fila[0], fila[1]) if fila else (None, 0)
+
+
+def _guardar_checkpoint(bind, nombre: str, ultimo_id, filas: int, existe: bool):
+    valores = {"ultimo_id": ultimo_id, "filas": filas, "actualizado": datetime.utcnow()}
+    if existe:
+        bind.execute(_checkpoints.update().where(_checkpoints.c.nombre == nombre).values(**valores))
+    else:
+        bind.execute(_checkpoints.insert().values(nombre=nombre, **valores))
+
+
+def _borrar_checkpoint(bind, nombre: str):
+    bind.execute(_checkpoints.delete().where(_checkpoints.c.nombre == nombre))
+
+
+def backfill_en_lotes(
+    tabla: str,
+    valores: Callable[[sa.Table], Dict[str, Any]],
+    *,
+    pk: str = "id",
+    where: Optional[Callable[[sa.Table], Any]] = None,
+    batch_size: int = 1000,
+    pausa: float = 0.0,
+    nombre: Optional[str] = None,
+    reanudar: bool = True,
+    progreso: Optional[Callable[[Dict[str, Any]], None]] = _log_progreso,
+    bind=None,
+) -> int:
+    """Ejecuta `UPDATE tabla SET valores(t)` en lotes de `batch_size` filas.
+
+    `valores` y `where` reciben la tabla reflejada y devuelven, respectivamente,
+    el dict de columnas a asignar y un filtro opcional. Cada lote se confirma
+    por separado y entre lotes se duerme `pausa` segundos. Devuelve el número
+    de filas procesadas.
+
+    Dentro de una revisión no hace falta `bind`; fuera de Alembic debe ser
+    una conexión con `isolation_level="AUTOCOMMIT"`.
+    """
+    if bind is None:
+        with op.get_context().autocommit_block():
+            return backfill_en_lotes(
+                tabla, valores, pk=pk, where=where, batch_size=batch_size,
+                pausa=pausa, nombre=nombre, reanudar=reanudar, progreso=progreso,
+                bind=op.get_bind(),
+            )
+
+    nombre = nombre or f"{tabla}.{pk}"
+    t = sa.Table(tabla, sa.MetaData(), autoload_with=bind)
+    clave = t.c[pk]
+
+    _asegurar_tabla_checkpoints(bind)
+    ultimo_id, filas = _leer_checkpoint(bind, nombre) if reanudar else (None, 0)
+    existe_checkpoint = reanudar and ultimo_id is not None
+    if ultimo_id is not None:
+        logger.info("Backfill %s: reanudando después del id %s", nombre, ultimo_id)
+
+    # Total estimado: lo ya procesado más lo que queda después del checkpoint
+    conteo = sa.select(sa.func.count()).select_from(t)
+    if ultimo_id is not None:
+        conteo = conteo.where(clave > ultimo_id)
+    if where is not None:
+        conteo = conteo.where(where(t))
+    total = filas + bind.execute(conteo).scalar()
+
+    inicio = time.monotonic()
+    while True:
+        siguiente = sa.select(clave).order_by(clave).limit(batch_size)
+        if ultimo_id is not None:
+            siguiente = siguiente.where(clave > ultimo_id)
+        if where is not None:
+            siguiente = siguiente.where(where(t))
+        ids = bind.execute(siguiente).scalars().all()
+        if not ids:
+            break
+
+        actualizacion = (
+            t.update()
+            .where(clave >= ids[0], clave <= ids[-1])
+            .values(**valores(t))
+        )
+        if where is not None:
+            actualizacion = actualizacion.where(where(t))
+        bind.execute(actualizacion)
+
+        ultimo_id = ids[-1]
+        filas += len(ids)
+        _guardar_checkpoint(bind, nombre, ultimo_id, filas, existe_checkpoint)
+        existe_checkpoint = True
+
+        if progreso:
+            transcurrido = time.monotonic() - inicio
+            progreso({
+                "nombre": nombre,
+                "filas": filas,
+                "total": total,
+                "ultimo_id": ultimo_id,
+                "filas_por_segundo": filas / transcurrido if transcurrido else 0.0,
+            })
+        if len(ids) < batch_size:
+            break
+        if pausa:
+            time.sleep(pausa)
+
+    _borrar_checkpoint(bind, nombre)
+    return filas
+
+
+# ---------------------- EXPAND / CONTRACT ----------------------
+def nombre_columna_nueva(columna: str) -> str:
+    return f"{columna}__nuevo"
+
+
+def nombre_trigger(tabla: str, columna: str) -> str:
+    return f"trg_{tabla}_{columna}__sync"
+
+
+def _sentencias_trigger(bind, tabla: str, columna: str, tipo: sa.types.TypeEngine, pk: str):
+    """CREATE TRIGGER que copia `columna` a la columna nueva en cada INSERT/UPDATE."""
+    q = bind.dialect.identifier_preparer.quote
+    t, vieja, nueva, clave = q(tabla), q(columna), q(nombre_columna_nueva(columna)), q(pk)
+    tipo_sql = tipo.compile(dialect=bind.dialect)
+    trigger = nombre_trigger(tabla, columna)
+    dialecto = bind.dialect.name
+    if dialecto == "mssql":
+        return [
+            f"CREATE TRIGGER {q(trigger)} ON {t} AFTER INSERT, UPDATE AS BEGIN "
+            f"SET NOCOUNT ON; "
+            f"IF UPDATE({vieja}) UPDATE x SET {nueva} = CAST(i.{vieja} AS {tipo_sql}) "
+            f"FROM {t} x JOIN inserted i ON x.{clave} = i.{clave}; END"
+        ]
+    if dialecto == "postgresql":
+        return [
+            f"CREATE FUNCTION {q(trigger)}() RETURNS trigger AS $$ BEGIN "
+            f"NEW.{nueva} := CAST(NEW.{vieja} AS {tipo_sql}); RETURN NEW; END $$ LANGUAGE plpgsql",
+            f"CREATE TRIGGER {q(trigger)} BEFORE INSERT OR UPDATE OF {vieja} ON {t} "
+            f"FOR EACH ROW EXECUTE FUNCTION {q(trigger)}()",
+        ]
+    if dialecto == "sqlite":
+        copia = f"UPDATE {t} SET {nueva} = CAST(NEW.{vieja} AS {tipo_sql}) WHERE {clave} = NEW.{clave}"
+        return [
+            f"CREATE TRIGGER {q(trigger + '_ins')} AFTER INSERT ON {t} BEGIN {copia}; END",
+            f"CREATE TRIGGER {q(trigger + '_upd')} AFTER UPDATE OF {vieja} ON {t} BEGIN {copia}; END",
+        ]
+    raise NotImplementedError(f"Doble escritura por trigger no soportada en {dialecto}")
+
+
+def _borrar_trigger(bind, tabla: str, columna: str):
+    q = bind.dialect.identifier_preparer.quote
+    trigger = nombre_trigger(tabla, columna)
+    dialecto = bind.dialect.name
+    if dialecto == "mssql":
+        op.execute(f"DROP TRIGGER IF EXISTS {q(trigger)}")
+    elif dialecto == "postgresql":
+        op.execute(f"DROP TRIGGER IF EXISTS {q(trigger)} ON {q(tabla)}")
+        op.execute(f"DROP FUNCTION IF EXISTS {q(trigger)}()")
+    elif dialecto == "sqlite":
+        op.execute(f"DROP TRIGGER IF EXISTS {q(trigger + '_ins')}")
+        op.execute(f"DROP TRIGGER IF EXISTS {q(trigger + '_upd')}")
+
+
+def expand_column(tabla: str, columna: str, tipo: sa.types.TypeEngine, *, pk: str = "id"):
+    """Paso 1: agrega la columna nueva (nullable) y el trigger de doble escritura.
+
+    Desde aquí cada INSERT/UPDATE de `columna` actualiza también la nueva, así
+    lo que cambie durante la copia en lotes no se pierde en el contract.
+
+    En SQL Server una tabla con triggers no admite `INSERT ... OUTPUT` sin
+    INTO: hasta el contract el modelo debe declarar
+    `__table_args__ = {"implicit_returning": False}`.
+    """
+    op.add_column(tabla, sa.Column(nombre_columna_nueva(columna), tipo, nullable=True))
+    for sentencia in _sentencias_trigger(op.get_bind(), tabla, columna, tipo, pk):
+        op.execute(sentencia)
+
+
+def copiar_columna_en_lotes(tabla: str, columna: str, tipo: sa.types.TypeEngine, **kwargs) -> int:
+    """Paso 2: copia `columna` a la columna nueva en lotes (ver backfill_en_lotes).
+
+    Solo toca filas sin copiar; las que cambian después las mantiene el trigger.
+    """
+    nueva = nombre_columna_nueva(columna)
+    kwargs.setdefault("nombre", f"{tabla}.{columna}")
+    return backfill_en_lotes(
+        tabla,
+        lambda t: {nueva: sa.cast(t.c[columna], tipo)},
+        where=lambda t: sa.and_(t.c[nueva].is_(None), t.c[columna].isnot(None)),
+        **kwargs,
+    )
+
+
+def contract_column(
+    tabla: str,
+    columna: str,
+    tipo: sa.types.TypeEngine,
+    *,
+    nullable: bool = True,
+):
+    """Paso 3 (en una revisión posterior): reemplaza la columna vieja por la nueva.
+
+    Falla si quedan filas sin copiar. Quita el trigger y recrea con el mismo
+    nombre los índices que incluían la columna (se borran antes del DROP
+    COLUMN, que SQL Server rechaza sobre una columna indexada). Los
+    constraints (FK, CHECK, DEFAULT) sobre la columna deben recrearse aparte.
+    """
+    bind = op.get_bind()
+    nueva = nombre_columna_nueva(columna)
+    t = sa.Table(tabla, sa.MetaData(), autoload_with=bind)
+    sin_copiar = bind.execute(
+        sa.select(sa.func.count()).select_from(t).where(t.c[nueva].is_(None), t.c[columna].isnot(None))
+    ).scalar()
+    if sin_copiar:
+        raise RuntimeError(f"{tabla}.{columna}: {sin_copiar} filas sin copiar; falta copiar_columna_en_lotes")
+
+    _borrar_trigger(bind, tabla, columna)
+    indices = [
+        indice for indice in sa.inspect(bind).get_indexes(tabla)
+        if columna in indice["column_names"]
+    ]
+    for indice in indices:
+        op.drop_index(indice["name"], table_name=tabla)
+
+    op.drop_column(tabla, columna)
+    op.alter_column(
+        tabla, nueva,
+        new_column_name=columna,
+        existing_type=tipo,
+        existing_nullable=True,
+    )
+    if not nullable:
+        op.alter_column(tabla, columna, existing_type=tipo, nullable=False)
+
+    for indice in indices:
+        opciones = {}
+        if indice.get("include_columns"):
+            opciones[f"{bind.dialect.name}_include"] = indice["include_columns"]
+        op.create_index(
+            indice["name"], tabla, indice["column_names"], unique=bool(indice["unique"]), **opciones
+        )
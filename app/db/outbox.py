@@ -0,0 +1,353 @@
+"""Outbox de cambios: cada escritura de las entidades registradas deja una fila.
+
+`capturar_cambios(SessionLocal, Local, Cliente)` engancha un `after_flush`:
+en el mismo flush (y por lo tanto en la misma transacción) se inserta en
+`outbox_cambios` una fila por entidad creada, modificada o borrada, con los
+nombres de las columnas que cambiaron. El id autoincremental es la secuencia.
+
+`despachador` lee la tabla por lotes en un hilo y entrega los cambios a los
+suscriptores del proceso:
+
+    from app.db.outbox import despachador
+
+    def al_cambiar_locales(cambios):
+        for cambio in cambios:
+            ...  # {"id", "entidad", "entidad_id", "operacion", "campos", "creado"}
+
+    despachador.suscribir("locales", al_cambiar_locales)
+
+El avance se guarda en `outbox_checkpoints` (por OUTBOX_CONSUMIDOR), así un
+reinicio continúa desde el último lote entregado en lugar de repetir todo.
+La entrega es "al menos una vez" (un reinicio puede repetir cambios ya
+entregados): los suscriptores deben ser idempotentes, como los índices en
+memoria, que con `como_pares(cambios)` hacen upsert/remove de esos ids.
+
+Las filas que ya pasaron todos los checkpoints y tienen más de
+OUTBOX_RETENCION segundos se borran cada OUTBOX_INTERVALO_PODA segundos.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Integer, String, delete, event, func, inspect, insert, or_, select, update,
+)
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.db.connection import Base, get_engine
+
+logger = logging.getLogger("uvicorn")
+
+# Rangos de huecos por consulta: 2 parámetros cada uno, lejos del límite de
+# 2100 de SQL Server aunque un salto de IDENTITY deje miles de huecos
+RANGOS_POR_CONSULTA = 500
+
+
+class CambioOutbox(Base):
+    __tablename__ = "outbox_cambios"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entidad = Column(String(50), nullable=False)
+    entidad_id = Column(Integer, nullable=False)
+    operacion = Column(String(10), nullable=False)  # insert / update / delete
+    # Columnas modificadas separadas por coma (solo en update)
+    campos = Column(String(1000), nullable=True)
+    creado = Column(DateTime, nullable=False, server_default=func.now())
+
+
+class CheckpointOutbox(Base):
+    __tablename__ = "outbox_checkpoints"
+
+    consumidor = Column(String(100), primary_key=True)
+    ultimo_id = Column(BigInteger, nullable=False, default=0)
+    actualizado = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+
+# ---------------------- CAPTURA ----------------------
+def _campos_modificados(obj) -> List[str]:
+    estado = inspect(obj)
+    version = estado.mapper.version_id_col
+    return [
+        atributo.key
+        for atributo in estado.mapper.column_attrs
+        if atributo.columns[0] is not version and estado.attrs[atributo.key].history.has_changes()
+    ]
+
+
+def capturar_cambios(fabrica_sesiones, *modelos):
+    """Registra en el outbox cada flush de `modelos` hecho con sesiones de `fabrica_sesiones`."""
+    entidades = {modelo: modelo.__tablename__ for modelo in modelos}
+
+    @event.listens_for(fabrica_sesiones, "after_flush")
+    def _registrar(session, contexto):
+        # En after_flush los ids ya están asignados y new/dirty/deleted todavía
+        # reflejan lo que se escribió (el historial se limpia después)
+        filas = []
+        for operacion, objetos in (("insert", session.new), ("update", session.dirty), ("delete", session.deleted)):
+            for obj in objetos:
+                entidad = entidades.get(type(obj))
+                if entidad is None:
+                    continue
+                campos = None
+                if operacion == "update":
+                    modificados = _campos_modificados(obj)
+                    if not modificados:
+                        continue
+                    campos = ",".join(modificados)
+                filas.append({
+                    "entidad": entidad, "entidad_id": obj.id,
+                    "operacion": operacion, "campos": campos,
+                })
+        if filas:
+            session.connection().execute(insert(CambioOutbox), filas)
+
+
+# ---------------------- DESPACHO ----------------------
+def _cambio_dict(fila) -> Dict[str, Any]:
+    return {
+        "id": fila.id,
+        "entidad": fila.entidad,
+        "entidad_id": fila.entidad_id,
+        "operacion": fila.operacion,
+        "campos": fila.campos.split(",") if fila.campos else None,
+        "creado": fila.creado,
+    }
+
+
+def _restar_ids(huecos: List[Tuple[int, int, float]], encontrados) -> List[Tuple[int, int, float]]:
+    """Quita de los rangos `(desde, hasta, instante)` los ids que ya aparecieron."""
+    restantes = []
+    for desde, hasta, instante in huecos:
+        inicio = desde
+        for encontrado in sorted(i for i in encontrados if desde <= i <= hasta):
+            if encontrado > inicio:
+                restantes.append((inicio, encontrado - 1, instante))
+            inicio = encontrado + 1
+        if inicio <= hasta:
+            restantes.append((inicio, hasta, instante))
+    return restantes
+
+
+def como_pares(cambios: List[Dict[str, Any]]) -> List[Tuple[str, int]]:
+    """Cambios del outbox como pares ("upsert"/"remove", id) para los índices en memoria."""
+    return [("remove" if cambio["operacion"] == "delete" else "upsert", cambio["entidad_id"]) for cambio in cambios]
+
+
+class DespachadorOutbox:
+    """Lee `outbox_cambios` en orden de id y reparte los cambios por entidad.
+
+    Un id puede confirmarse antes que uno menor (transacciones concurrentes):
+    ante un hueco en la secuencia el lote se corta ahí y se espera hasta
+    OUTBOX_ESPERA_HUECO segundos a que aparezca. Pasado ese tiempo se sigue,
+    pero los ids saltados se vuelven a buscar en cada ciclo (y se entregan si
+    aparecen) durante OUTBOX_HUECO_MAXIMO segundos; recién entonces se dan por
+    perdidos (rollback o salto de IDENTITY). Mientras haya huecos pendientes el
+    checkpoint no los pasa, así un reinicio tampoco los pierde.
+    """
+
+    def __init__(self, consumidor: Optional[str] = None):
+        self._consumidor = consumidor
+        self._suscriptores: Dict[str, List[Callable[[List[Dict[str, Any]]], None]]] = defaultdict(list)
+        self._ultimo_id: Optional[int] = None
+        self._hueco_desde: Optional[float] = None
+        # Huecos saltados como rangos (primer id, último id, instante en que se saltó):
+        # un salto de IDENTITY de miles de ids es una sola entrada
+        self._huecos: List[Tuple[int, int, float]] = []
+        self._ultima_poda: Optional[float] = None
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._activo = False
+
+    @property
+    def consumidor(self) -> str:
+        return self._consumidor or settings.OUTBOX_CONSUMIDOR
+
+    def suscribir(self, entidad: str, callback: Callable[[List[Dict[str, Any]]], None]):
+        """`callback(cambios)` recibe, en orden, los cambios de un lote para `entidad`."""
+        self._suscriptores[entidad].append(callback)
+        if self._activo:
+            self._arrancar_hilo()
+
+    # ---------------------- CHECKPOINT ----------------------
+    def _leer_checkpoint(self, conn) -> int:
+        ultimo = conn.execute(
+            select(CheckpointOutbox.ultimo_id).where(CheckpointOutbox.consumidor == self.consumidor)
+        ).scalar()
+        if ultimo is not None:
+            return ultimo
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(CheckpointOutbox).values(
+                    consumidor=self.consumidor, ultimo_id=0, actualizado=datetime.utcnow()
+                ))
+        except IntegrityError:
+            pass  # otro worker lo creó primero
+        return 0
+
+    def _guardar_checkpoint(self, conn, ultimo_id: int):
+        # Solo avanza: con varios workers del mismo consumidor gana el más adelantado
+        conn.execute(
+            update(CheckpointOutbox)
+            .where(CheckpointOutbox.consumidor == self.consumidor, CheckpointOutbox.ultimo_id < ultimo_id)
+            .values(ultimo_id=ultimo_id, actualizado=datetime.utcnow())
+        )
+
+    # ---------------------- LECTURA ----------------------
+    def _contiguos(self, filas) -> list:
+        """Prefijo de `filas` sin huecos después de `_ultimo_id` (o todo si el hueco ya expiró)."""
+        esperado = self._ultimo_id + 1
+        for posicion, fila in enumerate(filas):
+            if fila.id != esperado:
+                ahora = time.monotonic()
+                if self._hueco_desde is None:
+                    self._hueco_desde = ahora
+                if ahora - self._hueco_desde < settings.OUTBOX_ESPERA_HUECO:
+                    return filas[:posicion]
+                self._hueco_desde = None
+                # No se da por perdido todavía: se vuelve a buscar en cada ciclo
+                self._huecos.append((esperado, fila.id - 1, ahora))
+            esperado = fila.id + 1
+        return filas
+
+    def _revisar_huecos(self, conn) -> int:
+        """Entrega los cambios que aparecieron en huecos ya saltados; descarta los vencidos."""
+        if not self._huecos:
+            return 0
+        # Primero los vencidos: no se consultan más
+        limite = time.monotonic() - settings.OUTBOX_HUECO_MAXIMO
+        perdidos = [(desde, hasta) for desde, hasta, instante in self._huecos if instante < limite]
+        if perdidos:
+            self._huecos = [hueco for hueco in self._huecos if hueco[2] >= limite]
+            logger.warning(
+                "Outbox: los ids %s no aparecieron; se dan por perdidos",
+                ", ".join(f"{desde}-{hasta}" if hasta > desde else str(desde) for desde, hasta in perdidos),
+            )
+
+        filas = []
+        for inicio in range(0, len(self._huecos), RANGOS_POR_CONSULTA):
+            tramo = self._huecos[inicio:inicio + RANGOS_POR_CONSULTA]
+            filas += conn.execute(
+                select(CambioOutbox)
+                .where(or_(*(CambioOutbox.id.between(desde, hasta) for desde, hasta, _ in tramo)))
+                .order_by(CambioOutbox.id)
+            ).all()
+        conn.rollback()
+        if filas:
+            self._huecos = _restar_ids(self._huecos, {fila.id for fila in filas})
+            self._entregar([_cambio_dict(fila) for fila in sorted(filas, key=lambda fila: fila.id)])
+        return len(filas) + len(perdidos)
+
+    def _hasta_seguro(self) -> int:
+        """Último id que puede guardarse en el checkpoint sin pasar un hueco pendiente."""
+        if self._huecos:
+            return min(self._ultimo_id, min(desde for desde, _, _ in self._huecos) - 1)
+        return self._ultimo_id
+
+    def procesar_pendientes(self) -> int:
+        """Entrega los cambios nuevos en lotes de OUTBOX_LOTE; devuelve cuántos entregó."""
+        with self._lock:
+            entregados = 0
+            with get_engine().connect() as conn:
+                if self._ultimo_id is None:
+                    self._ultimo_id = self._leer_checkpoint(conn)
+                    conn.commit()
+                if self._revisar_huecos(conn):
+                    self._guardar_checkpoint(conn, self._hasta_seguro())
+                    conn.commit()
+                while True:
+                    filas = conn.execute(
+                        select(CambioOutbox)
+                        .where(CambioOutbox.id > self._ultimo_id)
+                        .order_by(CambioOutbox.id)
+                        .limit(settings.OUTBOX_LOTE)
+                    ).all()
+                    # Fin de la transacción de lectura: cada lote ve lo último confirmado
+                    conn.rollback()
+                    lote = self._contiguos(filas)
+                    if not lote:
+                        return entregados
+
+                    self._entregar([_cambio_dict(fila) for fila in lote])
+                    self._ultimo_id = lote[-1].id
+                    self._guardar_checkpoint(conn, self._hasta_seguro())
+                    conn.commit()
+                    entregados += len(lote)
+                    if len(lote) < settings.OUTBOX_LOTE:
+                        return entregados
+
+    def _entregar(self, cambios: List[Dict[str, Any]]):
+        por_entidad = defaultdict(list)
+        for cambio in cambios:
+            por_entidad[cambio["entidad"]].append(cambio)
+        for entidad, cambios_entidad in por_entidad.items():
+            for callback in list(self._suscriptores.get(entidad, ())):
+                # Un suscriptor que falla no frena a los demás ni al checkpoint
+                try:
+                    callback(cambios_entidad)
+                except Exception:
+                    logger.exception("Falló un suscriptor del outbox de %s", entidad)
+
+    # ---------------------- PODA ----------------------
+    def podar(self) -> int:
+        """Borra las filas que todos los consumidores ya pasaron y tienen más de OUTBOX_RETENCION segundos.
+
+        Un consumidor que dejó de leer (su checkpoint no avanza) frena la poda:
+        hay que borrar su fila de `outbox_checkpoints`.
+        """
+        limite = datetime.utcnow() - timedelta(seconds=settings.OUTBOX_RETENCION)
+        with get_engine().begin() as conn:
+            minimo = conn.execute(select(func.min(CheckpointOutbox.ultimo_id))).scalar()
+            if not minimo:
+                return 0
+            resultado = conn.execute(
+                delete(CambioOutbox).where(CambioOutbox.id <= minimo, CambioOutbox.creado < limite)
+            )
+        return resultado.rowcount
+
+    def _podar_si_toca(self):
+        ahora = time.monotonic()
+        if self._ultima_poda is not None and ahora - self._ultima_poda < settings.OUTBOX_INTERVALO_PODA:
+            return
+        self._ultima_poda = ahora
+        borradas = self.podar()
+        if borradas:
+            logger.info("Outbox: %s filas podadas", borradas)
+
+    # ---------------------- HILO ----------------------
+    def iniciar(self):
+        """Arranca el hilo de despacho (solo si hay suscriptores; si no, al suscribirse el primero)."""
+        self._activo = True
+        if self._suscriptores:
+            self._arrancar_hilo()
+
+    def _arrancar_hilo(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ciclo, name="outbox-despachador", daemon=True)
+        self._hilo.start()
+
+    def _ciclo(self):
+        while not self._detener.is_set():
+            try:
+                self.procesar_pendientes()
+                self._podar_si_toca()
+            except Exception:
+                logger.exception("Falló la lectura del outbox; se reintenta")
+            self._detener.wait(settings.OUTBOX_INTERVALO)
+
+    def detener(self):
+        self._activo = False
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+
+
+# Instancia compartida por el proceso
+despachador = DespachadorOutbox()
@@ -0,0 +1,78 @@
+"""Chequeo de planes de consulta contra SQLite.
+
+Captura las sentencias que ejecutan los routers de verdad (no copias a mano)
+y las pasa por `EXPLAIN QUERY PLAN`: así el chequeo sigue a los handlers y a
+las relaciones del ORM cuando cambian. Lo usa tests/test_query_plan.py:
+
+    with capturar_consultas(engine) as consultas:
+        cliente.get("/clientes/1")
+    with engine.connect() as conn:
+        planes = [explain_query_plan(conn, sql, params) for sql, params in consultas]
+    assert not full_table_scans(planes[0])
+"""
+import re
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.connection import Base
+
+# Consultas de fondo (outbox) que no pertenecen a la petición capturada
+HILOS_IGNORADOS = {"outbox-despachador"}
+
+
+@contextmanager
+def capturar_consultas(engine: Engine) -> Iterator[List[Tuple[str, tuple]]]:
+    """Junta (sql, parámetros) de cada SELECT ejecutado en `engine` dentro del bloque."""
+    consultas: List[Tuple[str, tuple]] = []
+
+    def registrar(conn, cursor, sql, parametros, contexto, executemany):
+        if threading.current_thread().name in HILOS_IGNORADOS:
+            return
+        if sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            consultas.append((sql, parametros))
+
+    event.listen(engine, "before_cursor_execute", registrar)
+    try:
+        yield consultas
+    finally:
+        event.remove(engine, "before_cursor_execute", registrar)
+
+
+def explain_query_plan(conn: Connection, sql: str, parametros=()) -> List[str]:
+    filas = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parametros).fetchall()
+    # Cada fila es (id, parent, notused, detail)
+    return [fila[-1] for fila in filas]
+
+
+def full_table_scans(plan: Iterable[str]) -> List[str]:
+    # "SCAN tabla" (con o sin "USING INDEX") recorre todas las filas; los CTE no cuentan
+    tablas = set(Base.metadata.tables)
+    escaneos = []
+    for detalle in plan:
+        partes = detalle.split()
+        if len(partes) >= 2 and partes[0] == "SCAN" and partes[1] in tablas:
+            escaneos.append(detalle)
+    return escaneos
+
+
+def indices_usados(plan: Iterable[str]) -> Set[str]:
+    return {
+        coincidencia.group(1)
+        for detalle in plan
+        for coincidencia in [re.search(r"USING (?:COVERING )?INDEX (\w+)", detalle)]
+        if coincidencia
+    }
+
+
+def indices_secundarios() -> Set[str]:
+    """Índices declarados en `__table_args__` (no los `index=True` de cada columna)."""
+    return {
+        indice.name
+        for tabla in Base.metadata.tables.values()
+        for indice in tabla.indexes
+        if not indice._column_flag
+    }
@@ -0,0 +1,130 @@
+"""Calentamiento de un worker recién arrancado.
+
+Lo llama el lifespan de `app.main` en un hilo aparte: el worker acepta
+peticiones de inmediato y `/health/ready` responde 503 hasta que termina.
+Cada paso es independiente; si uno falla se registra y se sigue (lo que no
+quedó caliente se carga en la primera petición, como antes).
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.core.config import settings
+from app.db.connection import SessionLocal, get_engine, get_read_engine
+from app.apps.users.models import User
+from app.apps.locales.models import Categoria, Zona, Metraje, Cliente, Local
+
+logger = logging.getLogger("uvicorn")
+
+# Las mismas consultas puntuales que hacen los routers (SQLAlchemy cachea la
+# sentencia compilada por forma, no por valores: con id 0 alcanza)
+SENTENCIAS_CALIENTES: Dict[str, Callable[[Session], object]] = {
+    "local_por_id": lambda db: db.query(Local).filter(Local.id == 0).first(),
+    "cliente_por_id": lambda db: db.query(Cliente).filter(Cliente.id == 0).first(),
+    "cliente_con_local": lambda db: (
+        db.query(Cliente).options(joinedload(Cliente.local)).filter(Cliente.id == 0).first()
+    ),
+    "zona_por_id": lambda db: db.query(Zona).filter(Zona.id == 0).first(),
+    "metraje_por_id": lambda db: db.query(Metraje).filter(Metraje.id == 0).first(),
+    "categoria_por_id": lambda db: db.query(Categoria).filter(Categoria.id == 0).first(),
+    "usuario_por_username": lambda db: db.query(User).filter(User.username == "").first(),
+    "usuario_por_id": lambda db: db.query(User).filter(User.id == 0).first(),
+}
+
+
+class EstadoCalentamiento:
+    """Resultado del calentamiento que expone /health/ready."""
+
+    def __init__(self):
+        self.listo = threading.Event()
+        self.pasos: Dict[str, str] = {}
+        self.segundos: Optional[float] = None
+
+    def como_dict(self) -> dict:
+        return {"listo": self.listo.is_set(), "segundos": self.segundos, "pasos": dict(self.pasos)}
+
+
+def _abrir_conexiones(engine, cantidad: int):
+    # Se abren todas a la vez y se devuelven al pool (si no, se reutiliza siempre la misma)
+    tamano = getattr(engine.pool, "size", lambda: cantidad)()
+    conexiones = [engine.connect() for _ in range(min(cantidad or tamano, tamano))]
+    for conexion in conexiones:
+        conexion.close()
+
+
+def _pool():
+    cantidad = settings.WARMUP_CONEXIONES
+    _abrir_conexiones(get_engine(), cantidad)
+    if settings.READ_DATABASE_URL:
+        _abrir_conexiones(get_read_engine(), cantidad)
+
+
+def _referencias():
+    from app.apps.locales.reference_cache import referencias
+    with SessionLocal() as db:
+        referencias.cargar(db)
+
+
+def _sentencias():
+    with SessionLocal() as db:
+        for consulta in SENTENCIAS_CALIENTES.values():
+            consulta(db)
+
+
+def _grupos():
+    from app.apps.locales.routers import grupos_cacheados
+    with SessionLocal() as db:
+        grupos_cacheados(db)
+
+
+def _indices():
+    from app.apps.locales.search_index import indice_locales
+    from app.apps.locales.clientes_index import indice_clientes
+    with SessionLocal() as db:
+        indice_locales.asegurar_cargado(db)
+        indice_clientes.asegurar_cargado(db)
+
+
+PASOS: List[Callable[[], None]] = [_pool, _referencias, _sentencias, _grupos, _indices]
+
+
+def calentar(estado: EstadoCalentamiento):
+    inicio = time.perf_counter()
+    try:
+        get_engine()  # configura SessionLocal
+        estado.pasos["engine"] = "ok"
+    except Exception as exc:
+        # URL inválida o driver ausente: sin engine ningún paso puede correr
+        logger.warning("Calentamiento: falló engine", exc_info=True)
+        estado.pasos["engine"] = f"error: {exc.__class__.__name__}"
+    for paso in PASOS:
+        nombre = paso.__name__.lstrip("_")
+        if estado.pasos["engine"] != "ok":
+            estado.pasos[nombre] = "omitido"
+            continue
+        try:
+            paso()
+            estado.pasos[nombre] = "ok"
+        except Exception as exc:
+            logger.warning("Calentamiento: falló %s", nombre, exc_info=True)
+            estado.pasos[nombre] = f"error: {exc.__class__.__name__}"
+    estado.segundos = round(time.perf_counter() - inicio, 3)
+    estado.listo.set()
+    logger.info("Calentamiento terminado en %.2fs: %s", estado.segundos, estado.pasos)
+
+
+def iniciar_calentamiento() -> EstadoCalentamiento:
+    estado = EstadoCalentamiento()
+    threading.Thread(target=calentar, args=(estado,), name="calentamiento", daemon=True).start()
+    return estado
+
+
+def liberar_engines():
+    """Cierra las conexiones del pool (solo de los engines que llegaron a crearse)."""
+    if get_read_engine.cache_info().currsize:
+        get_read_engine().dispose()
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
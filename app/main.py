@@ -1,18 +1,57 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from app.middlewares.cors import setup_cors
 from app.middlewares.logging import setup_logging
+from app.middlewares.read_your_writes import setup_read_your_writes
 from app.apps.users.routers import router as users_router
 from app.apps.locales.routers import router as locales_router
+from app.apps.reportes.routers import router as reportes_router
+from app.apps.locales.imagenes import crear_carpeta_media, setup_media
+from app.core.cache import cache
+from app.db.outbox import despachador
+from app.db.warmup import iniciar_calentamiento, liberar_engines
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cache.iniciar()  # suscripción a las invalidaciones de los demás workers
+    crear_carpeta_media()  # /media la necesita antes del primer request
+    # Pool, referencias, /grupos, consultas e índices en segundo plano; hasta
+    # que termine /health/ready responde 503
+    app.state.calentamiento = iniciar_calentamiento()
+    despachador.iniciar()  # reparte los cambios del outbox a los suscriptores del proceso
+    yield
+    despachador.detener()
+    cache.cerrar()
+    liberar_engines()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configurar middlewares
 setup_cors(app)
 setup_logging(app)
+setup_read_your_writes(app)
 
 # Registrar los routers
 app.include_router(users_router)
 app.include_router(locales_router)
+app.include_router(reportes_router)
+
+# Imágenes subidas (/media), con Cache-Control immutable
+setup_media(app)
+
+# Liveness: el proceso responde
+@app.get("/health/live")
+def health_live():
+    return {"status": "ok"}
+
+# Readiness: 503 mientras el worker se calienta
+@app.get("/health/ready")
+def health_ready():
+    estado = app.state.calentamiento
+    return JSONResponse(estado.como_dict(), status_code=200 if estado.listo.is_set() else 503)
 
 @app.get("/")
 def root():
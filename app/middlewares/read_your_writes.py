@@ -0,0 +1,24 @@
+from starlette.middleware.base import BaseHTTPMiddleware
+from app.core.config import settings
+from app.db.connection import COOKIE_LEER_PRIMARIA, marcar_escritura
+
+METODOS_LECTURA = {"GET", "HEAD", "OPTIONS"}
+
+class ReadYourWritesMiddleware(BaseHTTPMiddleware):
+    # Tras una escritura exitosa, las lecturas del mismo cliente van a la primaria
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        if request.method not in METODOS_LECTURA and response.status_code < 400:
+            hasta = marcar_escritura(request)
+            response.set_cookie(
+                COOKIE_LEER_PRIMARIA,
+                f"{hasta:.3f}",
+                max_age=max(1, int(settings.READ_YOUR_WRITES_SECONDS) + 1),
+                httponly=True,
+                samesite="lax",
+            )
+        return response
+
+def setup_read_your_writes(app):
+    if settings.READ_DATABASE_URL:
+        app.add_middleware(ReadYourWritesMiddleware)
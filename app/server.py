@@ -0,0 +1,142 @@
+"""Arranque de producción.
+
+    python -m app.server
+
+Con gunicorn instalado (Linux): un master que importa la app una sola vez
+(`preload`) y hace fork de SERVER_WORKERS workers uvicorn. Lo que se cargó
+en el master (routers, TypeAdapters, el layout del plano) queda compartido
+copy-on-write; conexiones, cache compartida, pools y hilos se crean en cada
+worker al arrancar (startup), nunca antes del fork.
+
+Reinicios sin cortar conexiones:
+- `kill -HUP <master>`: levanta workers nuevos y apaga los viejos con
+  SERVER_GRACEFUL_TIMEOUT (mismo código: el preload no se repite).
+- Código nuevo: `kill -USR2 <master>` arranca un master nuevo junto al
+  viejo; luego `kill -WINCH <viejo>` y `kill -TERM <viejo>`.
+- SERVER_MAX_REQUESTS > 0 recicla cada worker tras esa cantidad de
+  peticiones (con jitter, para que no reinicien todos a la vez).
+
+Detrás de un proxy inverso, SERVER_FORWARDED_ALLOW_IPS lista sus IPs: de
+ellos (y solo de ellos) se acepta X-Forwarded-For, así `request.client` es
+el cliente real (el throttling del login y read-your-writes lo usan).
+
+Sin gunicorn (p. ej. Windows) cae a `uvicorn.run` con los mismos ajustes,
+pero cada worker importa la app por su cuenta.
+
+Varios workers necesitan una cache compartida (CACHE_URL=redis://...): con
+la cache en memoria cada worker tendría sus propias versiones de tablas,
+reservas de Idempotency-Key e índices, así que se arranca con uno solo.
+"""
+import gc
+import logging
+import os
+import warnings
+
+from app.core.cache import es_por_proceso
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn")
+
+APP = "app.main:app"
+
+
+def numero_workers() -> int:
+    workers = settings.SERVER_WORKERS or os.cpu_count() or 1
+    if workers > 1 and es_por_proceso(settings.CACHE_URL):
+        logger.error(
+            "CACHE_URL vacía o memory:// no se comparte entre procesos: se arranca 1 worker "
+            "en lugar de %s. Configure CACHE_URL=redis://... para usar varios", workers
+        )
+        return 1
+    return workers
+
+
+def precargar():
+    """Importa la app y los datos de solo lectura en el proceso actual (el master)."""
+    from app.main import app
+    from app.apps.locales.utils import cargar_grupos_estaticos
+
+    cargar_grupos_estaticos()
+    # Lo importado pasa a la generación permanente: el GC de los workers no lo
+    # recorre y no ensucia esas páginas (si no, copy-on-write las duplica)
+    gc.freeze()
+    return app
+
+
+def _clase_worker():
+    try:
+        from uvicorn_worker import UvicornWorker
+    except ImportError:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            from uvicorn.workers import UvicornWorker
+
+    class WorkerConfigurado(UvicornWorker):
+        # forwarded_allow_ips lo toma de la configuración de gunicorn
+        CONFIG_KWARGS = {"loop": settings.SERVER_LOOP, "http": settings.SERVER_HTTP, "proxy_headers": True}
+
+    return WorkerConfigurado
+
+
+def opciones_gunicorn() -> dict:
+    return {
+        "bind": f"{settings.SERVER_HOST}:{settings.SERVER_PORT}",
+        "workers": numero_workers(),
+        "worker_class": _clase_worker(),
+        "backlog": settings.SERVER_BACKLOG,
+        "keepalive": settings.SERVER_KEEPALIVE,
+        "graceful_timeout": settings.SERVER_GRACEFUL_TIMEOUT,
+        "timeout": settings.SERVER_TIMEOUT,
+        "max_requests": settings.SERVER_MAX_REQUESTS,
+        "max_requests_jitter": settings.SERVER_MAX_REQUESTS // 10,
+        "preload_app": True,
+        "forwarded_allow_ips": settings.SERVER_FORWARDED_ALLOW_IPS,
+    }
+
+
+def _servir_gunicorn():
+    from gunicorn.app.base import BaseApplication
+
+    class Aplicacion(BaseApplication):
+        def load_config(self):
+            for clave, valor in opciones_gunicorn().items():
+                self.cfg.set(clave, valor)
+
+        def load(self):
+            return precargar()
+
+    Aplicacion().run()
+
+
+def _servir_uvicorn():
+    import uvicorn
+
+    logger.warning("gunicorn no está instalado: se usa uvicorn sin preload")
+    uvicorn.run(
+        APP,
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=numero_workers(),
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_TIMEOUT,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+    )
+
+
+def main():
+    try:
+        # En Windows el paquete se instala pero no importa (usa fcntl)
+        from gunicorn.app.base import BaseApplication  # noqa: F401
+    except ImportError:
+        _servir_uvicorn()
+    else:
+        _servir_gunicorn()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmarks de la API (HTTP de punta a punta y microbenchmarks)."""
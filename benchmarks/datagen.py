@@ -0,0 +1,265 @@
+"""Generador de datos sintéticos a gran volumen para todos los modelos.
+
+Uso:
+
+    python -m benchmarks.datagen --db sqlite:///carga.db --zonas 5000 --clientes 200000
+    python -m benchmarks.datagen --db "mssql+pyodbc://..." --clientes 100000 --batch 5000
+
+Las filas se generan en streaming (generadores) y se insertan en lotes con
+`insert()` + executemany (`fast_executemany` en pyodbc), así que la memoria no
+crece con el volumen. Cada lote se confirma por separado: no hay una
+transacción (ni sus locks) del tamaño de toda la carga, y un error a mitad
+de camino conserva los lotes ya insertados. Con la misma semilla se obtienen
+los mismos datos. Los ids continúan a partir del máximo existente en cada tabla.
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import islice
+from typing import Dict, Iterator, Optional
+
+import typer
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.engine import Connection, Engine
+
+from app.db.connection import Base
+from app.apps.users.models import User, RoleEnum
+from app.apps.locales.models import (
+    Categoria, Zona, Metraje, Cliente, Local,
+    LineaBaseEnum, EstadoLocalEnum, TipoLocalEnum, MetodoSeparacionEnum, MonedaEnum,
+)
+
+DEFAULT_PASSWORD = "bench-password"
+SUBNIVELES_CADA = 10  # uno de cada N locales tiene dos subniveles
+FECHA_BASE = datetime(2024, 1, 1)
+
+LINEAS = list(LineaBaseEnum)
+ESTADOS = list(EstadoLocalEnum)
+TIPOS = list(TipoLocalEnum)
+METODOS = list(MetodoSeparacionEnum)
+MONEDAS = list(MonedaEnum)
+ROLES = [RoleEnum.marketing, RoleEnum.asesor, RoleEnum.staff]
+
+
+# ---------------------- GENERADORES ----------------------
+# Las relaciones se derivan con fórmulas (no con listas en memoria) para poder
+# generar clientes que apunten a locales sin haberlos guardado.
+def categoria_de_zona(zona: int, n: Dict[str, int]) -> int:
+    return (zona - 1) % n["categorias"] + 1
+
+def metraje_de_local(local: int, n: Dict[str, int]) -> int:
+    return (local * 7) % n["metrajes"] + 1
+
+def total_locales(n: Dict[str, int]) -> int:
+    return n["zonas"] + 2 * (n["zonas"] // SUBNIVELES_CADA)
+
+
+def generar_categorias(n, ids, rnd) -> Iterator[dict]:
+    for i in range(1, n["categorias"] + 1):
+        yield {"id": ids["categorias"] + i, "nombre": f"Categoría {ids['categorias'] + i}"}
+
+
+def generar_metrajes(n, ids, rnd) -> Iterator[dict]:
+    for i in range(1, n["metrajes"] + 1):
+        numero = ids["metrajes"] + i
+        yield {
+            "id": numero,
+            "area": str(15 + 5 * numero),  # área es única
+            "perimetro": f"5x{3 + numero}",
+            "image": "../assets/tipos_locales/mediano.png",
+        }
+
+
+def generar_zonas(n, ids, rnd) -> Iterator[dict]:
+    for i in range(1, n["zonas"] + 1):
+        numero = ids["zonas"] + i
+        yield {
+            "id": numero,
+            "categoria_id": ids["categorias"] + categoria_de_zona(i, n),
+            "codigo": f"PT {numero}",
+            "linea_base": LINEAS[(i - 1) * len(LINEAS) // n["zonas"]],
+        }
+
+
+def generar_locales(n, ids, rnd) -> Iterator[dict]:
+    # Primero un local por zona; luego los subniveles (sin zona propia)
+    for i in range(1, n["zonas"] + 1):
+        yield {
+            "id": ids["locales"] + i,
+            "zona_id": ids["zonas"] + i,
+            "metraje_id": ids["metrajes"] + metraje_de_local(i, n),
+            "estado": rnd.choice(ESTADOS),
+            "tipo": rnd.choice(TIPOS),
+            "precio_base": Decimal(rnd.randrange(30000, 90000, 10)),
+            "subnivel_de": None,
+            "subnivel_de_id": None,
+        }
+    siguiente = n["zonas"] + 1
+    for padre in range(SUBNIVELES_CADA, n["zonas"] + 1, SUBNIVELES_CADA):
+        for nivel in range(2):
+            yield {
+                "id": ids["locales"] + siguiente,
+                "zona_id": None,
+                "metraje_id": ids["metrajes"] + metraje_de_local(siguiente, n),
+                "estado": rnd.choice(ESTADOS),
+                "tipo": rnd.choice(TIPOS),
+                "precio_base": Decimal(rnd.randrange(20000, 50000, 10)),
+                "subnivel_de": f"PT {ids['zonas'] + padre}-{nivel + 1}",
+                "subnivel_de_id": ids["locales"] + padre,
+            }
+            siguiente += 1
+
+
+def generar_clientes(n, ids, rnd) -> Iterator[dict]:
+    for i in range(1, n["clientes"] + 1):
+        numero = ids["clientes"] + i
+        # Solo locales con zona (los subniveles no tienen zona propia)
+        local = rnd.randint(1, n["zonas"])
+        tiene_copropietario = rnd.random() < 0.2
+        yield {
+            "id": numero,
+            "nombres_cliente": f"Nombre{numero}",
+            "apellidos_cliente": f"Apellido{numero}",
+            "dni_cliente": 10000000 + numero,
+            "ruc_cliente": 10000000000 + numero if rnd.random() < 0.3 else None,
+            "f_nacimiento_cliente": FECHA_BASE - timedelta(days=rnd.randint(7000, 25000)),
+            "ocupacion_cliente": rnd.choice([None, "Comerciante", "Ingeniero", "Docente"]),
+            "phone_cliente": 900000000 + numero,
+            "direccion_cliente": f"Calle {numero}",
+            "mail_cliente": f"cliente{numero}@example.com",
+            "nombres_copropietario": f"Copropietario{numero}" if tiene_copropietario else None,
+            "apellidos_copropietario": f"Apellido{numero}" if tiene_copropietario else None,
+            "dni_copropietario": 60000000 + numero if tiene_copropietario else None,
+            "parentesco_copropietario": "Hermano(a)" if tiene_copropietario else None,
+            "nombres_conyuge": f"Conyuge{numero}",
+            "dni_conyuge": 50000000 + numero,
+            "metodo_separacion": rnd.choice(METODOS),
+            "moneda": rnd.choice(MONEDAS),
+            "numero_operacion": f"OP{numero:010d}",
+            "fecha_plazo": None,
+            "fecha_registro": FECHA_BASE + timedelta(minutes=rnd.randint(0, 60 * 24 * 365)),
+            "monto_arras": Decimal(rnd.randrange(500, 5000)),
+            "categoria_id": ids["categorias"] + categoria_de_zona(local, n),
+            "metraje_id": ids["metrajes"] + metraje_de_local(local, n),
+            "zona_id": ids["zonas"] + local,
+            "local_id": ids["locales"] + local,
+        }
+
+
+def generar_users(n, ids, rnd, hashed: str) -> Iterator[dict]:
+    for i in range(1, n["users"] + 1):
+        numero = ids["users"] + i
+        yield {
+            "id": numero,
+            "username": f"usuario{numero}",
+            "email": f"usuario{numero}@example.com",
+            "password": hashed,
+            "role": rnd.choice(ROLES).value,
+        }
+
+
+# ---------------------- INSERCIÓN ----------------------
+# Orden de inserción respetando claves foráneas
+MODELOS = [
+    ("categorias", Categoria, generar_categorias),
+    ("metrajes", Metraje, generar_metrajes),
+    ("zonas", Zona, generar_zonas),
+    ("locales", Local, generar_locales),
+    ("clientes", Cliente, generar_clientes),
+    ("users", User, generar_users),
+]
+
+
+def crear_engine(url: str) -> Engine:
+    if url.startswith("mssql+pyodbc"):
+        # Envía cada lote de executemany en un solo viaje
+        return create_engine(url, fast_executemany=True)
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_engine(url)
+
+
+def ids_iniciales(conn: Connection) -> Dict[str, int]:
+    return {
+        nombre: conn.execute(select(func.coalesce(func.max(modelo.id), 0))).scalar()
+        for nombre, modelo, _ in MODELOS
+    }
+
+
+def insertar_en_lotes(conn: Connection, modelo, filas: Iterator[dict], batch: int) -> int:
+    """Inserta y confirma de a `batch` filas."""
+    tabla = modelo.__table__
+    total = 0
+    while True:
+        lote = list(islice(filas, batch))
+        if not lote:
+            return total
+        conn.execute(insert(tabla), lote)
+        conn.commit()
+        total += len(lote)
+
+
+def generar(
+    engine: Engine,
+    n: Dict[str, int],
+    semilla: int = 42,
+    batch: int = 5000,
+    password: str = DEFAULT_PASSWORD,
+    recrear: bool = False,
+    progreso=None,
+) -> Dict[str, int]:
+    """Inserta `n[tabla]` filas por tabla; devuelve las filas insertadas por tabla."""
+    from app.apps.users.security import hash_password
+
+    if recrear:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    # Un solo hash bcrypt para todos los usuarios: generar no debe tardar por el hashing
+    hashed = hash_password(password)
+
+    insertadas = {}
+    with engine.connect() as conn:
+        ids = ids_iniciales(conn)
+        conn.commit()
+        for nombre, modelo, generador in MODELOS:
+            # Un Random por tabla: cambiar un conteo no altera las demás tablas
+            rnd = random.Random(f"{semilla}:{nombre}")
+            extra = (hashed,) if modelo is User else ()
+            inicio = time.perf_counter()
+            insertadas[nombre] = insertar_en_lotes(conn, modelo, generador(n, ids, rnd, *extra), batch)
+            if progreso:
+                progreso(nombre, insertadas[nombre], time.perf_counter() - inicio)
+    return insertadas
+
+
+def main(
+    db: str = typer.Option(..., help="URL de SQLAlchemy de la base destino"),
+    categorias: int = typer.Option(5),
+    metrajes: int = typer.Option(20),
+    zonas: int = typer.Option(2000),
+    clientes: int = typer.Option(100000),
+    usuarios: int = typer.Option(100),
+    semilla: int = typer.Option(42, help="misma semilla, mismos datos"),
+    batch: int = typer.Option(5000, help="filas por executemany"),
+    recrear: bool = typer.Option(False, help="borra y recrea el esquema antes de generar"),
+):
+    """Genera datos sintéticos válidos para todos los modelos."""
+    n = {
+        "categorias": categorias,
+        "metrajes": metrajes,
+        "zonas": zonas,
+        "clientes": clientes,
+        "users": usuarios,
+    }
+    n["locales"] = total_locales(n)
+
+    def progreso(nombre: str, filas: int, segundos: float):
+        typer.echo(f"{nombre:12s} {filas:>9} filas en {segundos:6.2f}s "
+                   f"({filas / segundos if segundos else 0:,.0f} filas/s)")
+
+    generar(crear_engine(db), n, semilla=semilla, batch=batch, recrear=recrear, progreso=progreso)
+
+
+if __name__ == "__main__":
+    typer.run(main)
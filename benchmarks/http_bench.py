@@ -0,0 +1,187 @@
+"""Benchmark HTTP de punta a punta contra `app.main:app` sobre SQLite sembrado.
+
+Uso:
+
+    python -m benchmarks.http_bench --escala 2 --concurrencia 16 --requests 500 \
+        --output resultados.json
+    python -m benchmarks.http_bench --compare resultados.json
+    python -m benchmarks.http_bench --db postgresql://.../bench --recrear
+
+Por defecto siembra un SQLite temporal. Con `--db` usa la base tal como está:
+sembrarla borra y recrea sus tablas, así que hay que pedirlo con `--recrear`.
+
+Reporta throughput y latencias p50/p95/p99 por endpoint en JSON, para poder
+comparar corridas entre versiones.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Cada endpoint: (método, ruta, body). El login usa el usuario sembrado.
+ENDPOINTS = {
+    "grupos": ("GET", "/grupos", None),
+    "locales": ("GET", "/locales/", None),
+    "clientes": ("GET", "/clientes/", None),
+    "login": ("POST", "/users/login", None),
+}
+
+
+def percentil(ordenados: List[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    # Nearest-rank
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+def resumir(latencias: List[float], errores: int, duracion: float) -> Dict:
+    ordenados = sorted(latencias)
+    total = len(latencias) + errores
+    return {
+        "requests": total,
+        "errores": errores,
+        "duracion_s": round(duracion, 4),
+        # Solo respuestas exitosas: un 4xx/5xx rápido no cuenta como throughput
+        "rps": round(len(latencias) / duracion, 2) if duracion else 0.0,
+        "media_ms": round(sum(ordenados) / len(ordenados) * 1000, 3) if ordenados else 0.0,
+        "p50_ms": round(percentil(ordenados, 50) * 1000, 3),
+        "p95_ms": round(percentil(ordenados, 95) * 1000, 3),
+        "p99_ms": round(percentil(ordenados, 99) * 1000, 3),
+    }
+
+
+async def medir_endpoint(cliente, metodo: str, ruta: str, body, total: int, concurrencia: int) -> Dict:
+    latencias: List[float] = []
+    errores = 0
+    pendientes = iter(range(total))
+
+    async def trabajador():
+        nonlocal errores
+        for _ in pendientes:
+            inicio = time.perf_counter()
+            respuesta = await cliente.request(metodo, ruta, json=body)
+            transcurrido = time.perf_counter() - inicio
+            if respuesta.status_code >= 400:
+                errores += 1
+            else:
+                latencias.append(transcurrido)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return resumir(latencias, errores, time.perf_counter() - inicio)
+
+
+async def correr(endpoints: List[str], total: int, concurrencia: int, calentamiento: int) -> Dict[str, Dict]:
+    import httpx
+    from app.main import app
+    from benchmarks.seed import BENCH_USERNAME, BENCH_PASSWORD
+
+    cuerpos = {"login": {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}}
+    resultados = {}
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+        for nombre in endpoints:
+            metodo, ruta, _ = ENDPOINTS[nombre]
+            body = cuerpos.get(nombre)
+            if calentamiento:
+                await medir_endpoint(cliente, metodo, ruta, body, calentamiento, concurrencia)
+            resultados[nombre] = await medir_endpoint(cliente, metodo, ruta, body, total, concurrencia)
+            print(f"  {nombre:10s} {resultados[nombre]['rps']:>9.1f} req/s  "
+                  f"p50 {resultados[nombre]['p50_ms']:.1f}ms  p99 {resultados[nombre]['p99_ms']:.1f}ms",
+                  file=sys.stderr)
+    return resultados
+
+
+def comparar(anterior: Dict, actual: Dict) -> Dict[str, Dict]:
+    """Variación porcentual (actual vs anterior) de rps y percentiles por endpoint."""
+    deltas = {}
+    for nombre, metricas in actual["endpoints"].items():
+        previo = anterior.get("endpoints", {}).get(nombre)
+        if not previo:
+            continue
+        deltas[nombre] = {
+            clave: round((metricas[clave] - previo[clave]) * 100 / previo[clave], 1) if previo[clave] else None
+            for clave in ("rps", "p50_ms", "p95_ms", "p99_ms")
+        }
+    return deltas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark HTTP de la API sobre SQLite sembrado")
+    parser.add_argument("--escala", type=int, default=1)
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests por endpoint")
+    parser.add_argument("--calentamiento", type=int, default=20, help="requests previos no medidos")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS))
+    parser.add_argument("--db", default=None, help="URL de base de datos (por defecto un SQLite temporal)")
+    parser.add_argument(
+        "--recrear", action="store_true",
+        help="borra las tablas de la base de --db y la siembra de nuevo (sin --db siempre se siembra)",
+    )
+    parser.add_argument("--output", default=None, help="archivo JSON de salida (por defecto stdout)")
+    parser.add_argument("--compare", default=None, help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args(argv)
+
+    endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    desconocidos = set(endpoints) - set(ENDPOINTS)
+    if desconocidos:
+        parser.error(f"endpoints desconocidos: {', '.join(sorted(desconocidos))}")
+
+    directorio = None
+    url = args.db
+    if url is None:
+        directorio = tempfile.mkdtemp(prefix="bench-")
+        url = f"sqlite:///{os.path.join(directorio, 'bench.db')}"
+    # Debe fijarse antes del primer acceso a settings.DATABASE_URL
+    os.environ["DATABASE_URL"] = url
+    # Todas las peticiones llegan de la misma IP y usuario: sin cubetas enormes el
+    # throttling del login respondería 429 y se mediría el límite, no el login
+    os.environ["LOGIN_BURST_IP"] = os.environ["LOGIN_BURST_USUARIO"] = str(10 ** 9)
+
+    from app.db.connection import get_engine
+    from benchmarks.seed import sembrar
+
+    if args.recrear and args.db is None:
+        parser.error("--recrear solo aplica con --db")
+
+    conteos = None
+    # Solo se borra la base temporal propia, o la de --db si se pidió con --recrear
+    if directorio is not None or args.recrear:
+        print(f"Sembrando {url} (escala {args.escala})...", file=sys.stderr)
+        conteos = sembrar(get_engine(), args.escala)
+
+    resultados = asyncio.run(correr(endpoints, args.requests, args.concurrencia, args.calentamiento))
+    reporte = {
+        "meta": {
+            "fecha": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "db": url.split("://")[0],
+            "escala": args.escala,
+            "conteos": conteos,
+            "concurrencia": args.concurrencia,
+            "requests_por_endpoint": args.requests,
+        },
+        "endpoints": resultados,
+    }
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            reporte["comparacion_pct"] = comparar(json.load(f), reporte)
+
+    salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
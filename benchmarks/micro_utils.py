@@ -0,0 +1,211 @@
+"""Microbenchmarks de `app/apps/locales/utils.py` con baselines guardados.
+
+Uso:
+
+    python -m benchmarks.micro_utils                       # corre y compara con el baseline
+    python -m benchmarks.micro_utils --guardar-baseline    # (re)escribe el baseline
+    python -m benchmarks.micro_utils --tamanos 100,1000 --umbral 15
+
+Los layouts son sintéticos (de 100 a 100k nodos) y los objetos ORM son stubs,
+así que no hace falta base de datos. La corrida falla (código 1) si alguna
+función es más lenta que el baseline en más de `--umbral` por ciento, o si
+no hay baseline (salvo con `--guardar-baseline`): en CI un baseline que no
+se encuentra no puede pasar como "sin regresiones".
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from app.apps.locales.models import EstadoLocalEnum, LineaBaseEnum
+from app.apps.locales.utils import (
+    combinar_grupos_con_bd,
+    recolectar_todos_los_codigos,
+    procesar_local_recursivo,
+    serialize_local,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro_utils.json")
+TAMANOS = [100, 1000, 10000, 100000]
+LOCALES_POR_GRUPO = 10
+SUBNIVELES_CADA = 5  # uno de cada N locales del layout tiene dos subniveles
+
+
+# ---------------------- DATOS SINTÉTICOS ----------------------
+def generar_layout(nodos: int, semilla: int = 7) -> List[Dict[str, Any]]:
+    """Layout como el de grupos_layout.json con `nodos` locales en total (incl. subniveles)."""
+    rnd = random.Random(semilla)
+    grupos: List[Dict[str, Any]] = []
+    creados = 0
+    while creados < nodos:
+        grupo = {"tipo": f"grupo {len(grupos) + 1}", "locales": []}
+        for _ in range(LOCALES_POR_GRUPO):
+            if creados >= nodos:
+                break
+            creados += 1
+            item = _nodo(creados, rnd)
+            if creados % SUBNIVELES_CADA == 0 and creados + 2 <= nodos:
+                item["subniveles"] = [_nodo(creados + 1, rnd), _nodo(creados + 2, rnd)]
+                creados += 2
+            grupo["locales"].append(item)
+        grupos.append(grupo)
+    return grupos
+
+
+def _nodo(numero: int, rnd: random.Random) -> Dict[str, Any]:
+    return {
+        "zona_codigo": f"PT {numero}",
+        "precio": "$51,990",
+        "estado": rnd.choice(["Disponible", "Reservado", "Vendido"]),
+        "area": "25 m²",
+        "perimetro": "5x5",
+        "image": "../assets/tipos_locales/mediano.png",
+        "linea_base": "primera_linea",
+    }
+
+
+def stub_local(numero: int, rnd: random.Random) -> SimpleNamespace:
+    zona = SimpleNamespace(
+        codigo=f"PT {numero}",
+        linea_base=rnd.choice(list(LineaBaseEnum)),
+        categoria_id=1,
+    )
+    metraje = SimpleNamespace(area="25", perimetro="5x5", image="../assets/tipos_locales/mediano.png")
+    return SimpleNamespace(
+        id=numero,
+        zona_id=None,  # fuera de la cache de referencia: se usa la relación
+        metraje_id=None,
+        precio_base=Decimal(rnd.randrange(30000, 90000)),
+        estado=rnd.choice(list(EstadoLocalEnum)),
+        zona=zona,
+        metraje=metraje,
+        subniveles=[],
+    )
+
+
+class StubSession:
+    """Imita `db.query(Local).join(Zona).filter(...).all()` devolviendo stubs."""
+
+    def __init__(self, locales):
+        self._locales = locales
+
+    def query(self, *args):
+        return self
+
+    def join(self, *args):
+        return self
+
+    def options(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def all(self):
+        return self._locales
+
+
+# ---------------------- MEDICIÓN ----------------------
+def medir(funcion: Callable[[], Any], repeticiones: int) -> float:
+    """Mejor tiempo (s) de `repeticiones` corridas: el mínimo es el menos ruidoso."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def casos(nodos: int) -> Dict[str, Callable[[], Any]]:
+    rnd = random.Random(nodos)
+    layout = generar_layout(nodos)
+    locales = [stub_local(i, rnd) for i in range(1, nodos + 1)]
+    db = StubSession(locales)
+    dict_locales = {local.zona.codigo: local for local in locales}
+
+    def procesar():
+        for grupo in layout:
+            for item in grupo["locales"]:
+                procesar_local_recursivo(item, dict_locales)
+
+    def serializar():
+        for local in locales:
+            serialize_local(local)
+
+    return {
+        "combinar_grupos_con_bd": lambda: combinar_grupos_con_bd(db, layout),
+        "recolectar_todos_los_codigos": lambda: recolectar_todos_los_codigos(layout),
+        "procesar_local_recursivo": procesar,
+        "serialize_local": serializar,
+    }
+
+
+def correr(tamanos: List[int], repeticiones: int) -> Dict[str, float]:
+    resultados = {}
+    for nodos in tamanos:
+        for nombre, funcion in casos(nodos).items():
+            resultados[f"{nombre}[{nodos}]"] = medir(funcion, repeticiones)
+    return resultados
+
+
+def regresiones(actual: Dict[str, float], baseline: Dict[str, float], umbral: float) -> Dict[str, float]:
+    """{caso: % de variación} para los casos más lentos que el baseline en más de `umbral`%."""
+    peores = {}
+    for caso, segundos in actual.items():
+        previo = baseline.get(caso)
+        if not previo:
+            continue
+        variacion = (segundos - previo) * 100 / previo
+        if variacion > umbral:
+            peores[caso] = round(variacion, 1)
+    return peores
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks de app.apps.locales.utils")
+    parser.add_argument("--tamanos", default=",".join(str(t) for t in TAMANOS))
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--umbral", type=float, default=20.0, help="regresión máxima permitida en %%")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--guardar-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["resultados"]
+    elif not args.guardar_baseline:
+        print(f"❌ Sin baseline en {args.baseline}: usa --guardar-baseline para crearlo", file=sys.stderr)
+        return 1
+
+    tamanos = [int(t) for t in args.tamanos.split(",") if t.strip()]
+    actual = correr(tamanos, args.repeticiones)
+
+    print(f"{'caso':45s} {'actual ms':>11} {'baseline ms':>12} {'var %':>8}")
+    for caso, segundos in actual.items():
+        previo = baseline.get(caso)
+        variacion = f"{(segundos - previo) * 100 / previo:+.1f}" if previo else "-"
+        previo_ms = f"{previo * 1000:.3f}" if previo else "-"
+        print(f"{caso:45s} {segundos * 1000:11.3f} {previo_ms:>12} {variacion:>8}")
+
+    if args.guardar_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"repeticiones": args.repeticiones, "resultados": actual}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline guardado en {args.baseline}")
+        return 0
+
+    peores = regresiones(actual, baseline, args.umbral)
+    for caso, variacion in peores.items():
+        print(f"❌ {caso}: {variacion:+.1f}% (umbral {args.umbral}%)", file=sys.stderr)
+    return 1 if peores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
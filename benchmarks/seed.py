@@ -0,0 +1,36 @@
+"""Siembra una base de datos (SQLite u otra) con datos sintéticos a escala."""
+from typing import Dict
+
+from sqlalchemy.engine import Engine
+
+from benchmarks.datagen import DEFAULT_PASSWORD, generar, total_locales
+
+# Primer usuario generado (la base se recrea desde cero)
+BENCH_USERNAME = "usuario1"
+BENCH_PASSWORD = DEFAULT_PASSWORD
+
+# Tamaños por unidad de escala
+ZONAS_POR_ESCALA = 120
+CLIENTES_POR_ESCALA = 1000
+USUARIOS_POR_ESCALA = 20
+
+
+def conteos(escala: int) -> Dict[str, int]:
+    n = {
+        "categorias": 3,
+        "metrajes": 10,
+        "zonas": ZONAS_POR_ESCALA * escala,
+        "clientes": CLIENTES_POR_ESCALA * escala,
+        "users": USUARIOS_POR_ESCALA * escala,
+    }
+    n["locales"] = total_locales(n)
+    return n
+
+
+def sembrar(engine: Engine, escala: int = 1, semilla: int = 42) -> Dict[str, int]:
+    """Borra y recrea el esquema de `engine` y lo llena; devuelve los conteos insertados.
+
+    Destructivo: http_bench solo lo llama con su SQLite temporal o con `--db ... --recrear`.
+    """
+    # Los códigos de zona "PT n" coinciden con los del plano estático de /grupos
+    return generar(engine, conteos(escala), semilla=semilla, recrear=True)
@@ -0,0 +1,31 @@
+"""Entorno común de los tests: SQLite temporal, cache en memoria y media en /tmp."""
+import os
+import tempfile
+
+# Antes del primer acceso a settings (se leen en el primer uso, no al importar)
+_directorio = tempfile.mkdtemp(prefix="tests-fastapi-gemma-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'test.db')}"
+os.environ["READ_DATABASE_URL"] = ""
+os.environ["CACHE_URL"] = "memory://"
+os.environ["MEDIA_DIR"] = os.path.join(_directorio, "media")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def base_sembrada():
+    """Base con los datos sintéticos de escala 1 (se siembra una vez por sesión)."""
+    from app.db.connection import get_engine
+    from benchmarks.seed import sembrar
+
+    sembrar(get_engine(), 1)
+    return get_engine()
+
+
+@pytest.fixture(scope="session")
+def cliente_http(base_sembrada):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as cliente:
+        yield cliente
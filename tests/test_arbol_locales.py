@@ -0,0 +1,69 @@
+"""Árbol de subniveles: un ciclo o un árbol más profundo que el límite no se corta en silencio."""
+import pytest
+from sqlalchemy import delete, update
+
+from app.apps.locales.models import Local, TipoLocalEnum
+from app.apps.locales.services import (
+    MAX_PROFUNDIDAD_SUBNIVELES, ArbolLocalesInvalido, get_local_tree, ids_arbol,
+)
+from app.db.connection import SessionLocal
+
+
+@pytest.fixture
+def cadena(base_sembrada):
+    """Crea una cadena de locales padre -> hijo y devuelve sus ids (se borran al final)."""
+    creados = []
+
+    def crear(largo: int):
+        with SessionLocal() as db:
+            padre = None
+            for _ in range(largo):
+                local = Local(precio_base=1, tipo=list(TipoLocalEnum)[0], subnivel_de_id=padre)
+                db.add(local)
+                db.flush()
+                padre = local.id
+                creados.append(local.id)
+            db.commit()
+        return list(creados)
+
+    yield crear
+    with base_sembrada.begin() as conn:
+        conn.execute(update(Local).where(Local.id.in_(creados)).values(subnivel_de_id=None))
+        conn.execute(delete(Local).where(Local.id.in_(creados)))
+
+
+def test_ciclo_se_detecta(base_sembrada, cadena, cliente_http):
+    a, b = cadena(2)
+    with base_sembrada.begin() as conn:
+        conn.execute(update(Local).where(Local.id == a).values(subnivel_de_id=b))
+
+    with SessionLocal() as db:
+        with pytest.raises(ArbolLocalesInvalido, match="ciclo"):
+            get_local_tree(db, a)
+        with pytest.raises(ArbolLocalesInvalido, match="ciclo"):
+            ids_arbol(db, b)
+    assert cliente_http.get(f"/locales/{a}/arbol").status_code == 409
+    assert cliente_http.delete(f"/locales/{a}").status_code == 409
+
+
+def test_arbol_en_el_limite_se_carga_completo(cadena):
+    ids = cadena(MAX_PROFUNDIDAD_SUBNIVELES + 1)
+    with SessionLocal() as db:
+        local = get_local_tree(db, ids[0])
+        profundidad = 0
+        while local.subniveles:
+            (local,) = local.subniveles
+            profundidad += 1
+    assert profundidad == MAX_PROFUNDIDAD_SUBNIVELES
+    assert local.id == ids[-1]
+
+
+def test_arbol_mas_profundo_que_el_limite(cadena, cliente_http):
+    ids = cadena(MAX_PROFUNDIDAD_SUBNIVELES + 2)
+    with SessionLocal() as db:
+        with pytest.raises(ArbolLocalesInvalido, match="niveles"):
+            get_local_tree(db, ids[0])
+    respuesta = cliente_http.get(f"/locales/{ids[0]}/arbol")
+    assert respuesta.status_code == 409
+    # Un subárbol dentro del límite sí se carga
+    assert cliente_http.get(f"/locales/{ids[1]}/arbol").status_code == 200
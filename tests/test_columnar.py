@@ -0,0 +1,29 @@
+"""Marca de agua de la copia columnar: el corte sale del reloj de la base, en UTC."""
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.core.config import settings
+from app.db.columnar import ahora_bd, exportar, leer_marca
+
+
+def test_ahora_bd_en_utc_sin_zona(base_sembrada):
+    with base_sembrada.connect() as conn:
+        ahora = ahora_bd(conn)
+    assert ahora.tzinfo is None
+    assert abs(ahora - datetime.utcnow()) < timedelta(seconds=5)
+
+
+def test_exportar_corta_con_el_margen(base_sembrada, tmp_path, monkeypatch):
+    # Un margen que alcanza a todos los clientes sembrados: nada queda detrás de la marca
+    with base_sembrada.connect() as conn:
+        margen = ahora_bd(conn) - datetime(2000, 1, 1)
+    monkeypatch.setattr(settings, "ANALYTICS_MARGEN", int(margen.total_seconds()))
+    assert exportar(str(tmp_path), engine=base_sembrada)["clientes"] == 0
+
+    monkeypatch.setattr(settings, "ANALYTICS_MARGEN", 0)
+    resumen = exportar(str(tmp_path), engine=base_sembrada)
+    assert resumen["clientes"] > 0
+    assert leer_marca(tmp_path)["partes"] == 1
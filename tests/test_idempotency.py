@@ -0,0 +1,36 @@
+"""Idempotency-Key en POST /clientes/ y /locales/: mismos bytes con y sin clave y al repetir."""
+import json
+import re
+
+import pytest
+
+LOCAL = {"estado": "Disponible", "precio_base": "45000", "tipo": "Entrada secundaria grupo 1 izquierda", "zona_id": 1}
+CLIENTE = {
+    "nombres_cliente": "Ana", "apellidos_cliente": "Núñez", "dni_cliente": 44556677,
+    "phone_cliente": 987654321, "direccion_cliente": "Av. Lima 123", "mail_cliente": "ana@example.com",
+    "nombres_conyuge": "Luis", "dni_conyuge": 11223344, "metodo_separacion": "Efectivo",
+    "moneda": "PEN", "monto_arras": 100.5, "local_id": 1,
+}
+
+
+def _sin_variables(cuerpo: bytes) -> bytes:
+    # El id y la fecha de registro cambian entre altas; el resto debe ser idéntico
+    cuerpo = re.sub(rb'^\{"id":\d+', b'{"id":0', cuerpo)
+    return re.sub(rb'"fecha_registro":"[^"]*"', b'"fecha_registro":""', cuerpo)
+
+
+@pytest.mark.parametrize("ruta, payload, campo, esperado", [
+    ("/locales/", LOCAL, "precio_base", "45000.00"),
+    ("/clientes/", CLIENTE, "monto_arras", "100.50"),
+])
+def test_mismos_bytes_con_clave_sin_clave_y_repeticion(cliente_http, ruta, payload, campo, esperado):
+    sin_clave = cliente_http.post(ruta, json=payload)
+    con_clave = cliente_http.post(ruta, json=payload, headers={"Idempotency-Key": f"prueba-{ruta}"})
+    repeticion = cliente_http.post(ruta, json=payload, headers={"Idempotency-Key": f"prueba-{ruta}"})
+
+    assert sin_clave.status_code == con_clave.status_code == repeticion.status_code == 200
+    assert "Idempotent-Replayed" not in con_clave.headers
+    assert repeticion.headers["Idempotent-Replayed"] == "true"
+    assert repeticion.content == con_clave.content
+    assert _sin_variables(con_clave.content) == _sin_variables(sin_clave.content)
+    assert json.loads(con_clave.content)[campo] == esperado
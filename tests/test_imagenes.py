@@ -0,0 +1,46 @@
+"""Subida de imágenes de metrajes: bombas de descompresión y formatos no admitidos."""
+import io
+import struct
+import zlib
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from app.apps.locales.imagenes import ImagenDemasiadoGrande, generar_variantes
+
+
+def _chunk(tipo: bytes, datos: bytes) -> bytes:
+    return struct.pack(">I", len(datos)) + tipo + datos + struct.pack(">I", zlib.crc32(tipo + datos))
+
+
+def png_solo_cabecera(ancho: int, alto: int) -> bytes:
+    """PNG de pocos bytes que declara `ancho` x `alto` (Pillow lee el tamaño en open())."""
+    cabecera = struct.pack(">IIBBBBB", ancho, alto, 1, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", cabecera) + _chunk(b"IDAT", zlib.compress(b"")) + _chunk(b"IEND", b"")
+
+
+def _png(ancho: int, alto: int) -> bytes:
+    salida = io.BytesIO()
+    Image.new("RGB", (ancho, alto), "red").save(salida, format="PNG")
+    return salida.getvalue()
+
+
+def test_bomba_de_descompresion_responde_413(cliente_http):
+    bomba = png_solo_cabecera(20000, 20000)
+    assert len(bomba) < 100
+    respuesta = cliente_http.post("/metrajes/1/imagen", files={"archivo": ("plano.png", bomba)})
+    assert respuesta.status_code == 413
+
+
+def test_por_encima_del_limite_aunque_pillow_solo_avise():
+    # Entre MAX_IMAGE_PIXELS y el doble Pillow emite un warning, no un error
+    with pytest.raises(ImagenDemasiadoGrande):
+        generar_variantes(_png(20, 20), [10], max_pixeles=300)
+
+
+def test_formato_no_admitido_responde_415(cliente_http):
+    salida = io.BytesIO()
+    Image.new("RGB", (4, 4)).save(salida, format="BMP")
+    respuesta = cliente_http.post("/metrajes/1/imagen", files={"archivo": ("plano.bmp", salida.getvalue())})
+    assert respuesta.status_code == 415
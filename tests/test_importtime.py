@@ -0,0 +1,20 @@
+"""`import app.main` no carga los paquetes que la app importa recién al usarlos."""
+from pathlib import Path
+
+from app.core.importtime import PEREZOSOS, medir_importacion, perezosos_importados
+
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+def test_app_main_no_importa_paquetes_perezosos(monkeypatch):
+    # Intérprete nuevo (desde la raíz del repo): los módulos ya cargados por otros tests no cuentan
+    monkeypatch.chdir(RAIZ)
+    reporte = medir_importacion("app.main")
+    assert reporte["modulos"], "python -X importtime no produjo reporte"
+    assert perezosos_importados(reporte) == []
+
+
+def test_detecta_un_paquete_perezoso():
+    reporte = {"modulos": [{"modulo": f"{PEREZOSOS[0]}.context"}, {"modulo": "app.main"}]}
+    assert perezosos_importados(reporte) == [PEREZOSOS[0]]
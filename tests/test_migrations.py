@@ -0,0 +1,44 @@
+"""Expand/contract de app.db.migrations: doble escritura durante la copia e índices recreados."""
+import sqlalchemy as sa
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+
+from app.db.migrations import contract_column, copiar_columna_en_lotes, expand_column
+
+
+def test_cambio_de_tipo_no_pierde_escrituras_durante_la_copia(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'migracion.db'}")
+    metadata = sa.MetaData()
+    personas = sa.Table(
+        "personas", metadata,
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("dni", sa.String(20)),
+        sa.Index("ix_personas_dni", "dni"),
+    )
+    metadata.create_all(engine)
+
+    with engine.connect() as conn:
+        conn.execute(personas.insert(), [{"id": i, "dni": str(10000000 + i)} for i in range(1, 51)])
+        conn.commit()
+
+        with Operations.context(MigrationContext.configure(conn)):
+            # Revisión 1: expand y copia
+            expand_column("personas", "dni", sa.BigInteger())
+            conn.commit()
+            # Fuera de una revisión la copia necesita una conexión en autocommit
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as autocommit:
+                copiar_columna_en_lotes(
+                    "personas", "dni", sa.BigInteger(), batch_size=7, progreso=None, bind=autocommit
+                )
+            # Escrituras de la aplicación entre revisiones, sobre filas ya copiadas
+            conn.execute(personas.update().where(personas.c.id == 3).values(dni="99999999"))
+            conn.execute(personas.insert().values(id=51, dni="12345678"))
+            conn.commit()
+            # Revisión 2: contract
+            contract_column("personas", "dni", sa.BigInteger())
+        conn.commit()
+
+        valores = dict(conn.execute(sa.text("SELECT id, dni FROM personas WHERE id IN (1, 3, 51)")).all())
+        assert valores == {1: 10000001, 3: 99999999, 51: 12345678}
+        indices = sa.inspect(conn).get_indexes("personas")
+        assert [(i["name"], i["column_names"]) for i in indices] == [("ix_personas_dni", ["dni"])]
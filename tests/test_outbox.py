@@ -0,0 +1,77 @@
+"""Huecos del outbox: un salto de IDENTITY se guarda como rango y se consulta por tramos."""
+import pytest
+from sqlalchemy import func, insert, select
+
+from app.core.config import settings
+from app.db import outbox
+from app.db.outbox import CambioOutbox, CheckpointOutbox, DespachadorOutbox
+
+
+def _insertar(engine, *ids):
+    with engine.begin() as conn:
+        conn.execute(insert(CambioOutbox), [
+            {"id": i, "entidad": "prueba", "entidad_id": i, "operacion": "insert"} for i in ids
+        ])
+
+
+def _checkpoint(engine, consumidor):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(CheckpointOutbox.ultimo_id).where(CheckpointOutbox.consumidor == consumidor)
+        ).scalar()
+
+
+@pytest.fixture
+def despachador(base_sembrada, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_ESPERA_HUECO", 0)
+    monkeypatch.setattr(settings, "OUTBOX_HUECO_MAXIMO", 3600)
+    entregados = []
+    despachador = DespachadorOutbox("prueba-huecos")
+    despachador.suscribir("prueba", lambda cambios: entregados.extend(c["id"] for c in cambios))
+    despachador.procesar_pendientes()  # lo que dejaron otros tests
+    entregados.clear()
+    with base_sembrada.connect() as conn:
+        base = conn.execute(select(func.max(CambioOutbox.id))).scalar() or 0
+    return despachador, entregados, base
+
+
+def test_salto_de_identity(base_sembrada, despachador, monkeypatch):
+    despachador, entregados, base = despachador
+    # SQL Server tras un reinicio: el siguiente id salta 1000+ posiciones
+    _insertar(base_sembrada, base + 1, base + 5002)
+
+    despachador.procesar_pendientes()
+    assert entregados == [base + 1, base + 5002]
+    assert [(desde, hasta) for desde, hasta, _ in despachador._huecos] == [(base + 2, base + 5001)]
+    assert _checkpoint(base_sembrada, "prueba-huecos") == base + 1
+
+    # Una transacción lenta confirma un id del hueco: se entrega y el rango se parte
+    _insertar(base_sembrada, base + 100)
+    despachador.procesar_pendientes()
+    assert entregados[-1] == base + 100
+    assert [(desde, hasta) for desde, hasta, _ in despachador._huecos] == [
+        (base + 2, base + 99), (base + 101, base + 5001),
+    ]
+
+    # Vencido el plazo se da por perdido sin consultarlo y el checkpoint avanza
+    monkeypatch.setattr(settings, "OUTBOX_HUECO_MAXIMO", -1)
+    despachador.procesar_pendientes()
+    assert despachador._huecos == []
+    assert _checkpoint(base_sembrada, "prueba-huecos") == base + 5002
+
+
+def test_muchos_huecos_se_consultan_por_tramos(base_sembrada, despachador, monkeypatch):
+    despachador, entregados, base = despachador
+    monkeypatch.setattr(outbox, "RANGOS_POR_CONSULTA", 7)
+    ids = [base + 2 * i for i in range(1, 41)]
+    _insertar(base_sembrada, *ids)
+
+    despachador.procesar_pendientes()
+    assert entregados == ids
+    assert len(despachador._huecos) == 40
+
+    tardios = [base + 1, base + 39, base + 79]
+    _insertar(base_sembrada, *tardios)
+    despachador.procesar_pendientes()
+    assert entregados[-3:] == tardios
+    assert len(despachador._huecos) == 37
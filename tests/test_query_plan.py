@@ -0,0 +1,85 @@
+"""Planes de las consultas que ejecutan los routers: sin full table scans y sin índices de más."""
+import pytest
+from sqlalchemy import select
+
+from app.apps.locales.models import Cliente, Local
+from app.core.http_cache import versiones_tablas
+from app.db.query_plan import (
+    capturar_consultas, explain_query_plan, full_table_scans, indices_secundarios, indices_usados,
+)
+from benchmarks.seed import BENCH_PASSWORD, BENCH_USERNAME
+
+# Tablas que una llamada puede recorrer completas a propósito
+ESCANEOS_PERMITIDOS = {
+    # Borrar una categoría (rara) suelta sus clientes y recarga los catálogos de referencia
+    "eliminar_categoria": {"clientes", "categorias", "zonas", "metrajes"},
+}
+
+
+def _llamadas(engine, cliente_http):
+    with engine.connect() as conn:
+        cliente = conn.execute(select(Cliente).where(Cliente.ruc_cliente.isnot(None)).limit(1)).first()
+        padre = conn.execute(select(Local.subnivel_de_id).where(Local.subnivel_de_id.isnot(None))).scalar()
+    # Entidades propias para las escrituras: no tocan los datos de otros tests
+    categoria = cliente_http.post("/categorias", json={"nombre": "Categoría plan"}).json()
+    zona = cliente_http.post("/zonas", json={
+        "categoria_id": categoria["id"], "codigo": "PT plan", "linea_base": "Primera Línea",
+    }).json()
+    # /grupos sale de la cache: con otra versión de metrajes se calcula de nuevo
+    versiones_tablas.bump("metrajes")
+    desde_hasta = "desde=2025-01-01T00:00:00&hasta=2025-02-01T00:00:00"
+    return {
+        "cliente_por_id": ("GET", f"/clientes/{cliente.id}", None),
+        "local_por_id": ("GET", f"/locales/{padre}", None),
+        "arbol_locales": ("GET", f"/locales/{padre}/arbol", None),
+        "clientes_por_dni": ("GET", f"/clientes/buscar?dni={cliente.dni_cliente}", None),
+        "clientes_por_ruc": ("GET", f"/clientes/buscar?ruc={cliente.ruc_cliente}", None),
+        "clientes_por_telefono": ("GET", f"/clientes/buscar?telefono={cliente.phone_cliente}", None),
+        "reporte_arras_moneda": ("GET", f"/reportes/arras/moneda?{desde_hasta}", None),
+        "reporte_arras_mes": ("GET", f"/reportes/arras/mes?{desde_hasta}", None),
+        "reporte_arras_linea_base": ("GET", f"/reportes/arras/linea_base?{desde_hasta}", None),
+        "reporte_locales_por_tipo": ("GET", "/reportes/locales/tipo", None),
+        "grupos": ("GET", "/grupos", None),
+        "login": ("POST", "/users/login", {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}),
+        "actualizar_zona": ("PUT", f"/zonas/{zona['id']}", {"linea_base": "Segunda Línea"}),
+        "eliminar_zona": ("DELETE", f"/zonas/{zona['id']}", None),
+        "eliminar_local": ("DELETE", f"/locales/{padre}", None),
+        "eliminar_categoria": ("DELETE", f"/categorias/{categoria['id']}", None),
+    }
+
+
+@pytest.fixture(scope="module")
+def planes(base_sembrada, cliente_http):
+    """{nombre: [plan de cada SELECT que ejecutó la llamada]}, en orden."""
+    # Con el calentamiento terminado los índices en memoria ya están cargados:
+    # su carga completa (una vez por worker) no es parte de las llamadas
+    assert cliente_http.app.state.calentamiento.listo.wait(30)
+    resultado = {}
+    for nombre, (metodo, ruta, cuerpo) in _llamadas(base_sembrada, cliente_http).items():
+        with capturar_consultas(base_sembrada) as consultas:
+            respuesta = cliente_http.request(metodo, ruta, json=cuerpo)
+        assert respuesta.status_code < 400, f"{nombre}: {respuesta.status_code} {respuesta.text}"
+        with base_sembrada.connect() as conn:
+            resultado[nombre] = [explain_query_plan(conn, sql, parametros) for sql, parametros in consultas]
+    return resultado
+
+
+def test_sin_full_table_scans(planes):
+    fallas = {}
+    for nombre, planes_llamada in planes.items():
+        assert planes_llamada, f"{nombre} no ejecutó consultas"
+        permitidas = ESCANEOS_PERMITIDOS.get(nombre, set())
+        escaneos = [
+            escaneo
+            for plan in planes_llamada
+            for escaneo in full_table_scans(plan)
+            if escaneo.split()[1] not in permitidas
+        ]
+        if escaneos:
+            fallas[nombre] = escaneos
+    assert not fallas
+
+
+def test_cada_indice_secundario_lo_usa_un_router(planes):
+    usados = set().union(*(indices_usados(plan) for lista in planes.values() for plan in lista))
+    assert indices_secundarios() - usados == set()
@@ -0,0 +1,34 @@
+"""Rango desde/hasta de los reportes: fecha_registro se guarda en UTC sin zona horaria."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.apps.reportes.routers import _rango
+
+LIMA = timezone(timedelta(hours=-5))
+
+
+def test_offset_se_convierte_a_utc():
+    desde, hasta = _rango(datetime(2026, 1, 1, tzinfo=LIMA), datetime(2026, 1, 1, 12, tzinfo=LIMA))
+    assert (desde, hasta) == (datetime(2026, 1, 1, 5), datetime(2026, 1, 1, 17))
+    assert desde.tzinfo is None and hasta.tzinfo is None
+
+
+def test_sin_offset_se_toma_como_utc():
+    assert _rango(datetime(2026, 1, 1), None) == (datetime(2026, 1, 1), None)
+
+
+def test_orden_se_compara_despues_de_convertir():
+    # 03:00 -05:00 (08:00 UTC) es posterior a 07:00 UTC aunque la hora local sea menor
+    with pytest.raises(HTTPException):
+        _rango(datetime(2026, 1, 1, 3, tzinfo=LIMA), datetime(2026, 1, 1, 7, tzinfo=timezone.utc))
+
+
+def test_endpoint_usa_el_rango_en_utc(cliente_http):
+    respuesta = cliente_http.get(
+        "/reportes/arras/moneda", params={"desde": "2026-01-01T00:00:00-05:00", "hasta": "2026-01-02T00:00:00+09:00"}
+    )
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json()
+    assert (cuerpo["desde"], cuerpo["hasta"]) == ("2026-01-01T05:00:00", "2026-01-01T15:00:00")
@@ -0,0 +1,17 @@
+"""Workers del launcher de producción según la cache configurada."""
+from app import server
+from app.core.config import settings
+
+
+def test_cache_en_memoria_arranca_un_solo_worker(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 4)
+    monkeypatch.setattr(settings, "CACHE_URL", "")
+    assert server.numero_workers() == 1
+    monkeypatch.setattr(settings, "CACHE_URL", "memory://")
+    assert server.numero_workers() == 1
+
+
+def test_cache_compartida_respeta_server_workers(monkeypatch):
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 4)
+    monkeypatch.setattr(settings, "CACHE_URL", "redis://localhost:6379/0")
+    assert server.numero_workers() == 4
@@ -0,0 +1,14 @@
+"""Calentamiento: un fallo al crear el engine se registra y el worker igual queda listo."""
+from app.db import warmup
+
+
+def test_fallo_del_engine_se_registra(monkeypatch):
+    def sin_driver():
+        raise ModuleNotFoundError("pyodbc")
+
+    monkeypatch.setattr(warmup, "get_engine", sin_driver)
+    estado = warmup.EstadoCalentamiento()
+    warmup.calentar(estado)
+    assert estado.listo.is_set()
+    assert estado.pasos["engine"] == "error: ModuleNotFoundError"
+    assert {estado.pasos[paso.__name__.lstrip("_")] for paso in warmup.PASOS} == {"omitido"}